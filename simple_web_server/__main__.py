@@ -1,40 +1,870 @@
+import argparse
+import contextlib
+import html
 import http.server
+import io
+import math
 import os
-from typing import ClassVar
+import signal
+import sys
+import threading
+import time
+from collections.abc import Sequence
+from stat import S_ISDIR
+from types import FrameType
+from typing import Any, ClassVar
 
-from simple_web_server.resource_handlers.directory_handler import DirectoryHandler
+from simple_web_server.access_log import (
+    ACCESS_LOG_FORMATS,
+    DEFAULT_BACKUP_COUNT,
+    DEFAULT_QUEUE_SIZE,
+    FULL_QUEUE_POLICIES,
+    AccessLogger,
+    AccessRecord,
+    ErrorRecord,
+)
+from simple_web_server.archive import Archive
+from simple_web_server.async_server import DEFAULT_DRAIN_TIMEOUT, AsyncHTTPServer
+from simple_web_server.content_cache import (
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MAX_ENTRY_BYTES,
+    ContentCache,
+)
+from simple_web_server.limits import (
+    DEFAULT_HEADER_TIMEOUT,
+    DEFAULT_MAX_QUEUE,
+    DEFAULT_WRITE_TIMEOUT,
+    DeadlineReader,
+)
+from simple_web_server.listing_cache import DetailsCache
+from simple_web_server.metrics import (
+    CONTENT_TYPE,
+    DISPATCH_DURATION,
+    HANDLER_DURATION,
+    METRICS_PATH,
+    REQUEST_DURATION,
+    MetricsRegistry,
+    Timer,
+)
+from simple_web_server.mmap_cache import MmapCache
+from simple_web_server.path_resolver import PathResolver
+from simple_web_server.resource_handlers.archive_handler import ArchiveHandler
+from simple_web_server.resource_handlers.directory_handler import (
+    DEFAULT_PAGE_SIZE,
+    DirectoryHandler,
+)
 from simple_web_server.resource_handlers.file_handler import FileHandler
 from simple_web_server.resource_handlers.non_existent_resource_handler import (
     NonExistentResourceHandler,
 )
-from simple_web_server.resource_handlers.resource_handler import ResourceHandler
+from simple_web_server.resource_handlers.resource_handler import (
+    Resource,
+    ResourceHandler,
+)
+from simple_web_server.router import Mount, Router, load_handler_class, read_routes
+from simple_web_server.servers import (
+    DEFAULT_THREADS,
+    DEFAULT_WORKERS,
+    SERVER_MODES,
+    PooledThreadingHTTPServer,
+    create_server,
+)
+from simple_web_server.snapshot import (
+    DEFAULT_PRELOAD_SIZE,
+    StaticSnapshot,
+    serve_from_snapshot,
+)
+from simple_web_server.stat_cache import DEFAULT_TTL, StatCache, stat_or_none
+from simple_web_server.supervisor import inherited_socket, notify_ready, supervise
+from simple_web_server.watcher import (
+    DEFAULT_POLL_INTERVAL,
+    WATCHER_KINDS,
+    FileWatcher,
+    create_watcher,
+)
+
+DEFAULT_KEEP_ALIVE_TIMEOUT = 15.0
+DEFAULT_MAX_KEEP_ALIVE_REQUESTS = 100
+
+# Stands in for a Timer when metrics are disabled.
+_NO_TIMER = contextlib.nullcontext()
 
 
 class RequestHandler(http.server.BaseHTTPRequestHandler):
     """
-    Handle GET requests by returning a fixed HTML page.
+    Handle GET and HEAD requests by dispatching to the first matching resource handler.
+
+    The requested path is stat()ed once, through stat_cache, and the result
+    is shared by every resource handler that looks at it.
+
+    Connections are persistent (HTTP/1.1 keep-alive): they stay open for
+    further, possibly pipelined, requests until the client asks to close,
+    stays idle for keep_alive_timeout seconds or has sent
+    max_keep_alive_requests requests.
+
+    Slow clients are dropped: a request must be complete header_timeout
+    seconds after it started to arrive, and a write of the response may
+    stall for at most write_timeout seconds.
     """
 
-    resource_handler_classes: ClassVar[list[type[ResourceHandler]]] = [
-        NonExistentResourceHandler,
-        DirectoryHandler,
-        FileHandler,
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY the body
+    # can wait for the client's delayed ACK (~40 ms) before it is sent.
+    disable_nagle_algorithm = True
+
+    # Shared by all requests; the first one that can handle a path does.
+    resource_handlers: ClassVar[list[ResourceHandler]] = [
+        NonExistentResourceHandler(),
+        DirectoryHandler(),
+        FileHandler(),
     ]
+    # Recent stat() results shared by all requests, or None to always stat.
+    stat_cache: ClassVar[StatCache | None] = StatCache()
+    # Request timings, served on METRICS_PATH; None disables them.
+    metrics: ClassVar[MetricsRegistry | None] = None
+    # Writes the access log in the background; None logs to stderr inline.
+    access_logger: ClassVar[AccessLogger | None] = None
+    # False leaves requests out of the log, which then only has errors.
+    log_requests: ClassVar[bool] = True
+    # Prepared responses for the files of the served root, tried before the
+    # resource handlers; None disables it.
+    snapshot: ClassVar[StaticSnapshot | None] = None
+    # Maps request targets to paths under the document root.
+    path_resolver: ClassVar[PathResolver] = PathResolver()
+    # Maps the Host and URL path of requests to the mount serving them; None
+    # serves the document root with resource_handlers.
+    router: ClassVar[Router | None] = None
+    # Tells the caches about changes on disk; started in each process that
+    # serves requests.
+    watcher: ClassVar[FileWatcher | None] = None
+
+    keep_alive_timeout: ClassVar[float | None] = DEFAULT_KEEP_ALIVE_TIMEOUT
+    max_keep_alive_requests: ClassVar[int] = DEFAULT_MAX_KEEP_ALIVE_REQUESTS
+    header_timeout: ClassVar[float | None] = DEFAULT_HEADER_TIMEOUT
+    write_timeout: ClassVar[float | None] = DEFAULT_WRITE_TIMEOUT
+
+    # Enforces the request deadlines on rfile; None when the server reads
+    # requests itself, as the asyncio one does.
+    deadline_reader: DeadlineReader | None = None
+
+    # Number of requests read so far on this connection.
+    requests_served = 0
+    # Whether the current request was parsed successfully.
+    request_parsed = False
+    # Whether a status line has been sent for the current request.
+    response_started = False
+    # When the current request arrived, as a time.perf_counter() value.
+    request_start = 0.0
+    # Status and Content-Length of the current response, for the access log.
+    response_status: int | None = None
+    response_length = "-"
+    # Encoded header lines of the current response; created by the base class.
+    _headers_buffer: list[bytes]
+
+    def setup(self) -> None:
+        super().setup()
+        self.connection.settimeout(self.write_timeout)
+        self.rfile.close()
+        self.deadline_reader = DeadlineReader(
+            self.connection.makefile("rb", buffering=0),
+            self.connection,
+            self.write_timeout,
+        )
+        self.rfile = io.BufferedReader(self.deadline_reader)
+
+    def handle_one_request(self) -> None:
+        if self.watcher is not None:
+            self.watcher.ensure_started()
+        self.requests_served += 1
+        self.request_parsed = False
+        self.response_started = False
+        self.request_start = time.perf_counter()
+        self.requestline = ""
+        self.response_status = None
+        self.response_length = "-"
+        if self.deadline_reader is not None:
+            self.deadline_reader.expect_request(
+                self.keep_alive_timeout, self.header_timeout
+            )
+        super().handle_one_request()
+        self.log_access()
+
+    def parse_request(self) -> bool:
+        # The request line has just been read; don't count the idle time
+        # spent waiting for it on a keep-alive connection.
+        self.request_start = time.perf_counter()
+        self.request_parsed = super().parse_request()
+        if self.request_parsed:
+            if not self.discard_request_body():
+                self.request_parsed = False
+                self.send_error(400, "Bad Content-Length")
+                return False
+            if self.deadline_reader is not None:
+                self.deadline_reader.end_request()
+        return self.request_parsed
+
+    def discard_request_body(self) -> bool:
+        """Read and drop any request body so the next request can be parsed.
+
+        Returns:
+            False if the Content-Length header isn't a valid length.
+        """
+        if self.headers.get("Transfer-Encoding", "").lower() not in ("", "identity"):
+            self.close_connection = True  # Can't find the end of the body
+            return True
+        try:
+            remaining = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            return False
+        if remaining < 0:
+            return False
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 64 * 1024))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+        return True
+
+    def send_response(self, code: int, message: str | None = None) -> None:
+        super().send_response(code, message)
+        self.response_started = True
+        if self.close_connection:
+            return
+        if self.requests_served >= self.max_keep_alive_requests or getattr(
+            self.server, "draining", False
+        ):
+            # A draining server is about to stop; don't let the client send
+            # another request on this connection.
+            self.send_header("Connection", "close")
+        elif self.request_version == "HTTP/1.0":
+            # HTTP/1.0 clients only reuse the connection if told they can
+            self.send_header("Connection", "keep-alive")
+
+    def send_header(self, keyword: str, value: str) -> None:
+        super().send_header(keyword, value)
+        if self.access_logger is not None and keyword.lower() == "content-length":
+            self.response_length = value
+
+    def send_encoded_headers(self, header_lines: bytes, content_length: int) -> None:
+        """Add header lines that were encoded ahead of time to the response.
+
+        Args:
+            header_lines: "Name: value\\r\\n" lines, encoded as Latin-1.
+            content_length: The Content-Length given in header_lines.
+        """
+        self._headers_buffer.append(header_lines)
+        if self.access_logger is not None:
+            self.response_length = str(content_length)
+
+    def log_request(self, code: int | str = "-", size: int | str = "-") -> None:
+        if not self.log_requests:
+            return
+        if self.access_logger is None:
+            super().log_request(code, size)
+        elif isinstance(code, int):
+            # Logged once the response is complete, by handle_one_request
+            self.response_status = code
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.access_logger is None:
+            super().log_message(format, *args)
+            return
+        self.access_logger.log(
+            ErrorRecord(self.address_string(), time.time(), format % args)
+        )
+
+    def log_access(self) -> None:
+        """Queue the access log record of the request just handled, if any."""
+        if self.access_logger is not None and self.response_status is not None:
+            self.access_logger.log(self.access_record(self.response_status))
+
+    def access_record(self, status: int) -> AccessRecord:
+        """Describe the request that was just served for the access log."""
+        headers = self.headers if self.request_parsed else None
+        return AccessRecord(
+            host=str(self.client_address[0]),
+            timestamp=time.time(),
+            request_line=self.requestline,
+            status=status,
+            length=self.response_length,
+            referer=headers.get("Referer", "") if headers is not None else "",
+            user_agent=headers.get("User-Agent", "") if headers is not None else "",
+            duration=time.perf_counter() - self.request_start,
+        )
+
+    def send_error(
+        self, code: int, message: str | None = None, explain: str | None = None
+    ) -> None:
+        """Send an error response, keeping the connection open if possible.
+
+        The base implementation always closes the connection. Client errors
+        for requests that were parsed correctly (such as 404) have a fully
+        framed body, so the connection can safely serve further requests.
+        """
+        if code >= 500 or not self.request_parsed:
+            self.close_connection = True
+            super().send_error(code, message, explain)
+            return
+
+        shortmsg, longmsg = self.responses.get(code, ("???", "???"))
+        if message is None:
+            message = shortmsg
+        if explain is None:
+            explain = longmsg
+        self.log_error("code %d, message %s", code, message)
+        self.send_response(code, message)
+        body = None
+        if code >= 200 and code not in (204, 205, 304):
+            content = self.error_message_format % {
+                "code": code,
+                "message": html.escape(message, quote=False),
+                "explain": html.escape(explain, quote=False),
+            }
+            body = content.encode("UTF-8", "replace")
+            self.send_header("Content-Type", self.error_content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD" and body:
+            self.wfile.write(body)
+
+    def stat_path(self, full_path: str) -> os.stat_result | None:
+        """Stat a path through the stat cache, or None if it doesn't exist."""
+        if self.stat_cache is None:
+            return stat_or_none(full_path)
+        return self.stat_cache.stat(full_path)
+
+    def timer(self, metric: str, **labels: str) -> Timer | contextlib.nullcontext[None]:
+        """Time a block into a metric's histogram, if metrics are enabled."""
+        if self.metrics is None:
+            return _NO_TIMER
+        return self.metrics.time(metric, **labels)
 
     def do_GET(self) -> None:
         try:
-            full_path = os.getcwd() + self.path
-            for handler_class in self.resource_handler_classes:
-                handler_instance = handler_class()
-                if handler_instance.can_handle(full_path):
-                    handler_instance.handle(self, full_path)
+            resolved = self.path_resolver.resolve(self.path)
+            if resolved is None:
+                self.send_error(400, f"Invalid path: {self.path}")
+                return
+            if self.metrics is not None and resolved.url_path == METRICS_PATH:
+                self.send_metrics(self.metrics)
+                return
+            with self.timer(REQUEST_DURATION):
+                if self.snapshot is not None and serve_from_snapshot(
+                    self, self.snapshot, resolved.url_path
+                ):
                     return
-            super().send_error(501, f"Unsupported resource type: {full_path}")
+                if self.router is None:
+                    self.dispatch(resolved.full_path, resolved.is_directory_path)
+                    return
+                route = self.router.route(self.headers.get("Host"), resolved.url_path)
+                if route is None:
+                    self.send_error(404, f"Nothing is mounted at: {self.path}")
+                    return
+                self.dispatch(
+                    route.full_path,
+                    resolved.is_directory_path,
+                    route.mount.resource_handlers,
+                )
         except Exception as e:
+            if self.response_started:
+                # Part of the response is already out; all we can do is to
+                # stop the client from waiting for the rest of it.
+                self.log_error("Error after response started: %s", e)
+                self.close_connection = True
+                return
             super().send_error(500, str(e))
 
+    def do_HEAD(self) -> None:
+        """Send the headers a GET request would get, without the body.
+
+        Resource handlers check the command and build the headers from the
+        resource's metadata instead of reading its content.
+        """
+        self.do_GET()
+
+    def dispatch(
+        self,
+        full_path: str,
+        directory_only: bool = False,
+        resource_handlers: Sequence[ResourceHandler] | None = None,
+    ) -> None:
+        """Serve a path with the first resource handler that can handle it.
+
+        Args:
+            directory_only: Treat the path as missing unless it is a
+                directory, as for a URL with a trailing slash.
+            resource_handlers: The handlers to try, if not the class's.
+        """
+        if resource_handlers is None:
+            resource_handlers = self.resource_handlers
+        with self.timer(DISPATCH_DURATION):
+            # The path is only stat()ed once a handler that needs it is asked,
+            # so a path an archive serves never touches the disk.
+            resource = Resource(full_path, None, directory_only)
+            stated = False
+            handler = None
+            for candidate in resource_handlers:
+                if candidate.needs_stat and not stated:
+                    resource = self.stat_resource(full_path, directory_only)
+                    stated = True
+                if candidate.can_handle_resource(resource):
+                    handler = candidate
+                    break
+        if handler is None:
+            super().send_error(501, f"Unsupported resource type: {full_path}")
+            return
+        with self.timer(HANDLER_DURATION, handler=handler.metrics_name):
+            handler.handle_resource(self, resource)
+
+    def stat_resource(self, full_path: str, directory_only: bool) -> Resource:
+        """Stat a path into a Resource for the handlers that need it."""
+        stat = self.stat_path(full_path)
+        if directory_only and stat is not None and not S_ISDIR(stat.st_mode):
+            stat = None
+        return Resource(full_path, stat, directory_only)
+
+    def send_metrics(self, metrics: MetricsRegistry) -> None:
+        """Send the request timings in the Prometheus text format."""
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    """Parse the command line options for running the server."""
+    parser = argparse.ArgumentParser(
+        prog="simple_web_server",
+        description="Serve files from the current directory over HTTP.",
+    )
+    parser.add_argument("--host", default="", help="address to bind to")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument(
+        "--mode",
+        choices=SERVER_MODES,
+        default="single",
+        help="concurrency mode used to serve connections",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=DEFAULT_THREADS,
+        help="worker threads per process in threaded, prefork and asyncio modes",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="worker processes in prefork mode",
+    )
+    parser.add_argument(
+        "--keep-alive-timeout",
+        type=float,
+        default=DEFAULT_KEEP_ALIVE_TIMEOUT,
+        help="seconds an idle persistent connection is kept open",
+    )
+    parser.add_argument(
+        "--max-keep-alive-requests",
+        type=int,
+        default=DEFAULT_MAX_KEEP_ALIVE_REQUESTS,
+        help="requests served on a connection before it is closed",
+    )
+    parser.add_argument(
+        "--header-timeout",
+        type=float,
+        default=DEFAULT_HEADER_TIMEOUT,
+        help="seconds a client has to send a whole request once it has started",
+    )
+    parser.add_argument(
+        "--write-timeout",
+        type=float,
+        default=DEFAULT_WRITE_TIMEOUT,
+        help="seconds a write to a client may stall before it is disconnected",
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=0,
+        help="open connections per process, beyond which clients get a 503 "
+        "(0 for no limit)",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=DEFAULT_MAX_QUEUE,
+        help="connections per process waiting for a thread in threaded and "
+        "prefork modes, beyond which clients get a 503 (0 for no limit)",
+    )
+    parser.add_argument(
+        "--supervise",
+        action="store_true",
+        help="run the server in a child process that SIGHUP replaces without "
+        "dropping connections",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=DEFAULT_DRAIN_TIMEOUT,
+        help="seconds a stopping server waits for the requests it is serving",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="MiB of small file contents kept in memory (0 disables the cache)",
+    )
+    parser.add_argument(
+        "--cache-max-file-size",
+        type=int,
+        default=DEFAULT_MAX_ENTRY_BYTES // 1024,
+        help="largest file, in KiB, that is kept in the content cache",
+    )
+    parser.add_argument(
+        "--compressed-cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="MiB of compressed responses kept in memory "
+        "(0 disables on-the-fly compression)",
+    )
+    parser.add_argument(
+        "--mmap-min-size",
+        type=int,
+        default=0,
+        help="serve files of at least this many MiB from shared memory maps "
+        "(0 disables memory mapping)",
+    )
+    parser.add_argument(
+        "--stat-cache-ttl",
+        type=float,
+        default=DEFAULT_TTL,
+        help="seconds a file's metadata is reused between requests (0 disables)",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help=f"record request timings and serve them on {METRICS_PATH}",
+    )
+    parser.add_argument(
+        "--access-log",
+        default="-",
+        help="file to write the access log to, '-' for stderr or 'off'",
+    )
+    parser.add_argument(
+        "--access-log-format",
+        choices=ACCESS_LOG_FORMATS,
+        default="combined",
+        help="write the access log in the Combined Log Format or as JSON lines",
+    )
+    parser.add_argument(
+        "--access-log-max-size",
+        type=int,
+        default=0,
+        help="MiB at which the access log file is rotated (0 never rotates it)",
+    )
+    parser.add_argument(
+        "--access-log-backups",
+        type=int,
+        default=DEFAULT_BACKUP_COUNT,
+        help="rotated access log files to keep",
+    )
+    parser.add_argument(
+        "--access-log-queue",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help="access log records buffered before the --access-log-when-full "
+        "policy applies",
+    )
+    parser.add_argument(
+        "--access-log-when-full",
+        choices=FULL_QUEUE_POLICIES,
+        default="drop",
+        help="drop records or make requests wait when the access log falls behind",
+    )
+    parser.add_argument(
+        "--listing-page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help="entries shown per page of a directory listing",
+    )
+    parser.add_argument(
+        "--archive",
+        help="zip or uncompressed tar file whose content is served as if it "
+        "were unpacked into the current directory",
+    )
+    parser.add_argument(
+        "--routes",
+        help="JSON file mounting document roots, archives and resource handlers "
+        "under URL prefixes and host names",
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="index the served files at startup and serve them from the index",
+    )
+    parser.add_argument(
+        "--snapshot-preload-size",
+        type=int,
+        default=DEFAULT_PRELOAD_SIZE // 1024,
+        help="largest file, in KiB, that the snapshot keeps in memory",
+    )
+    parser.add_argument(
+        "--watch",
+        choices=(*WATCHER_KINDS, "off"),
+        help="how to watch the served files for changes, which are then seen "
+        "right away (default: auto with --snapshot, off otherwise)",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="seconds between scans for changes when inotify is not available",
+    )
+    args = parser.parse_args(argv)
+    if args.threads < 1:
+        parser.error("--threads must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.keep_alive_timeout <= 0:
+        parser.error("--keep-alive-timeout must be positive")
+    if args.max_keep_alive_requests < 1:
+        parser.error("--max-keep-alive-requests must be at least 1")
+    if args.header_timeout <= 0 or args.write_timeout <= 0:
+        parser.error("timeouts must be positive")
+    if min(args.max_connections, args.max_queue) < 0:
+        parser.error("connection limits must not be negative")
+    if args.drain_timeout < 0:
+        parser.error("--drain-timeout must not be negative")
+    if min(args.cache_size, args.cache_max_file_size, args.compressed_cache_size) < 0:
+        parser.error("cache sizes must not be negative")
+    if args.mmap_min_size < 0:
+        parser.error("--mmap-min-size must not be negative")
+    if args.stat_cache_ttl < 0:
+        parser.error("--stat-cache-ttl must not be negative")
+    if min(args.access_log_max_size, args.access_log_backups) < 0:
+        parser.error("access log sizes must not be negative")
+    if args.access_log_queue < 1:
+        parser.error("--access-log-queue must be at least 1")
+    if args.listing_page_size < 1:
+        parser.error("--listing-page-size must be at least 1")
+    if args.snapshot_preload_size < 0:
+        parser.error("--snapshot-preload-size must not be negative")
+    if args.archive and args.snapshot:
+        parser.error("--archive can't be combined with --snapshot")
+    watching = args.watch not in (None, "off")
+    if args.routes and (args.archive or args.snapshot or watching):
+        # These all apply to the document root only, which the routes replace
+        parser.error("--routes can't be combined with --archive, --snapshot or --watch")
+    if args.watch_interval <= 0:
+        parser.error("--watch-interval must be positive")
+    if args.watch is None:
+        args.watch = "auto" if args.snapshot else "off"
+    return args
+
+
+def configure_handler(
+    args: argparse.Namespace, document_root: str | None = None
+) -> type[RequestHandler]:
+    """Create a RequestHandler subclass configured from the parsed options.
+
+    Args:
+        document_root: The directory to serve; defaults to the current one.
+    """
+    if document_root is None:
+        document_root = os.getcwd()
+    content_cache = None
+    if args.cache_size > 0:
+        content_cache = ContentCache(
+            max_bytes=args.cache_size * 1024 * 1024,
+            max_entry_bytes=args.cache_max_file_size * 1024,
+        )
+    compressed_cache = None
+    if args.compressed_cache_size > 0:
+        compressed_cache = ContentCache(
+            max_bytes=args.compressed_cache_size * 1024 * 1024,
+            max_entry_bytes=args.cache_max_file_size * 1024,
+        )
+    mmap_cache = None
+    if args.mmap_min_size > 0:
+        mmap_cache = MmapCache(min_size=args.mmap_min_size * 1024 * 1024)
+    file_handler: type[FileHandler] = type(
+        "ConfiguredFileHandler",
+        (FileHandler,),
+        {
+            "content_cache": content_cache,
+            "compressed_cache": compressed_cache,
+            "mmap_cache": mmap_cache,
+        },
+    )
+    watcher = None
+    stat_cache_ttl = args.stat_cache_ttl
+    if args.watch != "off":
+        watcher = create_watcher(document_root, args.watch, args.watch_interval)
+        # Changes are reported as they happen, so results needn't expire
+        stat_cache_ttl = math.inf if stat_cache_ttl > 0 else 0
+    stat_cache = StatCache(stat_cache_ttl) if stat_cache_ttl > 0 else None
+    details_cache = DetailsCache(stat_cache_ttl) if stat_cache_ttl > 0 else None
+    directory_handler: type[DirectoryHandler] = type(
+        "ConfiguredDirectoryHandler",
+        (DirectoryHandler,),
+        {"page_size": args.listing_page_size, "details_cache": details_cache},
+    )
+    if watcher is not None:
+        for cache in (
+            stat_cache,
+            content_cache,
+            directory_handler.listing_cache,
+            details_cache,
+        ):
+            if cache is not None:
+                watcher.subscribe(cache)
+    resource_handlers: list[ResourceHandler] = [
+        NonExistentResourceHandler(),
+        directory_handler(),
+        file_handler(),
+    ]
+    if args.archive:
+        # Members of the archive take precedence over files on disk
+        resource_handlers.insert(
+            0, create_archive_handler(args, args.archive, document_root)
+        )
+    settings = {
+        "keep_alive_timeout": args.keep_alive_timeout,
+        "max_keep_alive_requests": args.max_keep_alive_requests,
+        "header_timeout": args.header_timeout,
+        "write_timeout": args.write_timeout,
+        "resource_handlers": resource_handlers,
+        "path_resolver": PathResolver(document_root),
+        "stat_cache": stat_cache,
+        "watcher": watcher,
+        "metrics": MetricsRegistry() if args.metrics else None,
+        "access_logger": create_access_logger(args),
+        "log_requests": args.access_log != "off",
+    }
+    if args.routes:
+        settings["router"] = create_router(args, document_root, resource_handlers)
+    return type("ConfiguredRequestHandler", (RequestHandler,), settings)
+
+
+def create_archive_handler(
+    args: argparse.Namespace, path: str, root: str
+) -> ArchiveHandler:
+    """Create a handler serving an archive as if it was unpacked into root."""
+    handler_class: type[ArchiveHandler] = type(
+        "ConfiguredArchiveHandler",
+        (ArchiveHandler,),
+        {
+            "archive": Archive(path),
+            "root": os.path.abspath(root),
+            "page_size": args.listing_page_size,
+        },
+    )
+    return handler_class()
+
+
+def create_router(
+    args: argparse.Namespace,
+    document_root: str,
+    resource_handlers: list[ResourceHandler],
+) -> Router:
+    """Create the router for the mounts of the --routes file.
+
+    Args:
+        resource_handlers: The built-in handlers, which every mount shares.
+    """
+    mounts = []
+    for config in read_routes(args.routes):
+        root = config.root or os.path.abspath(document_root)
+        handlers: list[ResourceHandler] = [
+            load_handler_class(name)() for name in config.handlers
+        ]
+        if config.archive is not None:
+            handlers.append(create_archive_handler(args, config.archive, root))
+        mounts.append(
+            Mount(config.prefix, root, [*handlers, *resource_handlers], config.host)
+        )
+    return Router(mounts)
+
+
+def create_access_logger(args: argparse.Namespace) -> AccessLogger | None:
+    """Create the access logger configured by the parsed options.
+
+    Returns:
+        None for --access-log off, which leaves only errors to be logged,
+        inline to stderr.
+    """
+    if args.access_log == "off":
+        return None
+    return AccessLogger(
+        path=None if args.access_log == "-" else args.access_log,
+        log_format=args.access_log_format,
+        max_queue=args.access_log_queue,
+        when_full=args.access_log_when_full,
+        max_bytes=args.access_log_max_size * 1024 * 1024,
+        backup_count=args.access_log_backups,
+    )
+
+
+def stop_on_sigterm(server: http.server.HTTPServer | AsyncHTTPServer) -> None:
+    """Make SIGTERM stop the server accepting, so that it drains and exits."""
+
+    def handle_sigterm(signum: int, frame: FrameType | None) -> None:
+        # shutdown() waits for serve_forever(), which may be running in
+        # this very thread.
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    listener = inherited_socket()
+    if args.supervise and listener is None:
+        sys.exit(
+            supervise((args.host, args.port), sys.argv[1:] if argv is None else argv)
+        )
+    # Fixed at startup, whatever the working directory becomes later
+    document_root = os.getcwd()
+    handler_class = configure_handler(args, document_root)
+    if args.snapshot:
+        snapshot = StaticSnapshot(
+            document_root,
+            preload_size=args.snapshot_preload_size * 1024,
+            compress=args.compressed_cache_size > 0,
+        )
+        snapshot.build()
+        handler_class.snapshot = snapshot
+        if handler_class.watcher is not None:
+            handler_class.watcher.subscribe(snapshot)
+    server = create_server(
+        args.mode,
+        (args.host, args.port),
+        handler_class,
+        threads=args.threads,
+        workers=args.workers,
+        max_connections=args.max_connections or None,
+        max_queue=args.max_queue or None,
+        drain_timeout=args.drain_timeout,
+        sock=listener,
+    )
+    stop_on_sigterm(server)
+    notify_ready()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if isinstance(server, PooledThreadingHTTPServer | AsyncHTTPServer):
+            server.drain()
+        server.server_close()
+        if handler_class.watcher is not None:
+            handler_class.watcher.stop()
+        if handler_class.access_logger is not None:
+            handler_class.access_logger.close()
+
 
 if __name__ == "__main__":
-    server_address = ("", 8080)
-    server = http.server.HTTPServer(server_address, RequestHandler)
-    server.serve_forever()
+    main()
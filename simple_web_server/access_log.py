@@ -0,0 +1,263 @@
+import datetime
+import json
+import os
+import queue
+import sys
+import threading
+from dataclasses import dataclass
+from typing import TextIO
+
+ACCESS_LOG_FORMATS = ("combined", "json")
+# What to do with a record when the queue is full.
+FULL_QUEUE_POLICIES = ("drop", "block")
+
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_BACKUP_COUNT = 5
+
+# Quote, backslash and control characters, escaped in combined log fields.
+_ESCAPES = {c: f"\\x{c:02x}" for c in (*range(0x20), *range(0x7F, 0xA0))}
+_ESCAPES[ord('"')] = '\\"'
+_ESCAPES[ord("\\")] = "\\\\"
+
+
+@dataclass(frozen=True)
+class AccessRecord:
+    """What is logged about one request."""
+
+    host: str
+    timestamp: float
+    request_line: str
+    status: int
+    length: str  # "-" when the response had no Content-Length
+    referer: str
+    user_agent: str
+    duration: float  # Seconds
+
+
+@dataclass(frozen=True)
+class ErrorRecord:
+    """A message about a request that failed, such as a 404 or a timeout."""
+
+    host: str
+    timestamp: float
+    message: str
+
+
+def format_error(record: ErrorRecord) -> str:
+    """Format a message like BaseHTTPRequestHandler.log_message() does."""
+    when = datetime.datetime.fromtimestamp(record.timestamp)
+    return (
+        f"{record.host} - - [{when.strftime('%d/%b/%Y %H:%M:%S')}] "
+        f"{record.message.translate(_ESCAPES)}\n"
+    )
+
+
+def format_combined(record: AccessRecord) -> str:
+    """Format a record in the Combined Log Format."""
+    when = datetime.datetime.fromtimestamp(record.timestamp).astimezone()
+    return (
+        f"{record.host} - - [{when.strftime('%d/%b/%Y:%H:%M:%S %z')}] "
+        f'"{record.request_line.translate(_ESCAPES)}" {record.status} '
+        f'{record.length} "{record.referer.translate(_ESCAPES) or "-"}" '
+        f'"{record.user_agent.translate(_ESCAPES) or "-"}"\n'
+    )
+
+
+def format_json(record: AccessRecord) -> str:
+    """Format a record as a line of JSON."""
+    when = datetime.datetime.fromtimestamp(record.timestamp, datetime.timezone.utc)
+    return (
+        json.dumps(
+            {
+                "time": when.isoformat(timespec="milliseconds"),
+                "host": record.host,
+                "request": record.request_line,
+                "status": record.status,
+                "length": None if record.length == "-" else int(record.length),
+                "referer": record.referer or None,
+                "user_agent": record.user_agent or None,
+                "duration_ms": round(record.duration * 1000, 3),
+            }
+        )
+        + "\n"
+    )
+
+
+class AccessLogger:
+    """
+    Writes access log records from a background thread.
+
+    Request threads only put records on a bounded queue; the writer thread
+    formats and writes whatever has queued up in one batch. When the queue is
+    full, records are dropped (and counted) or, with the "block" policy, the
+    request thread waits for room. Error records go through the same queue
+    but are always written to stderr.
+
+    Log files are rotated once they reach max_bytes, keeping backup_count
+    old files as path.1, path.2 and so on. After a fork, the first record
+    logged by the child starts a writer thread of its own.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        log_format: str = "combined",
+        max_queue: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        when_full: str = "drop",
+        max_bytes: int = 0,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+    ) -> None:
+        """
+        Args:
+            path: The log file, or None to log to stderr.
+            max_bytes: Size at which the log file is rotated; 0 never
+                rotates it.
+        """
+        if log_format not in ACCESS_LOG_FORMATS:
+            raise ValueError(f"Unknown access log format: {log_format}")
+        if when_full not in FULL_QUEUE_POLICIES:
+            raise ValueError(f"Unknown full queue policy: {when_full}")
+        self.path = path
+        self.format = format_json if log_format == "json" else format_combined
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.block_when_full = when_full == "block"
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        # None tells the writer thread to stop
+        self._queue: queue.Queue[AccessRecord | ErrorRecord | None] = queue.Queue(
+            max_queue
+        )
+        self._stream: TextIO | None = None
+        self._thread: threading.Thread | None = None
+
+    def log(self, record: AccessRecord | ErrorRecord) -> None:
+        """Queue a record for writing."""
+        if self._pid != os.getpid():
+            self._start()
+        if self.block_when_full:
+            self._queue.put(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def close(self) -> None:
+        """Write the queued records and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        thread.join()
+        if self._stream is not None and self.path is not None:
+            self._stream.close()
+        self._stream = None
+        self._pid = None
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Whatever a parent process left behind, including the state of
+            # its writer thread, is not usable in a forked child.
+            self._queue = queue.Queue(self.max_queue)
+            self._stream = self._open()
+            self._thread = threading.Thread(
+                target=self._run, name="access-log", daemon=True
+            )
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _open(self) -> TextIO:
+        if self.path is None:
+            return sys.stderr
+        return open(self.path, "a", encoding="utf-8", errors="backslashreplace")
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            records = []
+            item = self._queue.get()
+            while True:
+                if item is None:
+                    stop = True
+                else:
+                    records.append(item)
+                if len(records) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(records)
+            except (OSError, ValueError):
+                with self._lock:
+                    self.dropped += len(records)
+            self._report_dropped()
+
+    def _write_batch(self, records: list[AccessRecord | ErrorRecord]) -> None:
+        lines = []
+        errors = []
+        for record in records:
+            if isinstance(record, AccessRecord):
+                lines.append(self.format(record))
+            elif self.path is None:
+                lines.append(format_error(record))  # Keep stderr in order
+            else:
+                errors.append(format_error(record))
+        self._write("".join(lines))
+        if errors:
+            sys.stderr.write("".join(errors))
+            sys.stderr.flush()
+
+    def _write(self, text: str) -> None:
+        if self._stream is None or not text:
+            return
+        if self.path is not None and self.max_bytes > 0:
+            self._stream = self._rotate_if_needed(self.path, self._stream, len(text))
+        self._stream.write(text)
+        self._stream.flush()
+
+    def _rotate_if_needed(self, path: str, stream: TextIO, pending: int) -> TextIO:
+        """Rotate the log file if pending more characters would overflow it.
+
+        Returns:
+            The stream to write to next.
+        """
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            current = None
+        if current is None or current.st_ino != os.fstat(stream.fileno()).st_ino:
+            # Another process rotated the file; follow it to the new one
+            stream.close()
+            return self._open()
+        if current.st_size == 0 or current.st_size + pending <= self.max_bytes:
+            return stream
+        stream.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+        return self._open()
+
+    def _report_dropped(self) -> None:
+        with self._lock:
+            newly_dropped = self.dropped - self._reported_dropped
+            self._reported_dropped = self.dropped
+        if newly_dropped:
+            sys.stderr.write(f"access log: {newly_dropped} records dropped\n")
@@ -0,0 +1,241 @@
+import mmap
+import os
+import struct
+import tarfile
+import time
+import zipfile
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass
+from stat import S_IFDIR, S_IFREG, S_ISDIR
+from typing import BinaryIO
+
+from simple_web_server.listing_cache import DirectoryEntry
+
+# Bytes of a zip local file header before its variable-length name and
+# extra field, whose lengths are stored in its last four bytes.
+_ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")
+_ZIP_LOCAL_SIGNATURE = b"PK\x03\x04"
+
+# Size of the pieces a deflated member is inflated in.
+INFLATE_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class ArchiveMember:
+    """A file or directory of an archive, and where its data is stored."""
+
+    name: str  # Path in the archive, without leading or trailing slashes
+    # Made up from the archive's metadata: type, size, mtime, and an inode
+    # number that changes with the content, so make_etag() works on it.
+    stat: os.stat_result
+    offset: int  # Where the stored data starts in the archive file
+    stored_size: int
+    deflated: bool  # Stored as a raw deflate stream rather than as it is
+    crc32: int
+
+    @property
+    def is_dir(self) -> bool:
+        return S_ISDIR(self.stat.st_mode)
+
+
+class Archive:
+    """
+    Read-only index of the members of a zip or uncompressed tar file.
+
+    The zip central directory or the tar headers are read once, when the
+    archive is opened, into a dict keyed by member path; directories that
+    only appear in member paths are added too. The archive is mapped into
+    memory, so a member's data is a slice of the mapping rather than a read.
+    Zip members may be stored or deflated; other compression methods, and
+    encrypted members, are refused when the archive is opened.
+
+    Directories all get the archive's mtime, which then validates their
+    listings. The archive must not be modified in place while it is open;
+    replace it by renaming a new one over it and open it again.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.abspath(path)
+        self._members: dict[str, ArchiveMember] = {}
+        self._listings: dict[str, list[DirectoryEntry]] = {}
+        with open(self.path, "rb") as file:
+            self._stat = os.fstat(file.fileno())
+            self._directory_stat = _make_stat(
+                S_IFDIR | 0o555,
+                self._stat.st_ino,
+                self._stat.st_size,
+                self._stat.st_mtime_ns,
+            )
+            if zipfile.is_zipfile(file):
+                members = list(self._read_zip(file))
+            else:
+                members = list(self._read_tar())
+            self._mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index(members)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def member(self, name: str) -> ArchiveMember | None:
+        """Return the member at a path in the archive; "" is the root."""
+        return self._members.get(name)
+
+    def listing(self, name: str) -> list[DirectoryEntry]:
+        """Return the entries of a directory of the archive, sorted by name."""
+        return self._listings.get(name, [])
+
+    def data(self, member: ArchiveMember) -> memoryview:
+        """Return a member's data as it is stored, without copying it."""
+        return memoryview(self._mapping)[
+            member.offset : member.offset + member.stored_size
+        ]
+
+    def inflate(self, member: ArchiveMember) -> Iterator[bytes]:
+        """Produce a member's content, inflating it if it was deflated."""
+        data = self.data(member)
+        if not member.deflated:
+            yield bytes(data)
+            return
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        for start in range(0, len(data), INFLATE_CHUNK_SIZE):
+            yield decompressor.decompress(data[start : start + INFLATE_CHUNK_SIZE])
+        yield decompressor.flush()
+
+    def close(self) -> None:
+        """Unmap the archive."""
+        try:
+            self._mapping.close()
+        except BufferError:
+            # A writer still holds a view; the map is unmapped once that view
+            # and this object are garbage collected.
+            pass
+
+    def _read_zip(self, file: BinaryIO) -> Iterator[ArchiveMember]:
+        with zipfile.ZipFile(file) as archive:
+            for info in archive.infolist():
+                if info.flag_bits & 0x1:
+                    raise ValueError(f"Encrypted {info.filename} in {self.path}")
+                if info.compress_type not in (
+                    zipfile.ZIP_STORED,
+                    zipfile.ZIP_DEFLATED,
+                ):
+                    raise ValueError(
+                        f"Unsupported compression of {info.filename} in {self.path}"
+                    )
+                # The data follows the local header, whose extra field can
+                # differ from the one in the central directory.
+                file.seek(info.header_offset)
+                signature, name_length, extra_length = _ZIP_LOCAL_HEADER.unpack(
+                    file.read(_ZIP_LOCAL_HEADER.size)
+                )
+                if signature != _ZIP_LOCAL_SIGNATURE:
+                    raise ValueError(f"Corrupt zip file: {self.path}")
+                offset = (
+                    info.header_offset
+                    + _ZIP_LOCAL_HEADER.size
+                    + name_length
+                    + extra_length
+                )
+                mtime = time.mktime((*info.date_time, 0, 0, -1))
+                yield self._member(
+                    info.filename,
+                    info.is_dir(),
+                    offset,
+                    info.compress_size,
+                    info.file_size,
+                    mtime,
+                    deflated=info.compress_type == zipfile.ZIP_DEFLATED,
+                    crc32=info.CRC,
+                )
+
+    def _read_tar(self) -> Iterator[ArchiveMember]:
+        try:
+            # Only an uncompressed tar file can be served from its offsets
+            archive = tarfile.open(self.path, "r:")
+        except tarfile.ReadError as e:
+            raise ValueError(f"Not a zip or uncompressed tar file: {self.path}") from e
+        with archive:
+            for info in archive:
+                # Links and special files are left out, like sparse files,
+                # whose data isn't stored as one piece.
+                if not (info.isdir() or info.isreg()) or info.issparse():
+                    continue
+                yield self._member(
+                    info.name,
+                    info.isdir(),
+                    info.offset_data,
+                    info.size,
+                    info.size,
+                    info.mtime,
+                    deflated=False,
+                    # Unlike zip, tar keeps no checksum of the content, so
+                    # any change to the archive changes the ETags.
+                    crc32=zlib.crc32(
+                        struct.pack(
+                            "<QQQ", info.offset_data, info.size, self._stat.st_mtime_ns
+                        )
+                    ),
+                )
+
+    def _member(
+        self,
+        name: str,
+        is_dir: bool,
+        offset: int,
+        stored_size: int,
+        size: int,
+        mtime: float,
+        deflated: bool,
+        crc32: int,
+    ) -> ArchiveMember:
+        if is_dir:
+            stat = self._directory_stat
+        else:
+            stat = _make_stat(S_IFREG | 0o444, crc32, size, int(mtime * 1e9))
+        return ArchiveMember(
+            _normalize(name), stat, offset, stored_size, deflated, crc32
+        )
+
+    def _directory(self, name: str) -> ArchiveMember:
+        return ArchiveMember(name, self._directory_stat, 0, 0, False, 0)
+
+    def _index(self, members: list[ArchiveMember]) -> None:
+        """Index the members by path, along with every directory above them."""
+        self._members[""] = self._directory("")
+        children: dict[str, dict[str, bool]] = {"": {}}
+        for member in members:
+            if not member.name or ".." in member.name.split("/"):
+                continue  # Paths that could never be requested
+            parts = member.name.split("/")
+            for depth in range(1, len(parts)):
+                parent = "/".join(parts[: depth - 1])
+                directory = "/".join(parts[:depth])
+                children.setdefault(parent, {})[parts[depth - 1]] = True
+                children.setdefault(directory, {})
+                if directory not in self._members:
+                    self._members[directory] = self._directory(directory)
+            parent = "/".join(parts[:-1])
+            children.setdefault(parent, {})[parts[-1]] = member.is_dir
+            if member.is_dir:
+                children.setdefault(member.name, {})
+            # A later member with the same path replaces an earlier one
+            self._members[member.name] = member
+        for directory, entries in children.items():
+            self._listings[directory] = [
+                DirectoryEntry(name, is_dir) for name, is_dir in sorted(entries.items())
+            ]
+
+
+def _normalize(name: str) -> str:
+    """Strip the "./", leading and trailing slashes archivers may add."""
+    parts = [part for part in name.split("/") if part not in ("", ".")]
+    return "/".join(parts)
+
+
+def _make_stat(mode: int, ino: int, size: int, mtime_ns: int) -> os.stat_result:
+    seconds = mtime_ns // 1_000_000_000
+    return os.stat_result(
+        (mode, ino, 0, 1, 0, 0, size, seconds, seconds, seconds),
+        {"st_mtime": mtime_ns / 1e9, "st_mtime_ns": mtime_ns},
+    )
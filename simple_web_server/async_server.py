@@ -0,0 +1,246 @@
+import asyncio
+import http.server
+import io
+import re
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from simple_web_server.limits import OVERLOADED_RESPONSE, ConnectionLimiter
+
+# Seconds a stopping server waits for the connections it is serving.
+DEFAULT_DRAIN_TIMEOUT = 30.0
+
+# Largest request head (request line plus headers) accepted from a client.
+MAX_REQUEST_HEAD = 64 * 1024
+
+_CONTENT_LENGTH_RE = re.compile(rb"\r\ncontent-length:[ \t]*(\d+)", re.IGNORECASE)
+
+
+class StreamWriterFile(io.BufferedIOBase):
+    """
+    File-like wrapper that lets a worker thread write to an asyncio stream.
+
+    Each write is handed to the event loop and waits for the transport to
+    drain, so a slow client applies backpressure to the handler writing the
+    response instead of the response piling up in memory. A write that
+    can't drain within timeout seconds raises TimeoutError.
+    """
+
+    def __init__(
+        self,
+        writer: asyncio.StreamWriter,
+        loop: asyncio.AbstractEventLoop,
+        timeout: float | None = None,
+    ) -> None:
+        super().__init__()
+        self._writer = writer
+        self._loop = loop
+        self._timeout = timeout
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        asyncio.run_coroutine_threadsafe(self._write(data), self._loop).result()
+        return len(data)
+
+    async def _write(self, data: bytes) -> None:
+        self._writer.write(data)
+        await asyncio.wait_for(self._writer.drain(), self._timeout)
+
+
+class AsyncRequestMixin(http.server.BaseHTTPRequestHandler):
+    """
+    Adapts a BaseHTTPRequestHandler subclass to requests read by asyncio.
+
+    The event loop reads the request head from the connection; the handler
+    then parses and serves it exactly as the blocking server would, through
+    the usual do_GET and ResourceHandler chain, with rfile holding the bytes
+    already read and wfile writing back through the event loop.
+    """
+
+    # Unlike BaseRequestHandler.__init__, this does not run setup(), handle()
+    # and finish(); the server calls handle_one_request() on a worker thread.
+    def __init__(
+        self,
+        request: bytes,
+        wfile: StreamWriterFile,
+        client_address: Any,
+        server: Any,
+        requests_served: int = 0,
+    ) -> None:
+        self.rfile = io.BytesIO(request)
+        self.wfile = wfile
+        self.client_address = client_address
+        self.server = server
+        self.close_connection = True
+        # Carried over between requests so per-connection limits still apply
+        self.requests_served = requests_served
+
+
+class AsyncHTTPServer:
+    """
+    HTTP/1.1 server engine built on asyncio.
+
+    Connections are coroutines on a single event loop, so idle keep-alive
+    connections cost a few kilobytes each rather than a thread. Each request
+    is served by the regular request handler class on an executor thread,
+    which keeps blocking file I/O off the event loop. Connections beyond
+    max_connections open get a 503 straight away.
+
+    Once shutdown() has stopped it accepting, drain() lets the connections
+    being served finish.
+    """
+
+    def __init__(
+        self,
+        server_address: tuple[str, int],
+        request_handler_class: type[http.server.BaseHTTPRequestHandler],
+        max_workers: int,
+        max_connections: int | None = None,
+        drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+        sock: socket.socket | None = None,
+    ) -> None:
+        self.RequestHandlerClass = type(
+            f"Async{request_handler_class.__name__}",
+            (AsyncRequestMixin, request_handler_class),
+            {},
+        )
+        self.max_workers = max_workers
+        self.drain_timeout = drain_timeout
+        # Set while draining; handlers then ask clients to close connections.
+        self.draining = False
+        self.limiter = ConnectionLimiter(max_connections)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="http-worker"
+        )
+        self._loop = asyncio.new_event_loop()
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._all_closed = asyncio.Event()
+        if sock is not None:
+            server = asyncio.start_server(
+                self._handle_connection, sock=sock, limit=MAX_REQUEST_HEAD
+            )
+        else:
+            host, port = server_address
+            server = asyncio.start_server(
+                self._handle_connection, host or None, port, limit=MAX_REQUEST_HEAD
+            )
+        self._server = self._loop.run_until_complete(server)
+        sockname = self._server.sockets[0].getsockname()
+        self.server_address: tuple[str, int] = (sockname[0], sockname[1])
+
+    def serve_forever(self) -> None:
+        """Run the event loop until shutdown() is called."""
+        try:
+            self._loop.run_until_complete(self._server.serve_forever())
+        except asyncio.CancelledError:
+            pass
+
+    def shutdown(self) -> None:
+        """Stop serve_forever(); safe to call from any thread."""
+        self._loop.call_soon_threadsafe(self._server.close)
+
+    def drain(self, timeout: float | None = None) -> None:
+        """Wait for the open connections to finish, for up to timeout seconds.
+
+        Responses sent while draining ask clients to close the connection,
+        and idle connections close when their keep-alive timeout expires,
+        so no request is cut off that a client had already sent. Connections
+        still open at the deadline, drain_timeout by default, are closed by
+        server_close().
+        """
+        if timeout is None:
+            timeout = self.drain_timeout
+        self._loop.run_until_complete(self._drain(timeout))
+
+    async def _drain(self, timeout: float) -> None:
+        self.draining = True
+        if self._writers:
+            self._all_closed.clear()
+            try:
+                await asyncio.wait_for(self._all_closed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def server_close(self) -> None:
+        """Close the listening socket and all connections, then the loop."""
+        self._server.close()
+        for writer in self._writers:
+            writer.close()
+        # Handlers still running write through the loop, so it has to keep
+        # running until they have finished.
+        self._loop.run_until_complete(
+            self._loop.run_in_executor(None, self._executor.shutdown)
+        )
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.run_until_complete(self._loop.shutdown_default_executor())
+        self._loop.close()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        if not self.limiter.admit():
+            writer.write(OVERLOADED_RESPONSE)
+            writer.close()
+            return
+        self.limiter.start()
+        client_address = writer.get_extra_info("peername")
+        wfile = StreamWriterFile(
+            writer,
+            self._loop,
+            getattr(self.RequestHandlerClass, "write_timeout", None),
+        )
+        requests_served = 0
+        self._writers.add(writer)
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                handler = self.RequestHandlerClass(
+                    request, wfile, client_address, self, requests_served
+                )
+                await self._loop.run_in_executor(
+                    self._executor, handler.handle_one_request
+                )
+                requests_served = handler.requests_served
+                if handler.close_connection:
+                    break
+        except (ConnectionError, asyncio.TimeoutError, RuntimeError):
+            pass  # RuntimeError: the executor was shut down by server_close()
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+            self.limiter.release()
+            if not self._writers:
+                self._all_closed.set()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> bytes | None:
+        """Read one request head and any body, or None if the client is done.
+
+        The request must start within the handler's keep_alive_timeout and
+        then be complete within its header_timeout.
+        """
+        idle_timeout = getattr(self.RequestHandlerClass, "keep_alive_timeout", None)
+        header_timeout = getattr(self.RequestHandlerClass, "header_timeout", None)
+        try:
+            first = await asyncio.wait_for(reader.readexactly(1), idle_timeout)
+            head = first + await asyncio.wait_for(
+                self._read_rest(reader), header_timeout
+            )
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            return None
+        return head
+
+    async def _read_rest(self, reader: asyncio.StreamReader) -> bytes:
+        rest = await reader.readuntil(b"\r\n\r\n")
+        # Skip any body, which GET handlers ignore, so that the next
+        # pipelined request starts at the right place in the stream.
+        match = _CONTENT_LENGTH_RE.search(rest)
+        remaining = int(match.group(1)) if match else 0
+        while remaining > 0:
+            remaining -= len(await reader.readexactly(min(remaining, 64 * 1024)))
+        return rest
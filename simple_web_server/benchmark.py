@@ -0,0 +1,416 @@
+"""
+Benchmark the server under load from a local client.
+
+Starts the server in each concurrency mode on a free local port, serving a
+generated document tree, and drives every scenario with concurrent clients,
+with and without keep-alive. Reports requests per second, p50/p99 latency and
+the server's resident memory, and can save the results as JSON to compare
+against a later run. Run it with:
+
+    python -m simple_web_server.benchmark [--modes threaded asyncio]
+        [--duration 5] [--output results.json] [--baseline old.json]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+
+from simple_web_server.servers import SERVER_MODES
+
+# Scenario name to requested path and expected status.
+SCENARIOS = {
+    "small-file": ("/small.txt", 200),
+    "large-file": ("/large.bin", 200),
+    "listing": ("/listing/", 200),
+    "not-found": ("/missing.txt", 404),
+}
+
+SMALL_FILE_SIZE = 1024
+DEFAULT_LARGE_FILE_SIZE = 4 * 1024 * 1024
+DEFAULT_LISTING_ENTRIES = 500
+DEFAULT_DURATION = 3.0
+DEFAULT_CONCURRENCY = 8
+STARTUP_TIMEOUT = 10.0
+
+
+@dataclass
+class BenchmarkResult:
+    """The measurements of one scenario against one server mode."""
+
+    mode: str
+    scenario: str
+    keep_alive: bool
+    requests: int
+    errors: int
+    requests_per_second: float
+    p50_ms: float
+    p99_ms: float
+    rss_kib: int | None
+
+    @property
+    def key(self) -> str:
+        connection = "keep-alive" if self.keep_alive else "close"
+        return f"{self.mode}/{self.scenario}/{connection}"
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(round(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def create_document_root(
+    root: str,
+    large_file_size: int = DEFAULT_LARGE_FILE_SIZE,
+    listing_entries: int = DEFAULT_LISTING_ENTRIES,
+) -> None:
+    """Write the files the scenarios request into root."""
+    with open(os.path.join(root, "small.txt"), "wb") as file:
+        file.write(b"x" * SMALL_FILE_SIZE)
+    with open(os.path.join(root, "large.bin"), "wb") as file:
+        file.write(os.urandom(large_file_size))
+    listing = os.path.join(root, "listing")
+    os.mkdir(listing)
+    for index in range(listing_entries):
+        open(os.path.join(listing, f"entry-{index:06d}.txt"), "wb").close()
+
+
+def free_port() -> int:
+    """Find a local port that is currently free."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def start_server(
+    mode: str, root: str, port: int, threads: int, workers: int
+) -> "subprocess.Popen[bytes]":
+    """Start the server in a child process serving root and wait for it."""
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, (package_parent, env.get("PYTHONPATH")))
+    )
+    command = [
+        sys.executable,
+        "-m",
+        "simple_web_server",
+        f"--mode={mode}",
+        "--host=127.0.0.1",
+        f"--port={port}",
+        f"--threads={threads}",
+        f"--workers={workers}",
+    ]
+    process = subprocess.Popen(
+        command,
+        cwd=root,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                stop_server(process)
+                raise RuntimeError(f"Server in {mode} mode did not start") from None
+            time.sleep(0.05)
+
+
+def stop_server(process: "subprocess.Popen[bytes]") -> None:
+    """Interrupt the server so that it shuts down its workers too."""
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def server_rss_kib(pid: int) -> int | None:
+    """Return the resident memory of a process and its children, in KiB.
+
+    Returns:
+        None where /proc is not available.
+    """
+    total = 0
+    pending = [pid]
+    try:
+        while pending:
+            current = pending.pop()
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pending.extend(int(child) for child in children.read().split())
+    except (OSError, ValueError):
+        return None
+    return total
+
+
+def drive(
+    port: int,
+    path: str,
+    expected_status: int,
+    keep_alive: bool,
+    concurrency: int,
+    duration: float,
+) -> tuple[list[float], int, float]:
+    """Request path from concurrent clients for duration seconds.
+
+    Returns:
+        The sorted latencies in seconds, the number of failed requests and
+        the elapsed time.
+    """
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    headers = {} if keep_alive else {"Connection": "close"}
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def client() -> None:
+        nonlocal errors
+        own_latencies = []
+        own_errors = 0
+        connection = None
+        while time.perf_counter() < deadline:
+            if connection is None:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            sent = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == expected_status
+            except (OSError, http.client.HTTPException):
+                ok = False
+            if ok:
+                own_latencies.append(time.perf_counter() - sent)
+            else:
+                own_errors += 1
+            if not ok or not keep_alive or response.will_close:
+                connection.close()
+                connection = None
+        if connection is not None:
+            connection.close()
+        with lock:
+            latencies.extend(own_latencies)
+            errors += own_errors
+
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return latencies, errors, elapsed
+
+
+def run_benchmark(
+    modes: Sequence[str],
+    scenarios: Sequence[str],
+    keep_alive_options: Sequence[bool] = (True, False),
+    duration: float = DEFAULT_DURATION,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    threads: int = DEFAULT_CONCURRENCY,
+    workers: int = 2,
+    large_file_size: int = DEFAULT_LARGE_FILE_SIZE,
+    listing_entries: int = DEFAULT_LISTING_ENTRIES,
+) -> list[BenchmarkResult]:
+    """Run every scenario against a fresh server in each mode."""
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        create_document_root(root, large_file_size, listing_entries)
+        for mode in modes:
+            port = free_port()
+            process = start_server(mode, root, port, threads, workers)
+            try:
+                for scenario in scenarios:
+                    path, expected_status = SCENARIOS[scenario]
+                    for keep_alive in keep_alive_options:
+                        latencies, errors, elapsed = drive(
+                            port,
+                            path,
+                            expected_status,
+                            keep_alive,
+                            concurrency,
+                            duration,
+                        )
+                        results.append(
+                            BenchmarkResult(
+                                mode=mode,
+                                scenario=scenario,
+                                keep_alive=keep_alive,
+                                requests=len(latencies),
+                                errors=errors,
+                                requests_per_second=len(latencies) / elapsed,
+                                p50_ms=percentile(latencies, 0.50) * 1000,
+                                p99_ms=percentile(latencies, 0.99) * 1000,
+                                rss_kib=server_rss_kib(process.pid),
+                            )
+                        )
+            finally:
+                stop_server(process)
+    return results
+
+
+def format_results(
+    results: Sequence[BenchmarkResult],
+    baseline: dict[str, BenchmarkResult] | None = None,
+) -> str:
+    """Format results as a table, with the change against a baseline run."""
+    header = (
+        f"{'benchmark':<36} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} "
+        f"{'RSS KiB':>9} {'errors':>7}"
+    )
+    if baseline is not None:
+        header += f" {'vs base':>8}"
+    lines = [header]
+    for result in results:
+        rss = "-" if result.rss_kib is None else str(result.rss_kib)
+        line = (
+            f"{result.key:<36} {result.requests_per_second:>10.1f} "
+            f"{result.p50_ms:>9.2f} {result.p99_ms:>9.2f} {rss:>9} "
+            f"{result.errors:>7}"
+        )
+        if baseline is not None:
+            base = baseline.get(result.key)
+            if base is not None and base.requests_per_second > 0:
+                change = result.requests_per_second / base.requests_per_second - 1
+                line += f" {change:>+8.1%}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def save_results(path: str, results: Sequence[BenchmarkResult]) -> None:
+    """Save results and a description of the environment as JSON."""
+    document = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.time(),
+        "results": [asdict(result) for result in results],
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+
+
+def load_results(path: str) -> dict[str, BenchmarkResult]:
+    """Load results saved by save_results, keyed by BenchmarkResult.key."""
+    with open(path) as file:
+        document = json.load(file)
+    results = [BenchmarkResult(**result) for result in document["results"]]
+    return {result.key: result for result in results}
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m simple_web_server.benchmark",
+        description="Measure the server's throughput, latency and memory.",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=SERVER_MODES,
+        default=list(SERVER_MODES),
+        help="server modes to benchmark",
+    )
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=list(SCENARIOS),
+        default=list(SCENARIOS),
+        help="request scenarios to run",
+    )
+    parser.add_argument(
+        "--connection",
+        choices=("both", "keep-alive", "close"),
+        default="both",
+        help="whether clients reuse their connections",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=DEFAULT_DURATION,
+        help="seconds each scenario runs for",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="number of concurrent clients",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="server threads per process",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=2, help="server processes in prefork mode"
+    )
+    parser.add_argument(
+        "--large-file-size",
+        type=int,
+        default=DEFAULT_LARGE_FILE_SIZE // 1024,
+        help="size of the large file in KiB",
+    )
+    parser.add_argument(
+        "--listing-entries",
+        type=int,
+        default=DEFAULT_LISTING_ENTRIES,
+        help="number of entries in the listed directory",
+    )
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved earlier")
+    args = parser.parse_args(argv)
+    if args.duration <= 0:
+        parser.error("--duration must be positive")
+    if min(args.concurrency, args.threads, args.workers) < 1:
+        parser.error("--concurrency, --threads and --workers must be at least 1")
+
+    keep_alive_options = {
+        "both": (True, False),
+        "keep-alive": (True,),
+        "close": (False,),
+    }[args.connection]
+    baseline = load_results(args.baseline) if args.baseline else None
+    results = run_benchmark(
+        args.modes,
+        args.scenarios,
+        keep_alive_options,
+        duration=args.duration,
+        concurrency=args.concurrency,
+        threads=args.threads,
+        workers=args.workers,
+        large_file_size=args.large_file_size * 1024,
+        listing_entries=args.listing_entries,
+    )
+    print(format_results(results, baseline))
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import gzip
+import os
+import zlib
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from stat import S_ISREG
+from typing import TYPE_CHECKING
+
+from simple_web_server.stat_cache import stat_or_none
+
+if TYPE_CHECKING:
+    from simple_web_server.__main__ import RequestHandler
+
+# Precompressed siblings looked for next to a file, in order of preference.
+PRECOMPRESSED_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+# Encodings the server can produce itself.
+ON_THE_FLY_ENCODINGS = ("gzip",)
+
+# Bodies smaller than this gain nothing from compression.
+MIN_COMPRESS_SIZE = 256
+
+# Larger files are sent uncompressed rather than compressed per request.
+MAX_COMPRESS_SIZE = 1024 * 1024
+
+COMPRESSION_LEVEL = 6
+
+_COMPRESSIBLE_TYPES = frozenset(
+    {
+        "application/javascript",
+        "application/json",
+        "application/manifest+json",
+        "application/wasm",
+        "application/xhtml+xml",
+        "application/xml",
+        "image/svg+xml",
+    }
+)
+
+
+def is_compressible(content_type: str) -> bool:
+    """Check if a content type is worth compressing."""
+    mime_type = content_type.partition(";")[0].strip().lower()
+    return mime_type.startswith("text/") or mime_type in _COMPRESSIBLE_TYPES
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Parse an Accept-Encoding header into a mapping of coding to q-value."""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate_encoding(header: str | None, available: Sequence[str]) -> str | None:
+    """Choose the best of the available codings the client accepts.
+
+    Returns:
+        The chosen coding, or None if the body should be sent unencoded.
+        Ties are broken by the order of available.
+    """
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def accepted_encoding(
+    request_handler: "RequestHandler", available: Sequence[str]
+) -> str | None:
+    """Negotiate the response coding from the request's Accept-Encoding."""
+    return negotiate_encoding(request_handler.headers.get("Accept-Encoding"), available)
+
+
+def find_precompressed(
+    full_path: str,
+    stat: os.stat_result,
+    lookup: Callable[[str], os.stat_result | None] = stat_or_none,
+) -> dict[str, tuple[str, os.stat_result]]:
+    """Find precompressed siblings of a file that are at least as new as it.
+
+    Args:
+        lookup: Stats a sibling, returning None if it doesn't exist.
+
+    Returns:
+        A mapping of coding to the sibling's path and stat result.
+    """
+    found = {}
+    for coding, suffix in PRECOMPRESSED_SUFFIXES:
+        sibling = full_path + suffix
+        sibling_stat = lookup(sibling)
+        if sibling_stat is None or not S_ISREG(sibling_stat.st_mode):
+            continue
+        if sibling_stat.st_mtime_ns >= stat.st_mtime_ns:
+            found[coding] = (sibling, sibling_stat)
+    return found
+
+
+def offered_encodings(
+    precompressed: Iterable[str], size: int, on_the_fly: bool
+) -> list[str]:
+    """List the codings a compressible file can be sent with, best first.
+
+    Args:
+        precompressed: The codings of its precompressed siblings.
+        size: The size of the file.
+        on_the_fly: Whether files may be compressed per request.
+    """
+    offered = list(precompressed)
+    if on_the_fly and MIN_COMPRESS_SIZE <= size <= MAX_COMPRESS_SIZE:
+        offered += [c for c in ON_THE_FLY_ENCODINGS if c not in offered]
+    return offered
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    """Compress a body with one of the ON_THE_FLY_ENCODINGS."""
+    if coding == "gzip":
+        # A fixed mtime keeps the output, and so its ETag, reproducible
+        return gzip.compress(body, COMPRESSION_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content coding: {coding}")
+
+
+def compress_stream(pieces: Iterable[bytes], coding: str) -> Iterator[bytes]:
+    """Compress a body produced piece by piece as it is produced."""
+    if coding != "gzip":
+        raise ValueError(f"Unsupported content coding: {coding}")
+    # wbits of 16 + 15 writes a gzip header, with a zero mtime
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compressed() -> Iterator[bytes]:
+        first = True
+        for piece in pieces:
+            data = compressor.compress(piece)
+            if first and piece:
+                # Let the start of the body out without waiting for more
+                data += compressor.flush(zlib.Z_SYNC_FLUSH)
+                first = False
+            yield data
+        yield compressor.flush()
+
+    return compressed()
+
+
+def encoded_etag(etag: str, coding: str) -> str:
+    """Derive the ETag of a coded representation from the original's."""
+    return f'{etag[:-1]}-{coding}"'
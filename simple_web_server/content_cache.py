@@ -0,0 +1,90 @@
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRY_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class CachedContent:
+    """A cached response body and the headers to send with it."""
+
+    mtime_ns: int
+    size: int
+    body: bytes
+    headers: tuple[tuple[str, str], ...]
+
+
+class ContentCache:
+    """
+    Thread-safe LRU cache of small file bodies, bounded by total body size.
+
+    Entries remember the size and modification time of the file they were
+    read from and are discarded as soon as the file on disk no longer matches.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entry_bytes: int = DEFAULT_MAX_ENTRY_BYTES,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, CachedContent] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def can_cache(self, size: int) -> bool:
+        """Check if a body of the given size is small enough to be cached."""
+        return size <= self.max_entry_bytes
+
+    def get(self, key: Hashable, stat: os.stat_result) -> CachedContent | None:
+        """Return the entry for key if it is still current for stat."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedContent) -> None:
+        """Store an entry, evicting the least recently used ones to fit it."""
+        body_size = len(entry.body)
+        if not self.can_cache(body_size):
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self.current_bytes + body_size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+            self._entries[key] = entry
+            self.current_bytes += body_size
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop the entry for key, if any."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        self.current_bytes -= len(self._entries.pop(key).body)
@@ -0,0 +1,152 @@
+import io
+import socket
+import threading
+import time
+from typing import Any
+
+# Seconds a client has to send a whole request once its first byte arrived.
+DEFAULT_HEADER_TIMEOUT = 10.0
+# Seconds a single write to a client may make no progress.
+DEFAULT_WRITE_TIMEOUT = 30.0
+# Connections that may wait for a free worker thread in each process.
+DEFAULT_MAX_QUEUE = 1024
+
+# Sent, without reading the request, to connections refused when overloaded.
+OVERLOADED_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Type: text/plain\r\n"
+    b"Content-Length: 20\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+    b"Server is too busy.\n"
+)
+
+
+class DeadlineReader(io.RawIOBase):
+    """
+    Reads from a client connection, enforcing deadlines on whole requests.
+
+    Once told to expect a request, the first byte of it must arrive within
+    the idle timeout, and the rest of it within header_timeout seconds of
+    that, however slowly it trickles in. A per-recv() socket timeout alone
+    would let a client that sends a byte every few seconds hold the
+    connection forever. Any other read may stall for stall_timeout seconds.
+    """
+
+    def __init__(
+        self,
+        raw: io.RawIOBase,
+        connection: socket.socket,
+        stall_timeout: float | None = None,
+    ) -> None:
+        super().__init__()
+        self.stall_timeout = stall_timeout
+        self._raw = raw
+        self._connection = connection
+        self._in_request = False
+        self._waiting = False  # For the first byte of the request
+        self._deadline: float | None = None
+        self._header_timeout: float | None = None
+
+    def readable(self) -> bool:
+        return True
+
+    def expect_request(
+        self, idle_timeout: float | None, header_timeout: float | None
+    ) -> None:
+        """Start the deadlines for the next request on the connection."""
+        self._in_request = True
+        self._waiting = True
+        self._deadline = _deadline(idle_timeout)
+        self._header_timeout = header_timeout
+
+    def end_request(self) -> None:
+        """Stop the deadlines once the whole request has been read."""
+        self._in_request = False
+        self._waiting = False
+        self._deadline = None
+
+    def readinto(self, buffer: Any) -> int | None:
+        timeout = self.stall_timeout
+        if self._in_request:
+            timeout = None
+            if self._deadline is not None:
+                timeout = self._deadline - time.monotonic()
+                if timeout <= 0:
+                    raise TimeoutError("Request deadline passed")
+        self._connection.settimeout(timeout)
+        try:
+            count = self._raw.readinto(buffer)
+        finally:
+            self._connection.settimeout(self.stall_timeout)
+        if count and self._waiting:
+            self._waiting = False
+            self._deadline = _deadline(self._header_timeout)
+        return count
+
+    def close(self) -> None:
+        self._raw.close()
+        super().close()
+
+
+def _deadline(timeout: float | None) -> float | None:
+    return None if timeout is None else time.monotonic() + timeout
+
+
+class ConnectionLimiter:
+    """
+    Thread-safe count of a process's open connections, refusing those over
+    its limits.
+
+    A connection is admitted when it is accepted and counts as queued until
+    a worker starts serving it. Once max_connections are open, or
+    max_queue are waiting for a worker, further connections are refused so
+    that a burst is turned away quickly instead of piling up behind the
+    ones being served. None means no limit.
+    """
+
+    def __init__(
+        self, max_connections: int | None = None, max_queue: int | None = None
+    ) -> None:
+        self.max_connections = max_connections
+        self.max_queue = max_queue
+        self.open = 0
+        self.queued = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def admit(self) -> bool:
+        """Count a new connection, or return False if it must be refused."""
+        with self._lock:
+            if (
+                self.max_connections is not None and self.open >= self.max_connections
+            ) or (self.max_queue is not None and self.queued >= self.max_queue):
+                self.rejected += 1
+                return False
+            self.open += 1
+            self.queued += 1
+            return True
+
+    def start(self) -> None:
+        """Record that a worker has started serving an admitted connection."""
+        with self._lock:
+            self.queued -= 1
+
+    def release(self) -> None:
+        """Record that an admitted connection has been closed."""
+        with self._lock:
+            self.open -= 1
+
+
+def reject_connection(connection: socket.socket) -> None:
+    """Send a 503 to a refused connection without waiting for the client.
+
+    The response fits in the socket's send buffer, so a client that never
+    reads it can't hold up the thread accepting connections.
+    """
+    try:
+        connection.setblocking(False)
+        connection.send(OVERLOADED_RESPONSE)
+    except OSError:
+        pass
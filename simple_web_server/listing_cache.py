@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from stat import S_ISDIR, S_ISREG
+
+# Total number of directory entries kept across all cached directories.
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+# Seconds the metadata of a directory's entries is reused.
+DEFAULT_DETAILS_TTL = 1.0
+
+# Total number of entries with metadata kept across all cached listings.
+DEFAULT_MAX_DETAILS = 250_000
+
+
+@dataclass(frozen=True)
+class DirectoryEntry:
+    """A single entry of a directory listing."""
+
+    name: str
+    is_dir: bool
+
+
+def scan_directory(full_path: str) -> list[DirectoryEntry]:
+    """List a directory, sorted by name, in a single scandir() pass.
+
+    Entry types come from the directory itself, so no per-entry stat() call
+    is needed except for symbolic links.
+    """
+    with os.scandir(full_path) as it:
+        entries = [DirectoryEntry(entry.name, entry.is_dir()) for entry in it]
+    entries.sort(key=lambda entry: entry.name)
+    return entries
+
+
+@dataclass(frozen=True)
+class EntryDetails:
+    """A directory entry with the type, size and mtime of what it names."""
+
+    name: str
+    type: str  # "directory", "file" or "other"
+    size: int | None  # None if the entry couldn't be stat()ed
+    mtime: float | None
+
+
+def scan_directory_details(full_path: str) -> list[EntryDetails]:
+    """List a directory with each entry's metadata in a single scandir() pass.
+
+    Unlike scan_directory(), this stat()s every entry, following symbolic
+    links. The result isn't sorted.
+    """
+    entries = []
+    with os.scandir(full_path) as it:
+        for entry in it:
+            try:
+                stat = entry.stat()
+            except OSError:
+                entries.append(EntryDetails(entry.name, "other", None, None))
+                continue
+            if S_ISDIR(stat.st_mode):
+                kind = "directory"
+            elif S_ISREG(stat.st_mode):
+                kind = "file"
+            else:
+                kind = "other"
+            entries.append(EntryDetails(entry.name, kind, stat.st_size, stat.st_mtime))
+    return entries
+
+
+def sort_details(entries: list[EntryDetails], field: str, reverse: bool) -> None:
+    """Sort entries in place by one of their fields, with unknown values last.
+
+    Ties are broken by name.
+    """
+    entries.sort(key=lambda entry: entry.name)
+    if field != "name":
+        entries.sort(key=lambda entry: _sort_value(entry, field))
+    if reverse:
+        entries.reverse()
+
+
+def _sort_value(entry: EntryDetails, field: str) -> tuple[bool, float | str]:
+    value = getattr(entry, field)
+    return (value is None, value if value is not None else 0)
+
+
+class ListingCache:
+    """
+    Thread-safe LRU cache of sorted directory entries.
+
+    Each directory is cached with the modification time it had when it was
+    scanned. Adding, removing or renaming an entry updates that time, so a
+    change to one directory invalidates only that directory's listing.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.current_entries = 0
+        self.hits = 0
+        self.misses = 0
+        self._listings: OrderedDict[str, tuple[int, list[DirectoryEntry]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._listings)
+
+    def get(self, full_path: str, stat: os.stat_result) -> list[DirectoryEntry]:
+        """Return the directory's entries, scanning it if the cache is stale."""
+        with self._lock:
+            cached = self._listings.get(full_path)
+            if cached is not None and cached[0] == stat.st_mtime_ns:
+                self._listings.move_to_end(full_path)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        entries = scan_directory(full_path)
+        self._put(full_path, stat.st_mtime_ns, entries)
+        return entries
+
+    def invalidate(self, full_path: str) -> None:
+        """Drop the listing of a directory, if cached."""
+        with self._lock:
+            if full_path in self._listings:
+                self._remove(full_path)
+
+    def clear(self) -> None:
+        """Drop all listings."""
+        with self._lock:
+            self._listings.clear()
+            self.current_entries = 0
+
+    def _put(
+        self, full_path: str, mtime_ns: int, entries: list[DirectoryEntry]
+    ) -> None:
+        if len(entries) > self.max_entries:
+            return
+        with self._lock:
+            if full_path in self._listings:
+                self._remove(full_path)
+            while self.current_entries + len(entries) > self.max_entries:
+                self._remove(next(iter(self._listings)))
+            self._listings[full_path] = (mtime_ns, entries)
+            self.current_entries += len(entries)
+
+    def _remove(self, full_path: str) -> None:
+        self.current_entries -= len(self._listings.pop(full_path)[1])
+
+
+class DetailsCache:
+    """
+    Thread-safe LRU cache of directory entries with their metadata, sorted.
+
+    A directory is scanned once for each order it is listed in and kept
+    with the modification time it had, like in ListingCache, so that
+    paging through a large directory scans it once rather than per page.
+    The sizes and mtimes of its entries change without changing the
+    directory, though, so listings are also only reused for ttl seconds.
+    Subscribed to a FileWatcher, a change to an entry drops the listings
+    of its directory, and the ttl can be unlimited.
+    """
+
+    def __init__(
+        self, ttl: float = DEFAULT_DETAILS_TTL, max_entries: int = DEFAULT_MAX_DETAILS
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.current_entries = 0
+        self.hits = 0
+        self.misses = 0
+        # (directory, sort field, reverse) to expiry, mtime and entries
+        self._listings: OrderedDict[
+            tuple[str, str, bool], tuple[float, int, list[EntryDetails]]
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by invalidations, so that a scan racing with one isn't
+        # cached after it.
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._listings)
+
+    def get(
+        self, full_path: str, stat: os.stat_result, field: str, reverse: bool
+    ) -> list[EntryDetails]:
+        """Return the directory's entries sorted by a field, scanning if stale.
+
+        The list is shared with other requests and must not be modified.
+        """
+        key = (full_path, field, reverse)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._listings.get(key)
+            if cached is not None and cached[0] > now and cached[1] == stat.st_mtime_ns:
+                self._listings.move_to_end(key)
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+            generation = self._generation
+        entries = scan_directory_details(full_path)
+        sort_details(entries, field, reverse)
+        if len(entries) > self.max_entries:
+            return entries
+        with self._lock:
+            if generation != self._generation:
+                return entries
+            if key in self._listings:
+                self._remove(key)
+            while self.current_entries + len(entries) > self.max_entries:
+                self._remove(next(iter(self._listings)))
+            self._listings[key] = (now + self.ttl, stat.st_mtime_ns, entries)
+            self.current_entries += len(entries)
+        return entries
+
+    def invalidate(self, full_path: str) -> None:
+        """Drop the listings of a directory, and of the directory holding it."""
+        parent = os.path.dirname(full_path)
+        with self._lock:
+            for key in [k for k in self._listings if k[0] in (full_path, parent)]:
+                self._remove(key)
+            self._generation += 1
+
+    def clear(self) -> None:
+        """Drop all listings."""
+        with self._lock:
+            self._listings.clear()
+            self.current_entries = 0
+            self._generation += 1
+
+    def _remove(self, key: tuple[str, str, bool]) -> None:
+        self.current_entries -= len(self._listings.pop(key)[2])
@@ -0,0 +1,155 @@
+import bisect
+import threading
+import time
+from collections.abc import Sequence
+from types import TracebackType
+
+# Path the metrics are served on when they are enabled.
+METRICS_PATH = "/__metrics"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_DURATION = "simple_web_server_request_duration_seconds"
+DISPATCH_DURATION = "simple_web_server_dispatch_duration_seconds"
+HANDLER_DURATION = "simple_web_server_handler_duration_seconds"
+DISK_READ_DURATION = "simple_web_server_disk_read_duration_seconds"
+SOCKET_WRITE_DURATION = "simple_web_server_socket_write_duration_seconds"
+
+METRIC_HELP = {
+    REQUEST_DURATION: "Time spent serving a GET or HEAD request.",
+    DISPATCH_DURATION: "Time spent finding the resource handler for a request.",
+    HANDLER_DURATION: "Time spent in a resource handler.",
+    DISK_READ_DURATION: "Time spent reading files and directories.",
+    SOCKET_WRITE_DURATION: "Time spent writing response bodies.",
+}
+
+# Upper bounds, in seconds, of the histogram buckets.
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """A thread-safe histogram of observed durations."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last one is +Inf
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+
+    def snapshot(self) -> tuple[list[int], float]:
+        """Return the cumulative bucket counts and the sum of observations."""
+        with self._lock:
+            counts, total = list(self.counts), self.total
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+class Timer:
+    """Context manager observing the time spent in its block."""
+
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: Histogram) -> None:
+        self._histogram = histogram
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class MetricsRegistry:
+    """
+    Histograms of request timings, labelled by resource handler, rendered in
+    the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._histograms: dict[tuple[str, tuple[tuple[str, str], ...]], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        """Return the histogram for a metric and label values, creating it."""
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def time(self, name: str, **labels: str) -> Timer:
+        """Time a block of code into the histogram for name and labels."""
+        return Timer(self.histogram(name, **labels))
+
+    def render(self) -> str:
+        """Render all histograms in the text exposition format."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        lines = []
+        current_name = None
+        for (name, labels), histogram in histograms:
+            if name != current_name:
+                current_name = name
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            counts, total = histogram.snapshot()
+            bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, counts, strict=True):
+                bucket_labels = _format_labels((*labels, ("le", bound)))
+                lines.append(f"{name}_bucket{bucket_labels} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {counts[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+def _format_labels(labels: Sequence[tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
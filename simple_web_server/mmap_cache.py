@@ -0,0 +1,147 @@
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+from simple_web_server.single_flight import SingleFlight
+from simple_web_server.stat_cache import file_identity
+
+# Files of at least this many bytes are mapped when mapping is enabled.
+DEFAULT_MIN_SIZE = 1024 * 1024
+
+# Mappings kept open for reuse once no request is using them.
+DEFAULT_MAX_MAPS = 128
+
+
+class MappedFile:
+    """A read-only memory map of a file and the requests using it."""
+
+    def __init__(self, mapping: mmap.mmap, stat: os.stat_result) -> None:
+        self.mapping = mapping
+        self.identity = file_identity(stat)
+        self.refs = 0
+        self.retired = False  # Set once the cache no longer hands it out
+
+    def close(self) -> None:
+        try:
+            self.mapping.close()
+        except BufferError:
+            # A writer still holds a view; the map is unmapped once that view
+            # and this object are garbage collected.
+            pass
+
+
+class MmapCache:
+    """
+    Thread-safe cache of read-only memory maps of large files.
+
+    A file is mapped once and shared by every request for it, which then
+    writes straight from the page cache instead of copying the file into
+    the process. Mappings are reference counted: one that is evicted, or
+    whose file changed, is unmapped once the last request using it calls
+    release(). Requests that miss on a file while it is being mapped wait
+    for that mapping rather than opening and mapping the file themselves.
+
+    Files must be replaced (written elsewhere and renamed into place) rather
+    than truncated in place, as reading a mapped page past the new end of a
+    file kills the process with SIGBUS.
+    """
+
+    def __init__(
+        self, min_size: int = DEFAULT_MIN_SIZE, max_maps: int = DEFAULT_MAX_MAPS
+    ) -> None:
+        self.min_size = max(min_size, 1)  # Empty files can't be mapped
+        self.max_maps = max_maps
+        self.hits = 0
+        self.misses = 0
+        self._maps: OrderedDict[str, MappedFile] = OrderedDict()
+        # A mapping is no result held in memory, so no byte budget applies
+        self.single_flight: SingleFlight[MappedFile | None] = SingleFlight()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._maps)
+
+    def can_map(self, size: int) -> bool:
+        """Check if a file of this size is served from a mapping."""
+        return size >= self.min_size
+
+    def acquire(self, full_path: str, stat: os.stat_result) -> MappedFile | None:
+        """Return a mapping of the file, which must be passed to release().
+
+        Returns:
+            None if the file no longer matches stat.
+
+        Raises:
+            OSError: If the file can't be opened or mapped.
+        """
+        identity = file_identity(stat)
+        mapped = self._use(full_path, identity)
+        if mapped is not None:
+            return mapped
+
+        leading: list[MappedFile | None] = []
+
+        def map_file() -> MappedFile | None:
+            leading.append(self._map(full_path, stat))
+            return leading[0]
+
+        shared = self.single_flight.do((full_path, identity), 0, map_file)
+        if leading or shared is None:
+            return shared
+        # Mapped by a concurrent request, unless it was evicted since
+        return self._use(full_path, identity) or self._map(full_path, stat)
+
+    def release(self, mapped: MappedFile) -> None:
+        """Stop using a mapping returned by acquire()."""
+        with self._lock:
+            mapped.refs -= 1
+            close = mapped.retired and mapped.refs == 0
+        if close:
+            mapped.close()
+
+    def clear(self) -> None:
+        """Retire all mappings; those in use are unmapped once released."""
+        with self._lock:
+            maps = list(self._maps.values())
+            self._maps.clear()
+            for mapped in maps:
+                self._retire(mapped)
+
+    def _use(
+        self, full_path: str, identity: tuple[int, int, int, int]
+    ) -> MappedFile | None:
+        """Take a reference to the cached mapping of a file, if it's current."""
+        with self._lock:
+            mapped = self._maps.get(full_path)
+            if mapped is None or mapped.identity != identity:
+                return None
+            self._maps.move_to_end(full_path)
+            mapped.refs += 1
+            self.hits += 1
+            return mapped
+
+    def _map(self, full_path: str, stat: os.stat_result) -> MappedFile | None:
+        """Map a file into the cache, holding a reference for the caller."""
+        identity = file_identity(stat)
+        with self._lock:
+            self.misses += 1
+        with open(full_path, "rb") as file:
+            if file_identity(os.fstat(file.fileno())) != identity:
+                return None
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        mapped = MappedFile(mapping, stat)
+        mapped.refs = 1
+        with self._lock:
+            stale = self._maps.pop(full_path, None)
+            if stale is not None:
+                self._retire(stale)
+            self._maps[full_path] = mapped
+            while len(self._maps) > self.max_maps:
+                self._retire(self._maps.popitem(last=False)[1])
+        return mapped
+
+    def _retire(self, mapped: MappedFile) -> None:
+        mapped.retired = True
+        if mapped.refs == 0:
+            mapped.close()
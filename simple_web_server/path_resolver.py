@@ -0,0 +1,108 @@
+import os
+import threading
+import urllib.parse
+from collections import OrderedDict
+from dataclasses import dataclass
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+# Characters that separate path components on this platform.
+_SEPARATORS = tuple({"/", os.sep, os.altsep or "/"})
+
+
+@dataclass(frozen=True)
+class ResolvedPath:
+    """Where a request target points to under the document root."""
+
+    url_path: str  # Decoded and normalised, keeping a trailing slash
+    full_path: str  # Without a trailing slash, the same for "/dir" and "/dir/"
+
+    @property
+    def is_directory_path(self) -> bool:
+        """Whether the URL ends with a slash, which only a directory matches."""
+        return self.url_path.endswith("/")
+
+
+def normalize_url_path(path: str) -> str | None:
+    """Percent-decode a URL path and resolve its "." and ".." segments.
+
+    Bytes that aren't UTF-8 are decoded the way os.fsdecode() would, so that
+    any file name can be requested.
+
+    Returns:
+        None if the path contains a NUL byte or an encoded slash, or climbs
+        above the root.
+    """
+    segments: list[str] = []
+    for raw_segment in path.split("/"):
+        segment = urllib.parse.unquote(raw_segment, errors="surrogateescape")
+        if segment in ("", "."):
+            continue
+        if segment == "..":
+            if not segments:
+                return None
+            segments.pop()
+        elif "\0" in segment or any(sep in segment for sep in _SEPARATORS):
+            return None  # An encoded separator would name another path
+        else:
+            segments.append(segment)
+    if not segments:
+        return "/"
+    last_segment = urllib.parse.unquote(path.rsplit("/", 1)[-1])
+    trailing_slash = last_segment in ("", ".", "..")
+    return "/" + "/".join(segments) + ("/" if trailing_slash else "")
+
+
+class PathResolver:
+    """
+    Thread-safe, memoising mapping of request targets to paths under a root.
+
+    The query string is dropped and the path is decoded and normalised once,
+    then remembered in a bounded LRU, so repeated requests for a path cost a
+    single dict lookup. Targets that would escape the root are rejected.
+
+    The root is fixed when the resolver is created; without one, paths are
+    resolved against the working directory at the time of each request.
+    """
+
+    def __init__(
+        self, root: str | None = None, max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> None:
+        self.root = os.path.abspath(root) if root is not None else None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._resolved: OrderedDict[tuple[str, str], ResolvedPath | None] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._resolved)
+
+    def resolve(self, target: str) -> ResolvedPath | None:
+        """Resolve a request target, or return None if it isn't allowed."""
+        root = self.root if self.root is not None else os.getcwd()
+        key = (root, urllib.parse.urlsplit(target).path)
+        with self._lock:
+            if key in self._resolved:
+                self._resolved.move_to_end(key)
+                self.hits += 1
+                return self._resolved[key]
+            self.misses += 1
+        resolved = _resolve(root, key[1])
+        with self._lock:
+            self._resolved[key] = resolved
+            while len(self._resolved) > self.max_entries:
+                self._resolved.popitem(last=False)
+        return resolved
+
+
+def _resolve(root: str, path: str) -> ResolvedPath | None:
+    url_path = normalize_url_path(path)
+    if url_path is None:
+        return None
+    relative = url_path.strip("/")
+    if not relative:
+        return ResolvedPath(url_path, root)
+    return ResolvedPath(url_path, os.path.join(root, *relative.split("/")))
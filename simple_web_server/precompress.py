@@ -0,0 +1,95 @@
+"""
+Precompress the static files in a directory tree.
+
+Writes a gzip-compressed .gz sibling next to every compressible file, which
+FileHandler then serves to clients that accept gzip instead of compressing the
+file on the fly. Run it with:
+
+    python -m simple_web_server.precompress [--force] [ROOT]
+"""
+
+import argparse
+import gzip
+import mimetypes
+import os
+from collections.abc import Sequence
+
+from simple_web_server.compression import (
+    MIN_COMPRESS_SIZE,
+    PRECOMPRESSED_SUFFIXES,
+    is_compressible,
+)
+
+PRECOMPRESS_LEVEL = 9
+
+
+def precompress_file(full_path: str, force: bool = False) -> bool:
+    """Write full_path + ".gz" unless an up-to-date one already exists.
+
+    Returns:
+        True if a compressed file was written.
+    """
+    target = full_path + ".gz"
+    stat = os.stat(full_path)
+    if not force:
+        try:
+            if os.stat(target).st_mtime_ns >= stat.st_mtime_ns:
+                return False
+        except FileNotFoundError:
+            pass
+    with open(full_path, "rb") as file:
+        compressed = gzip.compress(file.read(), PRECOMPRESS_LEVEL, mtime=0)
+    temp_path = f"{target}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(compressed)
+    os.replace(temp_path, target)  # Readers never see a partial file
+    return True
+
+
+def precompress_tree(
+    root: str, min_size: int = MIN_COMPRESS_SIZE, force: bool = False
+) -> list[str]:
+    """Precompress every compressible file of at least min_size under root.
+
+    Returns:
+        The paths of the files that were compressed.
+    """
+    suffixes = tuple(suffix for _, suffix in PRECOMPRESSED_SUFFIXES)
+    compressed = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith(suffixes):
+                continue
+            ctype, encoding = mimetypes.guess_type(name)
+            if ctype is None or encoding is not None or not is_compressible(ctype):
+                continue
+            full_path = os.path.join(dirpath, name)
+            if os.path.getsize(full_path) < min_size:
+                continue
+            if precompress_file(full_path, force):
+                compressed.append(full_path)
+    return compressed
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m simple_web_server.precompress",
+        description="Write .gz siblings for the compressible files in a tree.",
+    )
+    parser.add_argument("root", nargs="?", default=".", help="directory to process")
+    parser.add_argument(
+        "--min-size",
+        type=int,
+        default=MIN_COMPRESS_SIZE,
+        help="skip files smaller than this many bytes",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="recompress up-to-date files too"
+    )
+    args = parser.parse_args(argv)
+    for path in precompress_tree(args.root, args.min_size, args.force):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
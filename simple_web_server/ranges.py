@@ -0,0 +1,182 @@
+import email.utils
+import os
+import secrets
+from collections.abc import Callable, Sequence
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from simple_web_server.__main__ import RequestHandler
+
+# Requests for more ranges than this are answered with the whole file, so a
+# client can't make the server build huge multipart responses.
+MAX_RANGES = 64
+
+
+class RangeNotSatisfiableError(Exception):
+    """None of the requested byte ranges overlap the file."""
+
+
+def parse_range(header: str, size: int) -> list[tuple[int, int]] | None:
+    """Parse a Range header into inclusive (first, last) byte positions.
+
+    Returns:
+        The satisfiable ranges in the order requested, or None if the header
+        is malformed, uses a unit other than bytes or asks for too many
+        ranges, in which case it should be ignored.
+
+    Raises:
+        RangeNotSatisfiableError: If the header is valid but no range
+            overlaps the file.
+    """
+    unit, _, range_set = header.partition("=")
+    if unit.strip().lower() != "bytes" or not range_set:
+        return None
+    specs = range_set.split(",")
+    if len(specs) > MAX_RANGES:
+        return None
+    ranges = []
+    for spec in specs:
+        first_text, dash, last_text = spec.strip().partition("-")
+        if not dash:
+            return None
+        if not first_text:
+            # Suffix range: the last N bytes
+            if not _is_digits(last_text):
+                return None
+            suffix = int(last_text)
+            if suffix > 0 and size > 0:
+                ranges.append((max(size - suffix, 0), size - 1))
+            continue
+        if not _is_digits(first_text) or (last_text and not _is_digits(last_text)):
+            return None
+        first = int(first_text)
+        if last_text and int(last_text) < first:
+            return None
+        if first < size:
+            last = int(last_text) if last_text else size - 1
+            ranges.append((first, min(last, size - 1)))
+    if not ranges:
+        raise RangeNotSatisfiableError(header)
+    return ranges
+
+
+def if_range_matches(header: str, etag: str, stat: os.stat_result) -> bool:
+    """Check if an If-Range header still describes the current file."""
+    header = header.strip()
+    if header.startswith(('"', "W/")):
+        # Ranges may only be combined with a strong validator
+        return not header.startswith("W/") and header == etag
+    try:
+        date = email.utils.parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return date.tzinfo is not None and int(stat.st_mtime) == date.timestamp()
+
+
+def requested_ranges(
+    request_handler: "RequestHandler", etag: str, stat: os.stat_result, size: int
+) -> list[tuple[int, int]] | None:
+    """Return the byte ranges to send, or None to send the whole file.
+
+    Args:
+        size: The length of the representation being sent, which differs
+            from the file's size when it is sent compressed.
+
+    Raises:
+        RangeNotSatisfiableError: If no requested range overlaps the file.
+    """
+    range_header = request_handler.headers.get("Range")
+    if range_header is None:
+        return None
+    if_range = request_handler.headers.get("If-Range")
+    if if_range is not None and not if_range_matches(if_range, etag, stat):
+        return None
+    return parse_range(range_header, size)
+
+
+def send_range_not_satisfiable(request_handler: "RequestHandler", size: int) -> None:
+    """Send a 416 response telling the client the current length."""
+    request_handler.send_response(416)
+    request_handler.send_header("Content-Range", f"bytes */{size}")
+    request_handler.send_header("Content-Length", "0")
+    request_handler.end_headers()
+
+
+def send_ranges(
+    request_handler: "RequestHandler",
+    ranges: Sequence[tuple[int, int]],
+    size: int,
+    headers: Sequence[tuple[str, str]],
+    send_slice: Callable[[int, int], int],
+) -> None:
+    """Send a 206 Partial Content response for the given byte ranges.
+
+    Args:
+        request_handler: The main RequestHandler instance.
+        ranges: Inclusive (first, last) byte positions to send.
+        size: The full length of the representation.
+        headers: The headers a full 200 response would have had.
+        send_slice: Writes count bytes starting at offset as part of the
+            body and returns the number of bytes written.
+    """
+    content_type = "application/octet-stream"
+    other_headers = []
+    for name, value in headers:
+        if name.lower() == "content-type":
+            content_type = value
+        elif name.lower() != "content-length":
+            other_headers.append((name, value))
+
+    request_handler.send_response(206)
+    for name, value in other_headers:
+        request_handler.send_header(name, value)
+
+    if len(ranges) == 1:
+        first, last = ranges[0]
+        request_handler.send_header("Content-type", content_type)
+        request_handler.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+        request_handler.send_header("Content-Length", str(last - first + 1))
+        request_handler.end_headers()
+        _send_part(request_handler, send_slice, first, last)
+        return
+
+    boundary = secrets.token_hex(16)
+    part_headers = [
+        (
+            f"--{boundary}\r\n"
+            f"Content-type: {content_type}\r\n"
+            f"Content-Range: bytes {first}-{last}/{size}\r\n\r\n"
+        ).encode("latin-1")
+        for first, last in ranges
+    ]
+    closing = f"--{boundary}--\r\n".encode("latin-1")
+    length = len(closing) + sum(
+        len(part) + (last - first + 1) + 2
+        for part, (first, last) in zip(part_headers, ranges, strict=True)
+    )
+    request_handler.send_header(
+        "Content-type", f"multipart/byteranges; boundary={boundary}"
+    )
+    request_handler.send_header("Content-Length", str(length))
+    request_handler.end_headers()
+    for part, (first, last) in zip(part_headers, ranges, strict=True):
+        request_handler.wfile.write(part)
+        _send_part(request_handler, send_slice, first, last)
+        request_handler.wfile.write(b"\r\n")
+    request_handler.wfile.write(closing)
+
+
+def _send_part(
+    request_handler: "RequestHandler",
+    send_slice: Callable[[int, int], int],
+    first: int,
+    last: int,
+) -> None:
+    if send_slice(first, last - first + 1) < last - first + 1:
+        # The file shrank while sending; the framing is now broken
+        request_handler.close_connection = True
+
+
+def _is_digits(text: str) -> bool:
+    """Check if text is an ASCII number, unlike str.isdigit() which takes "²"."""
+    return text.isascii() and text.isdigit()
@@ -0,0 +1,235 @@
+import math
+import mimetypes
+import os
+import struct
+import urllib.parse
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, ClassVar
+
+from simple_web_server.archive import Archive, ArchiveMember
+from simple_web_server.compression import (
+    ON_THE_FLY_ENCODINGS,
+    accepted_encoding,
+    compress_stream,
+    encoded_etag,
+)
+from simple_web_server.metrics import SOCKET_WRITE_DURATION
+from simple_web_server.ranges import (
+    RangeNotSatisfiableError,
+    requested_ranges,
+    send_range_not_satisfiable,
+    send_ranges,
+)
+from simple_web_server.transfer import send_buffer
+from simple_web_server.validators import (
+    format_last_modified,
+    is_not_modified,
+    make_etag,
+    send_not_modified,
+)
+
+from .directory_handler import DEFAULT_PAGE_SIZE, render_listing, requested_page
+from .resource_handler import Resource, ResourceHandler
+
+if TYPE_CHECKING:
+    from simple_web_server.__main__ import RequestHandler
+
+# Header of a gzip member with no name and no mtime, around a raw deflate
+# stream: magic, deflate method, no flags, zero mtime, no extra flags, and
+# an unknown operating system.
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+class ArchiveHandler(ResourceHandler):
+    """
+    Serves files and directory listings out of an Archive.
+
+    The archive is mounted at root: root/css/site.css is served from the
+    member css/site.css, looked up in the archive's index rather than on
+    disk. Paths that aren't in the archive are left to the next handler.
+
+    Stored members are sent straight from the archive's memory map, byte
+    ranges included. Deflated zip members are sent as they are stored,
+    between a gzip header and trailer, to clients that accept gzip, and
+    are inflated while they are sent to other clients.
+    """
+
+    archive: ClassVar[Archive | None] = None
+    root: ClassVar[str] = ""
+    page_size: ClassVar[int] = DEFAULT_PAGE_SIZE
+    metrics_name = "archive"
+    # Members are looked up in the index, so the disk is never stat()ed
+    needs_stat = False
+
+    def member(self, full_path: str) -> ArchiveMember | None:
+        """Return the archive member a path under root maps to, if any."""
+        if self.archive is None:
+            return None
+        if full_path == self.root:
+            return self.archive.member("")
+        prefix = self.root.rstrip(os.sep) + os.sep
+        if not full_path.startswith(prefix):
+            return None
+        return self.archive.member(full_path[len(prefix) :].replace(os.sep, "/"))
+
+    def can_handle(self, full_path: str) -> bool:
+        """Handle if the path is in the archive."""
+        return self.member(full_path) is not None
+
+    def can_handle_resource(self, resource: Resource) -> bool:
+        """Handle if the path is in the archive, whatever is on disk."""
+        member = self.member(resource.full_path)
+        if member is None:
+            return False
+        return member.is_dir or not resource.directory_only
+
+    def handle(self, request_handler: "RequestHandler", full_path: str) -> None:
+        """Send the member's content, or a listing if it is a directory."""
+        member = self.member(full_path)
+        if self.archive is None or member is None:
+            request_handler.send_error(404, f"Not found: {request_handler.path}")
+        elif member.is_dir:
+            self._send_listing(request_handler, self.archive, member)
+        elif not member.deflated:
+            self._send_stored(request_handler, self.archive, member)
+        elif accepted_encoding(request_handler, ("gzip",)) == "gzip":
+            self._send_gzipped(request_handler, self.archive, member)
+        else:
+            self._send_inflated(request_handler, self.archive, member)
+
+    def _send_stored(
+        self, request_handler: "RequestHandler", archive: Archive, member: ArchiveMember
+    ) -> None:
+        """Send a stored member, or the byte ranges the client asked for."""
+        stat = member.stat
+        etag = make_etag(stat)
+        if is_not_modified(request_handler, etag, stat):
+            send_not_modified(request_handler, etag, stat)
+            return
+        headers = (
+            ("Content-type", self.content_type(member)),
+            ("Content-Length", str(stat.st_size)),
+            ("Accept-Ranges", "bytes"),
+            ("ETag", etag),
+            ("Last-Modified", format_last_modified(stat)),
+        )
+        if request_handler.command == "HEAD":
+            self.send_headers(request_handler, headers)
+            return
+        body = archive.data(member)
+
+        def send_slice(offset: int, count: int) -> int:
+            with request_handler.timer(
+                SOCKET_WRITE_DURATION, handler=self.metrics_name
+            ):
+                return send_buffer(request_handler.wfile, body, offset, count)
+
+        try:
+            ranges = requested_ranges(request_handler, etag, stat, stat.st_size)
+        except RangeNotSatisfiableError:
+            send_range_not_satisfiable(request_handler, stat.st_size)
+            return
+        if ranges is not None:
+            send_ranges(request_handler, ranges, stat.st_size, headers, send_slice)
+            return
+        self.send_headers(request_handler, headers)
+        send_slice(0, stat.st_size)
+
+    def _send_gzipped(
+        self, request_handler: "RequestHandler", archive: Archive, member: ArchiveMember
+    ) -> None:
+        """Send a deflated member as it is stored, in the gzip format."""
+        stat = member.stat
+        etag = encoded_etag(make_etag(stat), "gzip")
+        if is_not_modified(request_handler, etag, stat):
+            send_not_modified(request_handler, etag, stat)
+            return
+        body = archive.data(member)
+        # The trailer holds the CRC-32 and length of the inflated content,
+        # which the archive already stores.
+        trailer = struct.pack("<II", member.crc32, stat.st_size & 0xFFFFFFFF)
+        headers = (
+            ("Content-type", self.content_type(member)),
+            ("Content-Encoding", "gzip"),
+            ("Content-Length", str(len(GZIP_HEADER) + len(body) + len(trailer))),
+            ("Vary", "Accept-Encoding"),
+            ("ETag", etag),
+            ("Last-Modified", format_last_modified(stat)),
+        )
+        self.send_headers(request_handler, headers)
+        if request_handler.command == "HEAD":
+            return
+        with request_handler.timer(SOCKET_WRITE_DURATION, handler=self.metrics_name):
+            request_handler.wfile.write(GZIP_HEADER)
+            send_buffer(request_handler.wfile, body, 0, len(body))
+            request_handler.wfile.write(trailer)
+
+    def _send_inflated(
+        self, request_handler: "RequestHandler", archive: Archive, member: ArchiveMember
+    ) -> None:
+        """Send a deflated member, inflating it piece by piece."""
+        stat = member.stat
+        etag = make_etag(stat)
+        if is_not_modified(request_handler, etag, stat):
+            send_not_modified(request_handler, etag, stat)
+            return
+        headers = (
+            ("Content-type", self.content_type(member)),
+            ("Content-Length", str(stat.st_size)),
+            ("Vary", "Accept-Encoding"),
+            ("ETag", etag),
+            ("Last-Modified", format_last_modified(stat)),
+        )
+        self.send_headers(request_handler, headers)
+        if request_handler.command == "HEAD":
+            return
+        sent = 0
+        with request_handler.timer(SOCKET_WRITE_DURATION, handler=self.metrics_name):
+            for piece in archive.inflate(member):
+                request_handler.wfile.write(piece)
+                sent += len(piece)
+        if sent != stat.st_size:
+            # The archive is corrupt; the framing is now broken
+            request_handler.close_connection = True
+
+    def _send_listing(
+        self, request_handler: "RequestHandler", archive: Archive, member: ArchiveMember
+    ) -> None:
+        """Send a page of an HTML listing of a directory of the archive."""
+        url = urllib.parse.urlsplit(request_handler.path)
+        page = requested_page(url.query)
+        stat = member.stat
+        etag = make_etag(stat, weak=True)
+        coding = accepted_encoding(request_handler, ON_THE_FLY_ENCODINGS)
+        if coding is not None:
+            etag = encoded_etag(etag, coding)
+        if is_not_modified(request_handler, etag, stat):
+            send_not_modified(request_handler, etag, stat)
+            return
+
+        entries = archive.listing(member.name)
+        page_count = max(math.ceil(len(entries) / self.page_size), 1)
+        if page > page_count:
+            request_handler.send_error(404, f"No page {page} in listing of {url.path}")
+            return
+        start = (page - 1) * self.page_size
+        parts = render_listing(
+            url.path, entries[start : start + self.page_size], page, page_count
+        )
+        body: Iterator[bytes] = (part.encode("utf-8") for part in parts)
+        headers = [("Content-type", "text/html; charset=utf-8")]
+        if coding is not None:
+            body = compress_stream(body, coding)
+            headers.append(("Content-Encoding", coding))
+        headers += [
+            ("Vary", "Accept-Encoding"),
+            ("ETag", etag),
+            ("Last-Modified", format_last_modified(stat)),
+        ]
+        with request_handler.timer(SOCKET_WRITE_DURATION, handler=self.metrics_name):
+            self.send_stream(request_handler, headers, body)
+
+    def content_type(self, member: ArchiveMember) -> str:
+        """Guess the content type from the member's name."""
+        ctype, _ = mimetypes.guess_type(member.name)
+        return ctype or "application/octet-stream"
@@ -1,51 +1,365 @@
+import html
+import json
+import math
 import os
-from typing import TYPE_CHECKING
+import urllib.parse
+from collections.abc import Hashable, Iterable, Iterator
+from typing import TYPE_CHECKING, ClassVar
 
-from .resource_handler import ResourceHandler
+from simple_web_server.compression import (
+    ON_THE_FLY_ENCODINGS,
+    accepted_encoding,
+    compress_stream,
+    encoded_etag,
+)
+from simple_web_server.content_cache import CachedContent, ContentCache
+from simple_web_server.listing_cache import (
+    DetailsCache,
+    DirectoryEntry,
+    EntryDetails,
+    ListingCache,
+    scan_directory,
+    scan_directory_details,
+    sort_details,
+)
+from simple_web_server.metrics import DISK_READ_DURATION, SOCKET_WRITE_DURATION
+from simple_web_server.validators import (
+    format_last_modified,
+    is_not_modified,
+    make_etag,
+    send_not_modified,
+)
+
+from .resource_handler import Resource, ResourceHandler
 
 if TYPE_CHECKING:
     from simple_web_server.__main__ import RequestHandler
 
+DEFAULT_PAGE_SIZE = 1000
+
+JSON_CONTENT_TYPE = "application/json"
+
+# Fields a JSON listing can be sorted by, with a "-" prefix for descending.
+JSON_SORT_FIELDS = ("name", "type", "size", "mtime")
+
+
+def parse_accept(header: str) -> dict[str, float]:
+    """Parse an Accept header into a mapping of media range to q-value.
+
+    Media type parameters, such as charset, are dropped from the ranges.
+    """
+    accepted: dict[str, float] = {}
+    for item in header.split(","):
+        media_range, *params = item.split(";")
+        media_range = media_range.strip().lower()
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+                break  # Anything after the weight is an extension
+        accepted[media_range] = max(quality, accepted.get(media_range, 0.0))
+    return accepted
+
+
+def wants_json(accept: str | None, query: dict[str, list[str]]) -> bool:
+    """Check if a listing should be sent as JSON rather than HTML.
+
+    The format query parameter decides if present; otherwise JSON is sent
+    to clients that prefer it to HTML, or that name it explicitly and
+    accept it as much as HTML.
+    """
+    if "format" in query:
+        return query["format"][0] == "json"
+    if not accept:
+        return False
+    accepted = parse_accept(accept)
+    json_quality, json_named = _media_quality(accepted, JSON_CONTENT_TYPE)
+    html_quality, _ = _media_quality(accepted, "text/html")
+    if json_quality == html_quality:
+        # A wildcard such as curl's */* shouldn't turn listings into JSON
+        return json_quality > 0 and json_named
+    return json_quality > html_quality
+
 
 class DirectoryHandler(ResourceHandler):
     """
     Handles requests for directories by listing their contents.
+
+    Listings are split into pages of page_size entries, selected with the
+    page query parameter. The scanned entries are kept in listing_cache and
+    the rendered pages in page_cache; both are validated by the directory's
+    mtime, so only a changed directory is scanned and rendered again. Pages
+    that aren't cached are streamed to the client while they are rendered.
+
+    Clients asking for JSON, with an Accept header or format=json, get every
+    entry's type, size and mtime instead, sorted by the sort parameter and
+    sliced by offset and limit. The sorted entries are kept in details_cache,
+    so each slice of a large directory doesn't scan it again; as sizes and
+    mtimes change without changing the directory, they are kept for a few
+    seconds only.
     """
 
+    listing_cache: ClassVar[ListingCache | None] = ListingCache()
+    details_cache: ClassVar[DetailsCache | None] = DetailsCache()
+    page_cache: ClassVar[ContentCache | None] = ContentCache()
+    page_size: ClassVar[int] = DEFAULT_PAGE_SIZE
+    metrics_name = "directory"
+
     def can_handle(self, full_path: str) -> bool:
         """Handle if the path is a directory."""
         return os.path.isdir(full_path)
 
+    def can_handle_resource(self, resource: Resource) -> bool:
+        """Handle if the path was found to be a directory."""
+        return resource.is_dir
+
     def handle(self, request_handler: "RequestHandler", full_path: str) -> None:
         """Generate and send an HTML directory listing."""
+        self._send_listing(request_handler, full_path, None)
+
+    def handle_resource(
+        self, request_handler: "RequestHandler", resource: Resource
+    ) -> None:
+        """Send the listing, reusing the directory's stat() result."""
+        self._send_listing(request_handler, resource.full_path, resource.stat)
+
+    def _send_listing(
+        self,
+        request_handler: "RequestHandler",
+        full_path: str,
+        stat: os.stat_result | None,
+    ) -> None:
+        url = urllib.parse.urlsplit(request_handler.path)
+        query = urllib.parse.parse_qs(url.query)
+        if wants_json(request_handler.headers.get("Accept"), query):
+            self._send_json_listing(request_handler, full_path, stat, url.path, query)
+            return
         try:
-            dir_contents = os.listdir(full_path)
-            title = f"Directory listing for {request_handler.path}"
-            page_parts = [
-                f"<html><head><title>{title}</title></head>",
-                f"<body><h1>{title}</h1><hr><ul>",
+            # Entries are only added, removed or renamed by changing the
+            # directory, so its mtime also validates the listing.
+            if stat is None:
+                stat = os.stat(full_path)
+            page = requested_page(url.query)
+            etag = make_etag(stat, weak=True)
+            coding = accepted_encoding(request_handler, ON_THE_FLY_ENCODINGS)
+            if coding is not None:
+                etag = encoded_etag(etag, coding)
+            if is_not_modified(request_handler, etag, stat):
+                send_not_modified(request_handler, etag, stat)
+                return
+
+            cache = self.page_cache
+            key = (full_path, url.path, page, coding)
+            entry = cache.get(key, stat) if cache is not None else None
+            if entry is not None:
+                self.send_headers(request_handler, entry.headers)
+                if request_handler.command == "HEAD":
+                    return
+                with request_handler.timer(
+                    SOCKET_WRITE_DURATION, handler=self.metrics_name
+                ):
+                    request_handler.wfile.write(entry.body)
+                return
+
+            with request_handler.timer(DISK_READ_DURATION, handler=self.metrics_name):
+                if self.listing_cache is not None:
+                    entries = self.listing_cache.get(full_path, stat)
+                else:
+                    entries = scan_directory(full_path)
+            page_count = max(math.ceil(len(entries) / self.page_size), 1)
+            if page > page_count:
+                request_handler.send_error(
+                    404, f"No page {page} in listing of {url.path}"
+                )
+                return
+            start = (page - 1) * self.page_size
+            parts = render_listing(
+                url.path, entries[start : start + self.page_size], page, page_count
+            )
+            body: Iterator[bytes] = (part.encode("utf-8") for part in parts)
+            if coding is not None:
+                body = compress_stream(body, coding)
+            headers = [("Content-type", "text/html; charset=utf-8")]
+            if coding is not None:
+                headers.append(("Content-Encoding", coding))
+            headers += [
+                ("Vary", "Accept, Accept-Encoding"),
+                ("ETag", etag),
+                ("Last-Modified", format_last_modified(stat)),
             ]
-            for item in sorted(dir_contents):
-                link_path = item
-                if os.path.isdir(os.path.join(full_path, item)):
-                    link_path += "/"  # Add trailing slash for directories
-                page_parts.append(f"<li><a href='{link_path}'>{item}</a></li>")
-
-            page_parts.append("</ul><hr></body></html>")
-            html_content = "\n".join(page_parts)
-
-            encoded_content = html_content.encode("utf-8")
-            request_handler.send_response(200)
-            request_handler.send_header("Content-type", "text/html; charset=utf-8")
-            request_handler.send_header("Content-Length", str(len(encoded_content)))
-            request_handler.end_headers()
-            request_handler.wfile.write(encoded_content)
+            if cache is not None:
+                body = self._caching(body, cache, key, stat, headers)
         except OSError as e:
             error_msg = (
                 f"Permission denied accessing directory: {request_handler.path}, "
                 f"Error: {e}"
             )
             request_handler.send_error(403, error_msg)
+            return
         except Exception as e:
             error_msg = f"Error listing directory: {request_handler.path}, Error: {e}"
             request_handler.send_error(500, error_msg)
+            return
+
+        # Sent while it is rendered, so the length isn't known up front. Errors
+        # from here on come after the headers and are left to the caller.
+        with request_handler.timer(SOCKET_WRITE_DURATION, handler=self.metrics_name):
+            self.send_stream(request_handler, headers, body)
+
+    def _send_json_listing(
+        self,
+        request_handler: "RequestHandler",
+        full_path: str,
+        stat: os.stat_result | None,
+        url_path: str,
+        query: dict[str, list[str]],
+    ) -> None:
+        """Send a slice of the directory's entries, with metadata, as JSON."""
+        try:
+            sort = query.get("sort", ["name"])[0]
+            reverse = sort.startswith("-")
+            sort = sort.removeprefix("-")
+            offset = int(query.get("offset", ["0"])[0])
+            limit = int(query.get("limit", [str(self.page_size)])[0])
+            if sort not in JSON_SORT_FIELDS or offset < 0 or limit < 0:
+                raise ValueError(sort)
+        except ValueError:
+            request_handler.send_error(
+                400, f"Invalid listing parameters: {urllib.parse.urlencode(query)}"
+            )
+            return
+        try:
+            with request_handler.timer(DISK_READ_DURATION, handler=self.metrics_name):
+                if self.details_cache is not None:
+                    if stat is None:
+                        stat = os.stat(full_path)
+                    entries = self.details_cache.get(full_path, stat, sort, reverse)
+                else:
+                    entries = scan_directory_details(full_path)
+                    sort_details(entries, sort, reverse)
+        except OSError as e:
+            request_handler.send_error(
+                403, f"Error listing directory: {request_handler.path}, Error: {e}"
+            )
+            return
+
+        body: Iterator[bytes] = (
+            part.encode("utf-8")
+            for part in self._render_json(
+                url_path, entries[offset : offset + limit], len(entries), offset
+            )
+        )
+        coding = accepted_encoding(request_handler, ON_THE_FLY_ENCODINGS)
+        if coding is not None:
+            body = compress_stream(body, coding)
+        headers = [("Content-type", JSON_CONTENT_TYPE)]
+        if coding is not None:
+            headers.append(("Content-Encoding", coding))
+        headers += [("Vary", "Accept, Accept-Encoding"), ("Cache-Control", "no-cache")]
+        with request_handler.timer(SOCKET_WRITE_DURATION, handler=self.metrics_name):
+            self.send_stream(request_handler, headers, body)
+
+    def _render_json(
+        self, url_path: str, entries: list[EntryDetails], total: int, offset: int
+    ) -> Iterator[str]:
+        """Render a slice of a listing as a JSON document, an entry at a time."""
+        yield (
+            f'{{"path": {json.dumps(url_path)}, "total": {total}, '
+            f'"offset": {offset}, "entries": ['
+        )
+        for index, entry in enumerate(entries):
+            separator = ",\n" if index else "\n"
+            yield separator + json.dumps(
+                {
+                    "name": entry.name,
+                    "type": entry.type,
+                    "size": entry.size,
+                    "mtime": entry.mtime,
+                }
+            )
+        yield "\n]}"
+
+    def _caching(
+        self,
+        body: Iterable[bytes],
+        cache: ContentCache,
+        key: Hashable,
+        stat: os.stat_result,
+        headers: list[tuple[str, str]],
+    ) -> Iterator[bytes]:
+        """Pass a streamed body through, caching it once it is complete.
+
+        Pieces are only kept while the body still fits in the cache.
+        """
+        pieces: list[bytes] | None = []
+        size = 0
+        for piece in body:
+            if pieces is not None:
+                size += len(piece)
+                if cache.can_cache(size):
+                    pieces.append(piece)
+                else:
+                    pieces = None
+            yield piece
+        if pieces is not None:
+            cached_headers = (headers[0], ("Content-Length", str(size)), *headers[1:])
+            cache.put(
+                key,
+                CachedContent(
+                    stat.st_mtime_ns, stat.st_size, b"".join(pieces), cached_headers
+                ),
+            )
+
+
+def requested_page(query: str) -> int:
+    """Read the 1-based page number of a listing from a query string."""
+    values = urllib.parse.parse_qs(query).get("page")
+    # isdigit() alone takes digits such as "²" that int() doesn't
+    if not values or not (values[0].isascii() and values[0].isdigit()):
+        return 1
+    return max(int(values[0]), 1)
+
+
+def render_listing(
+    url_path: str, entries: list[DirectoryEntry], page: int, page_count: int
+) -> Iterator[str]:
+    """Render one page of a listing as HTML, a line at a time."""
+    title = f"Directory listing for {html.escape(url_path)}"
+    yield f"<html><head><title>{title}</title></head>\n"
+    yield f"<body><h1>{title}</h1><hr><ul>\n"
+    for entry in entries:
+        link_path = urllib.parse.quote(entry.name)
+        if entry.is_dir:
+            link_path += "/"  # Add trailing slash for directories
+        name = html.escape(entry.name)
+        yield f"<li><a href='{link_path}'>{name}</a></li>\n"
+    yield "</ul><hr>\n"
+    if page_count > 1:
+        links = [f"Page {page} of {page_count}"]
+        if page > 1:
+            links.append(f"<a href='?page={page - 1}'>Previous</a>")
+        if page < page_count:
+            links.append(f"<a href='?page={page + 1}'>Next</a>")
+        yield f"<p>{' | '.join(links)}</p>\n"
+    yield "</body></html>"
+
+
+def _media_quality(accepted: dict[str, float], media_type: str) -> tuple[float, bool]:
+    """Find the q-value of the most specific range matching a media type.
+
+    Returns:
+        The q-value, and whether the media type itself was listed.
+    """
+    if media_type in accepted:
+        return accepted[media_type], True
+    type_range = media_type.partition("/")[0] + "/*"
+    for media_range in (type_range, "*/*"):
+        if media_range in accepted:
+            return accepted[media_range], False
+    return 0.0, False
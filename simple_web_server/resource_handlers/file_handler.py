@@ -1,8 +1,37 @@
 import mimetypes  # For guessing content type
+import mmap
 import os
-from typing import TYPE_CHECKING
+from collections.abc import Callable, Hashable
+from typing import TYPE_CHECKING, BinaryIO, ClassVar
 
-from .resource_handler import ResourceHandler
+from simple_web_server.compression import (
+    accepted_encoding,
+    compress,
+    encoded_etag,
+    find_precompressed,
+    is_compressible,
+    offered_encodings,
+)
+from simple_web_server.content_cache import CachedContent, ContentCache
+from simple_web_server.metrics import DISK_READ_DURATION, SOCKET_WRITE_DURATION
+from simple_web_server.mmap_cache import MmapCache
+from simple_web_server.ranges import (
+    RangeNotSatisfiableError,
+    requested_ranges,
+    send_range_not_satisfiable,
+    send_ranges,
+)
+from simple_web_server.single_flight import SingleFlight
+from simple_web_server.stat_cache import stat_or_none
+from simple_web_server.transfer import send_buffer, send_file
+from simple_web_server.validators import (
+    format_last_modified,
+    is_not_modified,
+    make_etag,
+    send_not_modified,
+)
+
+from .resource_handler import Resource, ResourceHandler
 
 if TYPE_CHECKING:
     from simple_web_server.__main__ import RequestHandler
@@ -11,35 +40,374 @@ if TYPE_CHECKING:
 class FileHandler(ResourceHandler):
     """
     Handles requests for existing files on the filesystem.
-    Determines content type and sends the file content.
+    Determines content type and streams the file content, or the requested
+    byte ranges of it.
+
+    Small files are kept in content_cache (shared by all instances) so that
+    frequently requested assets are served from memory. Compressible files
+    are sent with the best content coding the client accepts, preferring
+    precompressed siblings (app.js.br, app.js.gz) and otherwise compressing
+    on the fly into compressed_cache.
+
+    With an mmap_cache, files too large for content_cache are served from
+    memory maps shared by all requests for the same file.
+
+    Concurrent requests that miss the same cache entry share one read, or
+    one compression, through single_flight, so a burst of requests for a
+    newly published file reads it once rather than once per request. Files
+    too large for content_cache are streamed by each request, unless
+    mmap_cache maps them, which it does once for concurrent requests.
     """
 
+    content_cache: ClassVar[ContentCache | None] = ContentCache()
+    compressed_cache: ClassVar[ContentCache | None] = ContentCache()
+    # Maps large files instead of streaming them; None (the default) streams.
+    mmap_cache: ClassVar[MmapCache | None] = None
+    single_flight: ClassVar[SingleFlight[CachedContent | None] | None] = SingleFlight()
+    metrics_name = "file"
+
     def can_handle(self, full_path: str) -> bool:
         """Handle if the path is an existing file."""
         return os.path.isfile(full_path)
 
+    def can_handle_resource(self, resource: Resource) -> bool:
+        """Handle if the path was found to be a file."""
+        return resource.is_file
+
     def handle(self, request_handler: "RequestHandler", full_path: str) -> None:
-        """Read the file and send its content with appropriate headers."""
+        """Send the file content with appropriate headers."""
         try:
-            with open(full_path, "rb") as file:
-                content = file.read()
-
-            # Guess the content type
-            ctype, encoding = mimetypes.guess_type(full_path)
-            if ctype is None:
-                ctype = "application/octet-stream"  # Default if type unknown
-
-            # Send the response using the main request handler
-            request_handler.send_response(200)
-            request_handler.send_header("Content-type", ctype)
-            request_handler.send_header("Content-Length", str(len(content)))
-            request_handler.end_headers()
-            request_handler.wfile.write(content)
+            stat = os.stat(full_path)
         except OSError as e:
             request_handler.send_error(
                 404, f"Could not read file: {request_handler.path}, Error: {e}"
             )  # Using 404 might be suitable if the file becomes inaccessible
-        except Exception as e:
+            return
+        self._send(request_handler, full_path, stat, stat_or_none)
+
+    def handle_resource(
+        self, request_handler: "RequestHandler", resource: Resource
+    ) -> None:
+        """Send the file, reusing the stat() results the dispatcher made."""
+        if resource.stat is None:
+            self.handle(request_handler, resource.full_path)
+            return
+        lookup = request_handler.stat_path
+        self._send(request_handler, resource.full_path, resource.stat, lookup)
+
+    def _send(
+        self,
+        request_handler: "RequestHandler",
+        full_path: str,
+        stat: os.stat_result,
+        lookup: Callable[[str], os.stat_result | None],
+    ) -> None:
+        """Send a file, or a compressed variant of it.
+
+        Args:
+            lookup: Stats the precompressed siblings, returning None for
+                missing ones.
+        """
+        content_type = self.content_type(full_path)
+        if not is_compressible(content_type):
+            self._send_file(request_handler, full_path, stat, content_type, ())
+            return
+
+        vary = ("Vary", "Accept-Encoding")
+        precompressed = find_precompressed(full_path, stat, lookup)
+        available = offered_encodings(
+            precompressed, stat.st_size, self.compressed_cache is not None
+        )
+        coding = accepted_encoding(request_handler, available)
+        if coding in precompressed:
+            path, path_stat = precompressed[coding]
+            extra_headers = (("Content-Encoding", coding), vary)
+            self._send_file(
+                request_handler, path, path_stat, content_type, extra_headers
+            )
+        elif coding is None or not self._send_compressed(
+            request_handler, full_path, stat, content_type, coding
+        ):
+            self._send_file(request_handler, full_path, stat, content_type, (vary,))
+
+    def _send_file(
+        self,
+        request_handler: "RequestHandler",
+        full_path: str,
+        stat: os.stat_result,
+        content_type: str,
+        extra_headers: tuple[tuple[str, str], ...],
+    ) -> None:
+        """Send a file as it is stored on disk."""
+        cache = self.content_cache
+        mmap_cache = self.mmap_cache
+        mapped = None
+        try:
+            etag = make_etag(stat)
+            if is_not_modified(request_handler, etag, stat):
+                send_not_modified(request_handler, etag, stat)
+                return
+            if request_handler.command == "HEAD":
+                # Everything a HEAD response needs is in the stat result
+                headers = self.file_headers(content_type, stat, extra_headers)
+                self.send_headers(request_handler, headers)
+                return
+            entry = cache.get(full_path, stat) if cache is not None else None
+            if entry is None and mmap_cache is not None:
+                if mmap_cache.can_map(stat.st_size):
+                    mapped = mmap_cache.acquire(full_path, stat)
+            if entry is None and mapped is None:
+                file = open(full_path, "rb")
+        except OSError as e:
             request_handler.send_error(
-                500, f"Error sending file: {request_handler.path}, Error: {e}"
+                404, f"Could not read file: {request_handler.path}, Error: {e}"
+            )
+            return
+
+        if entry is not None:
+            # The cached headers are those that don't depend on how the file
+            # was reached, such as through a precompressed sibling.
+            headers = (("Content-type", content_type), *entry.headers, *extra_headers)
+            self._send_content(
+                request_handler, headers, etag, stat, entry.body, stat.st_size
+            )
+            return
+
+        if mmap_cache is not None and mapped is not None:
+            try:
+                headers = self.file_headers(content_type, stat, extra_headers)
+                self._send_content(
+                    request_handler, headers, etag, stat, mapped.mapping, stat.st_size
+                )
+            finally:
+                mmap_cache.release(mapped)
+            return
+
+        with file:
+            try:
+                stat = os.fstat(file.fileno())
+                etag = make_etag(stat)
+                headers = self.file_headers(content_type, stat, extra_headers)
+                if cache is not None and cache.can_cache(stat.st_size):
+
+                    def read_into_cache() -> CachedContent | None:
+                        with request_handler.timer(
+                            DISK_READ_DURATION, handler=self.metrics_name
+                        ):
+                            body = file.read()
+                        if len(body) != stat.st_size:
+                            return None
+                        entry = CachedContent(
+                            stat.st_mtime_ns,
+                            stat.st_size,
+                            body,
+                            self.representation_headers(stat),
+                        )
+                        cache.put(full_path, entry)
+                        return entry
+
+                    entry = self._coalesced(
+                        (full_path, stat.st_mtime_ns, stat.st_size),
+                        stat.st_size,
+                        read_into_cache,
+                    )
+            except Exception as e:
+                request_handler.send_error(
+                    500, f"Error sending file: {request_handler.path}, Error: {e}"
+                )
+                return
+
+            # Uncached files are streamed without holding them in memory
+            source = entry.body if entry is not None else file
+            self._send_content(
+                request_handler, headers, etag, stat, source, stat.st_size
             )
+
+    def file_headers(
+        self,
+        content_type: str,
+        stat: os.stat_result,
+        extra_headers: tuple[tuple[str, str], ...],
+    ) -> tuple[tuple[str, str], ...]:
+        """Build the headers of a file sent as it is stored on disk."""
+        return (
+            ("Content-type", content_type),
+            *self.representation_headers(stat),
+            *extra_headers,
+        )
+
+    def representation_headers(
+        self, stat: os.stat_result
+    ) -> tuple[tuple[str, str], ...]:
+        """Build the headers that only depend on the file's stat() result."""
+        return (
+            ("Content-Length", str(stat.st_size)),
+            ("Accept-Ranges", "bytes"),
+            ("ETag", make_etag(stat)),
+            ("Last-Modified", format_last_modified(stat)),
+        )
+
+    def _send_compressed(
+        self,
+        request_handler: "RequestHandler",
+        full_path: str,
+        stat: os.stat_result,
+        content_type: str,
+        coding: str,
+    ) -> bool:
+        """Send a file compressed on the fly, reusing earlier compressions.
+
+        Returns:
+            False if nothing was sent, because on-the-fly compression is
+            disabled or the file changed while being read.
+        """
+        cache = self.compressed_cache
+        if cache is None:
+            return False
+        etag = encoded_etag(make_etag(stat), coding)
+        if is_not_modified(request_handler, etag, stat):
+            send_not_modified(request_handler, etag, stat)
+            return True
+
+        key = (full_path, coding)
+        entry = cache.get(key, stat)
+        if request_handler.command == "HEAD":
+            if entry is not None:
+                headers = entry.headers
+            else:
+                # The compressed length isn't known without compressing the
+                # file, and a HEAD response may leave it out.
+                headers = self.compressed_headers(content_type, coding, etag, stat)
+            self.send_headers(request_handler, headers)
+            return True
+        if entry is None:
+
+            def compress_into_cache() -> CachedContent | None:
+                with request_handler.timer(
+                    DISK_READ_DURATION, handler=self.metrics_name
+                ):
+                    body = self._read_whole_file(full_path, stat)
+                if body is None:
+                    return None
+                compressed = compress(body, coding)
+                headers = (
+                    ("Content-Length", str(len(compressed))),
+                    *self.compressed_headers(content_type, coding, etag, stat),
+                )
+                entry = CachedContent(
+                    stat.st_mtime_ns, stat.st_size, compressed, headers
+                )
+                cache.put(key, entry)
+                return entry
+
+            entry = self._coalesced(
+                (key, stat.st_mtime_ns, stat.st_size),
+                stat.st_size,
+                compress_into_cache,
+            )
+            if entry is None:
+                return False
+
+        self._send_content(
+            request_handler, entry.headers, etag, stat, entry.body, len(entry.body)
+        )
+        return True
+
+    def _coalesced(
+        self,
+        key: Hashable,
+        size: int,
+        compute: Callable[[], CachedContent | None],
+    ) -> CachedContent | None:
+        """Run compute(), sharing it with concurrent requests for the same key.
+
+        Args:
+            size: The size of the file being read.
+        """
+        if self.single_flight is None:
+            return compute()
+        return self.single_flight.do(key, size, compute)
+
+    def compressed_headers(
+        self, content_type: str, coding: str, etag: str, stat: os.stat_result
+    ) -> tuple[tuple[str, str], ...]:
+        """Build the headers, but Content-Length, of a compressed file."""
+        return (
+            ("Content-type", content_type),
+            ("Content-Encoding", coding),
+            ("Vary", "Accept-Encoding"),
+            ("Accept-Ranges", "bytes"),
+            ("ETag", etag),
+            ("Last-Modified", format_last_modified(stat)),
+        )
+
+    def _read_whole_file(self, full_path: str, stat: os.stat_result) -> bytes | None:
+        """Read a file's content, or None if it no longer matches stat."""
+        if self.content_cache is not None:
+            entry = self.content_cache.get(full_path, stat)
+            if entry is not None:
+                return entry.body
+        try:
+            with open(full_path, "rb") as file:
+                current = os.fstat(file.fileno())
+                body = file.read()
+        except OSError:
+            return None
+        if (current.st_mtime_ns, current.st_size) != (stat.st_mtime_ns, len(body)):
+            return None
+        return body
+
+    def content_type(self, full_path: str) -> str:
+        """Guess the content type from the file name."""
+        ctype, encoding = mimetypes.guess_type(full_path)
+        if ctype is None:
+            ctype = "application/octet-stream"  # Default if type unknown
+        return ctype
+
+    def _send_content(
+        self,
+        request_handler: "RequestHandler",
+        headers: tuple[tuple[str, str], ...],
+        etag: str,
+        stat: os.stat_result,
+        source: bytes | mmap.mmap | BinaryIO,
+        size: int,
+    ) -> None:
+        """Send the whole body, or the byte ranges the client asked for.
+
+        Args:
+            source: The cached content, a mapping of the file, or the open
+                file to stream.
+            size: The length of the body.
+        """
+        if isinstance(source, (bytes, mmap.mmap)):
+            body = memoryview(source)
+
+            def send_slice(offset: int, count: int) -> int:
+                with request_handler.timer(
+                    SOCKET_WRITE_DURATION, handler=self.metrics_name
+                ):
+                    return send_buffer(request_handler.wfile, body, offset, count)
+
+        else:
+            file = source
+
+            def send_slice(offset: int, count: int) -> int:
+                # Reads from disk and writes to the socket in one go
+                with request_handler.timer(
+                    SOCKET_WRITE_DURATION, handler=self.metrics_name
+                ):
+                    return send_file(request_handler, file, offset, count)
+
+        try:
+            ranges = requested_ranges(request_handler, etag, stat, size)
+        except RangeNotSatisfiableError:
+            send_range_not_satisfiable(request_handler, size)
+            return
+        if ranges is not None:
+            send_ranges(request_handler, ranges, size, headers, send_slice)
+            return
+        self.send_headers(request_handler, headers)
+        if send_slice(0, size) < size:
+            # The file shrank while sending; the framing is now broken
+            request_handler.close_connection = True
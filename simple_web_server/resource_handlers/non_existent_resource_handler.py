@@ -2,7 +2,7 @@ import os
 from typing import TYPE_CHECKING
 
 # Import the base class
-from .resource_handler import ResourceHandler
+from .resource_handler import Resource, ResourceHandler
 
 if TYPE_CHECKING:
     from simple_web_server.__main__ import RequestHandler
@@ -14,10 +14,16 @@ class NonExistentResourceHandler(ResourceHandler):
     Sends a 404 error response.
     """
 
+    metrics_name = "not_found"
+
     def can_handle(self, full_path: str) -> bool:
         """Handle if the path does not exist."""
         return not os.path.exists(full_path)
 
+    def can_handle_resource(self, resource: Resource) -> bool:
+        """Handle if the stat() of the path failed."""
+        return not resource.exists
+
     def handle(self, request_handler: "RequestHandler", full_path: str) -> None:
         """Send a 404 error using the main request handler."""
         request_handler.send_error(
@@ -1,20 +1,59 @@
+import os
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from dataclasses import dataclass
+from stat import S_ISDIR, S_ISREG
 
 # Import RequestHandler for type hinting in handle method
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, ClassVar
+
+from simple_web_server.transfer import write_stream
 
 if TYPE_CHECKING:
     from simple_web_server.__main__ import RequestHandler
 
 
+@dataclass(frozen=True)
+class Resource:
+    """A requested path and the result of a single stat() of it."""
+
+    full_path: str
+    stat: os.stat_result | None  # None if the path doesn't exist
+    # Set for a URL with a trailing slash, which only names a directory
+    directory_only: bool = False
+
+    @property
+    def exists(self) -> bool:
+        return self.stat is not None
+
+    @property
+    def is_dir(self) -> bool:
+        return self.stat is not None and S_ISDIR(self.stat.st_mode)
+
+    @property
+    def is_file(self) -> bool:
+        return self.stat is not None and S_ISREG(self.stat.st_mode)
+
+
 class ResourceHandler(ABC):
     """
     Abstract Base Class for resource handlers.
 
     Defines the interface for checking if a path can be handled
     and handling the request for that path using the main RequestHandler.
+
+    RequestHandler dispatches through can_handle_resource and
+    handle_resource, passing a Resource that was stat()ed once for all
+    handlers. Handlers are shared by all requests, so they must not keep
+    per-request state.
     """
 
+    # Value of the handler label of the handler's metrics.
+    metrics_name: ClassVar[str] = "resource"
+    # False for a handler that never looks at Resource.stat. Such a handler
+    # is asked before the path is stat()ed, with a Resource whose stat is None.
+    needs_stat: ClassVar[bool] = True
+
     @abstractmethod
     def can_handle(self, full_path: str) -> bool:
         """Check if this handler is appropriate for the given path."""
@@ -29,3 +68,50 @@ class ResourceHandler(ABC):
             full_path: The full absolute path to the resource.
         """
         pass
+
+    def can_handle_resource(self, resource: Resource) -> bool:
+        """Check if this handler is appropriate for an already stat()ed path."""
+        return self.can_handle(resource.full_path)
+
+    def handle_resource(
+        self, request_handler: "RequestHandler", resource: Resource
+    ) -> None:
+        """Process the request for an already stat()ed path."""
+        self.handle(request_handler, resource.full_path)
+
+    def send_headers(
+        self,
+        request_handler: "RequestHandler",
+        headers: Iterable[tuple[str, str]],
+        code: int = 200,
+    ) -> None:
+        """Send the status line and headers of a response."""
+        request_handler.send_response(code)
+        for name, value in headers:
+            request_handler.send_header(name, value)
+        request_handler.end_headers()
+
+    def send_stream(
+        self,
+        request_handler: "RequestHandler",
+        headers: Iterable[tuple[str, str]],
+        pieces: Iterable[bytes],
+        code: int = 200,
+    ) -> None:
+        """Send a response whose body is produced piece by piece.
+
+        The length isn't known up front, so HTTP/1.1 clients get the body in
+        the chunked transfer coding, and HTTP/1.0 clients get it followed by
+        the connection closing. pieces is not consumed for HEAD requests.
+        """
+        chunked = request_handler.request_version != "HTTP/1.0"
+        if not chunked:
+            request_handler.close_connection = True
+        request_handler.send_response(code)
+        for name, value in headers:
+            request_handler.send_header(name, value)
+        if chunked:
+            request_handler.send_header("Transfer-Encoding", "chunked")
+        request_handler.end_headers()
+        if request_handler.command != "HEAD":
+            write_stream(request_handler.wfile, pieces, chunked)
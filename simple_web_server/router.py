@@ -0,0 +1,178 @@
+import importlib
+import json
+import os
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+
+from simple_web_server.path_resolver import normalize_url_path
+from simple_web_server.resource_handlers.resource_handler import ResourceHandler
+
+
+@dataclass(frozen=True)
+class Mount:
+    """Resource handlers serving a document root under a URL prefix."""
+
+    prefix: str  # Normalised, without a trailing slash unless it is "/"
+    root: str
+    resource_handlers: Sequence[ResourceHandler]
+    host: str | None = None  # None for every host without mounts of its own
+
+
+@dataclass(frozen=True)
+class Route:
+    """The mount a request was routed to, and the path it names under it."""
+
+    mount: Mount
+    full_path: str
+
+
+@dataclass
+class _Node:
+    """A path segment of the prefix trie, with the mount ending there."""
+
+    children: dict[str, "_Node"] = field(default_factory=dict)
+    mount: Mount | None = None
+
+
+def normalize_prefix(prefix: str) -> str:
+    """Normalise a mount's URL prefix, raising ValueError if it is invalid."""
+    url_path = normalize_url_path(prefix) if prefix.startswith("/") else None
+    if url_path is None:
+        raise ValueError(f"Invalid mount prefix: {prefix!r}")
+    return url_path.rstrip("/") or "/"
+
+
+def normalize_host(host: str | None) -> str | None:
+    """Reduce a Host header to the lowercased name, without port or final dot."""
+    if not host:
+        return None
+    host = host.strip().lower()
+    if host.startswith("["):
+        host = host.split("]", 1)[0] + "]"  # An IPv6 address and maybe a port
+    else:
+        host = host.rsplit(":", 1)[0]
+    return host.rstrip(".") or None
+
+
+class Router:
+    """
+    Maps the Host header and URL path of a request to one of many mounts.
+
+    The mounts are compiled into a prefix trie of path segments per host.
+    A request is routed by one dict lookup for its host, falling back to
+    the mounts without a host, and then one lookup per segment of its path,
+    so routing costs the same for a handful of mounts as for hundreds. The
+    mount with the longest prefix matching whole segments wins.
+    """
+
+    def __init__(self, mounts: Iterable[Mount]) -> None:
+        self._tries: dict[str | None, _Node] = {}
+        for mount in mounts:
+            node = self._tries.setdefault(normalize_host(mount.host), _Node())
+            for segment in _segments(normalize_prefix(mount.prefix)):
+                node = node.children.setdefault(segment, _Node())
+            if node.mount is not None:
+                raise ValueError(f"Mounted twice: {mount.host or '*'} {mount.prefix}")
+            node.mount = mount
+
+    def route(self, host: str | None, url_path: str) -> Route | None:
+        """Find the mount serving a normalised URL path on a host.
+
+        Returns:
+            None if no mount's prefix matches.
+        """
+        node = self._tries.get(normalize_host(host)) or self._tries.get(None)
+        if node is None:
+            return None
+        segments = _segments(url_path)
+        mount, depth = node.mount, 0
+        for index, segment in enumerate(segments):
+            child = node.children.get(segment)
+            if child is None:
+                break
+            node = child
+            if node.mount is not None:
+                mount, depth = node.mount, index + 1
+        if mount is None:
+            return None
+        return Route(mount, os.path.join(mount.root, *segments[depth:]))
+
+
+def _segments(url_path: str) -> list[str]:
+    return [segment for segment in url_path.split("/") if segment]
+
+
+@dataclass(frozen=True)
+class MountConfig:
+    """A mount as described in a routes file, before its handlers exist."""
+
+    prefix: str
+    host: str | None = None
+    root: str | None = None  # None for the server's document root
+    archive: str | None = None
+    handlers: tuple[str, ...] = ()  # "module:ClassName" of each handler
+
+
+def read_routes(path: str) -> list[MountConfig]:
+    """Read the mounts of a JSON routes file.
+
+    The file holds {"mounts": [...]}, each mount an object with a "prefix"
+    and optionally a "host", a "root" directory, an "archive" to serve from
+    and the "handlers" to try before the built-in ones. Relative paths are
+    relative to the routes file.
+
+    Raises:
+        ValueError: If the file isn't a valid routes file.
+    """
+    with open(path, encoding="utf-8") as file:
+        try:
+            document = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid routes file {path}: {e}") from e
+    mounts = document.get("mounts") if isinstance(document, dict) else None
+    if not isinstance(mounts, list):
+        raise ValueError(f"Routes file {path} must hold a list of mounts")
+    base = os.path.dirname(os.path.abspath(path))
+    configs = []
+    for mount in mounts:
+        if not isinstance(mount, dict) or not isinstance(mount.get("prefix"), str):
+            raise ValueError(f"Mount without a prefix in {path}: {mount!r}")
+        unknown = set(mount) - {"prefix", "host", "root", "archive", "handlers"}
+        if unknown:
+            raise ValueError(f"Unknown mount settings in {path}: {sorted(unknown)}")
+        for key in ("host", "root", "archive"):
+            if not isinstance(mount.get(key, ""), str):
+                raise ValueError(f"Mount {key} must be a string: {mount!r}")
+        handlers = mount.get("handlers", [])
+        if not isinstance(handlers, list) or not all(
+            isinstance(handler, str) for handler in handlers
+        ):
+            raise ValueError(f"Mount handlers must be a list of names: {mount!r}")
+        configs.append(
+            MountConfig(
+                prefix=normalize_prefix(mount["prefix"]),
+                host=mount.get("host"),
+                root=_relative_to(base, mount.get("root")),
+                archive=_relative_to(base, mount.get("archive")),
+                handlers=tuple(handlers),
+            )
+        )
+    return configs
+
+
+def _relative_to(base: str, path: str | None) -> str | None:
+    return os.path.abspath(os.path.join(base, path)) if path is not None else None
+
+
+def load_handler_class(name: str) -> type[ResourceHandler]:
+    """Import a ResourceHandler subclass named as "module:ClassName"."""
+    module_name, _, class_name = name.partition(":")
+    try:
+        handler_class = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise ValueError(f"Can't load resource handler {name}: {e}") from e
+    if not (
+        isinstance(handler_class, type) and issubclass(handler_class, ResourceHandler)
+    ):
+        raise ValueError(f"Not a ResourceHandler: {name}")
+    return handler_class
@@ -0,0 +1,283 @@
+import http.server
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from simple_web_server.async_server import DEFAULT_DRAIN_TIMEOUT, AsyncHTTPServer
+from simple_web_server.limits import ConnectionLimiter, reject_connection
+
+DEFAULT_THREADS = 32
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+SERVER_MODES = ("single", "threaded", "prefork", "asyncio")
+
+
+class PooledThreadingHTTPServer(http.server.HTTPServer):
+    """
+    HTTP server that handles each connection on a bounded pool of worker threads.
+
+    Unlike socketserver.ThreadingMixIn, which spawns an unbounded thread per
+    connection, at most max_workers connections are served at once; further
+    connections wait in the pool's queue until a worker becomes free.
+    Connections beyond max_connections open or max_queue waiting get a 503
+    straight away.
+
+    Once shutdown() has stopped it accepting, drain() lets the connections
+    being served finish.
+    """
+
+    def __init__(
+        self,
+        server_address: tuple[str, int],
+        request_handler_class: Any,
+        bind_and_activate: bool = True,
+        max_workers: int = DEFAULT_THREADS,
+        max_connections: int | None = None,
+        max_queue: int | None = None,
+        drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+    ) -> None:
+        super().__init__(server_address, request_handler_class, bind_and_activate)
+        self.max_workers = max_workers
+        self.drain_timeout = drain_timeout
+        # Set while draining; handlers then ask clients to close connections.
+        self.draining = False
+        self.limiter = ConnectionLimiter(max_connections, max_queue)
+        self._connections: set[socket.socket] = set()
+        self._connections_changed = threading.Condition()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="http-worker"
+        )
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        """Hand the connection over to a pool thread, unless overloaded."""
+        if not self.limiter.admit():
+            reject_connection(request)
+            self.shutdown_request(request)
+            return
+        with self._connections_changed:
+            self._connections.add(request)
+        self._executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request: Any, client_address: Any) -> None:
+        """Serve a single connection; runs on a pool thread."""
+        self.limiter.start()
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.limiter.release()
+            with self._connections_changed:
+                self._connections.discard(request)
+                self._connections_changed.notify_all()
+
+    def drain(self, timeout: float | None = None) -> None:
+        """Wait for the open connections to finish, for up to timeout seconds.
+
+        Responses sent while draining ask clients to close the connection,
+        and idle connections close when their keep-alive timeout expires,
+        so no request is cut off that a client had already sent. Connections
+        still open at the deadline, drain_timeout by default, are cut off.
+        """
+        if timeout is None:
+            timeout = self.drain_timeout
+        deadline = time.monotonic() + timeout
+        self.draining = True
+        with self._connections_changed:
+            while self._connections:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._connections_changed.wait(remaining)
+            for connection in self._connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass  # Already closed by the client
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+class PreforkHTTPServer(PooledThreadingHTTPServer):
+    """
+    HTTP server that forks worker processes sharing one listening socket.
+
+    The socket is bound once in the parent; each forked worker then runs its
+    own accept loop (with its own thread pool) on the inherited socket, so
+    connections are spread across CPU cores by the kernel.
+
+    shutdown() in the parent stops every worker; each drains its own
+    connections before exiting.
+    """
+
+    def __init__(
+        self,
+        server_address: tuple[str, int],
+        request_handler_class: Any,
+        bind_and_activate: bool = True,
+        max_workers: int = DEFAULT_THREADS,
+        workers: int = DEFAULT_WORKERS,
+        max_connections: int | None = None,
+        max_queue: int | None = None,
+        drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+    ) -> None:
+        super().__init__(
+            server_address,
+            request_handler_class,
+            bind_and_activate,
+            max_workers,
+            max_connections,
+            max_queue,
+            drain_timeout,
+        )
+        self.workers = workers
+        self.worker_pids: list[int] = []
+        # Set by stop_workers(); guards worker_pids against a concurrent fork.
+        self._stopping = False
+        self._workers_lock = threading.Lock()
+        # Whether this process is one of the forked workers.
+        self.in_worker = False
+
+    def server_activate(self) -> None:
+        super().server_activate()
+        # Workers race to accept each connection; the losers must get
+        # EAGAIN back rather than blocking inside accept().
+        self.socket.setblocking(False)
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        """Fork the workers and wait for them to exit."""
+        for _ in range(self.workers):
+            if self._stopping:
+                break
+            pid = os.fork()
+            if pid == 0:
+                self._run_worker(poll_interval)
+            if not self._add_worker(pid):
+                # shutdown() ran while this worker was being forked
+                _terminate(pid)
+                break
+        try:
+            for pid in self.worker_pids:
+                os.waitpid(pid, 0)
+        finally:
+            self.stop_workers()
+
+    def _add_worker(self, pid: int) -> bool:
+        """Record a forked worker, returning False if the workers are stopping."""
+        with self._workers_lock:
+            self.worker_pids.append(pid)
+            return not self._stopping
+
+    def shutdown(self) -> None:
+        if self.in_worker:
+            super().shutdown()
+        else:
+            self.stop_workers()
+
+    def stop_workers(self) -> None:
+        """Terminate any workers that are still running, and fork no more."""
+        with self._workers_lock:
+            self._stopping = True
+            pids = list(self.worker_pids)
+        for pid in pids:
+            _terminate(pid)
+
+    def _run_worker(self, poll_interval: float) -> None:
+        self.in_worker = True
+        exit_code = 0
+        try:
+            try:
+                super().serve_forever(poll_interval)
+            except KeyboardInterrupt:
+                pass
+            self.drain()
+        except BaseException:
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+
+def _terminate(pid: int) -> None:
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+
+def adopt_socket(server: socketserver.TCPServer, sock: socket.socket) -> None:
+    """Make a server created with bind_and_activate=False use a bound socket."""
+    server.socket.close()
+    server.socket = sock
+    server.server_address = sock.getsockname()
+    server.server_activate()
+
+
+def create_server(
+    mode: str,
+    server_address: tuple[str, int],
+    handler_class: type[http.server.BaseHTTPRequestHandler],
+    threads: int = DEFAULT_THREADS,
+    workers: int = DEFAULT_WORKERS,
+    max_connections: int | None = None,
+    max_queue: int | None = None,
+    drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+    sock: socket.socket | None = None,
+) -> http.server.HTTPServer | AsyncHTTPServer:
+    """Create an HTTP server for the requested concurrency mode.
+
+    The connection limits apply to each process; max_queue only to the
+    threaded and prefork modes, and neither to single mode, which serves
+    one connection at a time and has nothing to drain.
+
+    Args:
+        sock: An already bound and listening socket to serve on, instead
+            of binding a new one to server_address.
+    """
+    server: http.server.HTTPServer
+    if mode == "single":
+        server = http.server.HTTPServer(
+            server_address, handler_class, bind_and_activate=sock is None
+        )
+    elif mode == "threaded":
+        server = PooledThreadingHTTPServer(
+            server_address,
+            handler_class,
+            bind_and_activate=sock is None,
+            max_workers=threads,
+            max_connections=max_connections,
+            max_queue=max_queue,
+            drain_timeout=drain_timeout,
+        )
+    elif mode == "prefork":
+        server = PreforkHTTPServer(
+            server_address,
+            handler_class,
+            bind_and_activate=sock is None,
+            max_workers=threads,
+            workers=workers,
+            max_connections=max_connections,
+            max_queue=max_queue,
+            drain_timeout=drain_timeout,
+        )
+    elif mode == "asyncio":
+        return AsyncHTTPServer(
+            server_address,
+            handler_class,
+            max_workers=threads,
+            max_connections=max_connections,
+            drain_timeout=drain_timeout,
+            sock=sock,
+        )
+    else:
+        raise ValueError(f"Unknown server mode: {mode}")
+    if sock is not None:
+        adopt_socket(server, sock)
+    return server
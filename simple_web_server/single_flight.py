@@ -0,0 +1,93 @@
+import threading
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar, cast
+
+# Total size of the results of the reads in flight at once.
+DEFAULT_MAX_FLIGHT_BYTES = 64 * 1024 * 1024
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    """A computation in progress, and its outcome once it is done."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.done = threading.Event()
+        self.result: T | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+    """
+    Thread-safe coalescing of concurrent computations of the same key.
+
+    The first caller to ask for a key runs the computation; callers asking
+    for the same key while it runs wait for it and share its result, or its
+    exception, instead of repeating it. Nothing is kept once a computation
+    is done: caching the result is up to the caller.
+
+    Callers state how large the result will be. Computations that would take
+    the results in flight past max_bytes still run, but unshared, so a burst
+    of distinct keys can't hold more than max_bytes waiting for followers.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_FLIGHT_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.leaders = 0
+        self.followers = 0
+        self._flights: dict[Hashable, _Flight[T]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def do(self, key: Hashable, size: int, compute: Callable[[], T]) -> T:
+        """Return compute()'s result, sharing it with concurrent callers.
+
+        Args:
+            key: Identifies the result; it should include whatever would make
+                a later computation's result differ, like the file's mtime.
+            size: The expected size of the result in bytes.
+        """
+        leading: _Flight[T] | None = None
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.followers += 1
+            else:
+                self.leaders += 1
+                if self.current_bytes + size <= self.max_bytes:
+                    leading = self._flights[key] = _Flight(size)
+                    self.current_bytes += size
+        if flight is not None:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return cast(T, flight.result)
+
+        try:
+            result = compute()
+        except BaseException as e:
+            self._land(key, leading, None, e)
+            raise
+        self._land(key, leading, result, None)
+        return result
+
+    def _land(
+        self,
+        key: Hashable,
+        flight: _Flight[T] | None,
+        result: T | None,
+        error: BaseException | None,
+    ) -> None:
+        """Hand the outcome to the followers and forget the computation."""
+        if flight is None:
+            return
+        with self._lock:
+            del self._flights[key]
+            self.current_bytes -= flight.size
+        flight.result = result
+        flight.error = error
+        flight.done.set()
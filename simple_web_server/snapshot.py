@@ -0,0 +1,430 @@
+import os
+import threading
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from stat import S_ISREG
+from typing import TYPE_CHECKING
+
+from simple_web_server.compression import (
+    PRECOMPRESSED_SUFFIXES,
+    accepted_encoding,
+    compress,
+    encoded_etag,
+    find_precompressed,
+    is_compressible,
+    offered_encodings,
+)
+from simple_web_server.resource_handlers.file_handler import FileHandler
+from simple_web_server.stat_cache import file_identity
+from simple_web_server.transfer import send_file
+from simple_web_server.validators import make_etag
+
+if TYPE_CHECKING:
+    from simple_web_server.__main__ import RequestHandler
+
+# Files up to this size are read into memory when the snapshot is built.
+DEFAULT_PRELOAD_SIZE = 64 * 1024
+
+# Total size of the preloaded files.
+DEFAULT_PRELOAD_BUDGET = 64 * 1024 * 1024
+
+# Requests with any of these headers may need another response than the
+# 200 the snapshot has prepared, so they take the regular path.
+_BYPASS_HEADERS = ("Range", "If-None-Match", "If-Modified-Since", "If-Range")
+
+_VARY = ("Vary", "Accept-Encoding")
+
+_file_handler = FileHandler()
+
+
+@dataclass(frozen=True)
+class SnapshotEntry:
+    """A file of the snapshot and the response prepared for it."""
+
+    full_path: str
+    identity: tuple[int, int, int, int]  # st_dev, st_ino, st_size, st_mtime_ns
+    size: int
+    content_type: str
+    etag: str
+    compressible: bool
+    head: bytes  # The encoded header lines of a 200 response
+    body: bytes | None  # The content, if it was preloaded
+    # The codings the regular path would offer, best first
+    codings: tuple[str, ...] = ()
+    # The coding and identity of each precompressed sibling
+    precompressed: tuple[tuple[str, tuple[int, int, int, int]], ...] = ()
+    # The encoded header lines and body of a gzip response, if preloaded
+    gzip: tuple[bytes, bytes] | None = None
+
+    @property
+    def preloaded_size(self) -> int:
+        """The bytes of content the entry holds in memory."""
+        size = len(self.body) if self.body is not None else 0
+        return size + (len(self.gzip[1]) if self.gzip is not None else 0)
+
+
+class StaticSnapshot:
+    """
+    Index of every file under a root, with its response headers prepared.
+
+    The root is walked once, one directory per worker thread, recording each
+    file's stat result, content type and ETag together with the encoded
+    headers of a 200 response; small files are read into memory as well.
+    Small compressible files also get a gzip response, from their .gz
+    sibling or, if compress is True, compressed when they are indexed.
+    Serving a file is then a dict lookup and a write. It subscribes to a
+    FileWatcher to stay current: invalidate() indexes a changed file or
+    directory again, and clear() brings the whole index up to date with
+    refresh(), which looks at changed files and directories only.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        preload_size: int = DEFAULT_PRELOAD_SIZE,
+        preload_budget: int = DEFAULT_PRELOAD_BUDGET,
+        workers: int | None = None,
+        compress: bool = True,
+    ) -> None:
+        self.root = os.path.abspath(root)
+        self.preload_size = preload_size
+        self.preload_budget = preload_budget
+        self.compress = compress
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self.preloaded_bytes = 0
+        self._files: dict[str, SnapshotEntry] = {}
+        # Directory URL path to its mtime, which changes with its entries.
+        self._directories: dict[str, int] = {}
+        # Directory URL path to the URL paths of the files and subdirectories
+        # indexed in it, so that a scan only compares it with its own children.
+        self._child_files: dict[str, set[str]] = {}
+        self._child_directories: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def lookup(self, url_path: str) -> SnapshotEntry | None:
+        """Return the entry of the file at a URL path, if there is one."""
+        return self._files.get(url_path)
+
+    def build(self) -> None:
+        """Walk the root in parallel and index every file under it."""
+        with ThreadPoolExecutor(
+            self.workers, thread_name_prefix="snapshot"
+        ) as executor:
+            pending: deque[Future[list[str]]] = deque()
+            pending.append(executor.submit(self._scan, "/"))
+            while pending:
+                # The pool runs scans in the order they are submitted, so the
+                # oldest is usually the first to be done.
+                for subdirectory in pending.popleft().result():
+                    pending.append(executor.submit(self._scan, subdirectory))
+
+    def refresh(self) -> None:
+        """Update the entries of files and directories that changed."""
+        for url_path, entry in list(self._files.items()):
+            try:
+                stat = os.stat(entry.full_path)
+            except OSError:
+                self._remove_file(url_path)
+                continue
+            if file_identity(stat) != entry.identity:
+                self._add_file(url_path, entry.full_path, stat)
+        for url_directory, mtime_ns in list(self._directories.items()):
+            try:
+                stat = os.stat(self._full_path(url_directory))
+            except OSError:
+                self._remove_directory(url_directory)
+                continue
+            if stat.st_mtime_ns != mtime_ns:
+                # Entries were added or removed
+                self._rescan(url_directory)
+
+    def invalidate(self, full_path: str) -> None:
+        """Index a file or directory under the root again."""
+        if full_path != self.root and not full_path.startswith(self.root + os.sep):
+            return
+        url_path = full_path[len(self.root) :].replace(os.sep, "/") or "/"
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            self._remove_file(url_path)
+            self._remove_directory(url_path.rstrip("/") + "/")
+            return
+        if S_ISREG(stat.st_mode):
+            self._add_file(url_path, full_path, stat)
+        elif os.path.isdir(full_path) and not os.path.islink(full_path):
+            self._rescan(url_path.rstrip("/") + "/")
+
+    def clear(self) -> None:
+        """Bring the whole index up to date; changes may have been missed."""
+        self.refresh()
+
+    def _rescan(self, url_directory: str) -> None:
+        """Scan a directory again, and new subdirectories in full."""
+        pending = self._scan(url_directory)
+        while pending:
+            directory = pending.pop()
+            if directory not in self._directories:
+                pending.extend(self._scan(directory))
+
+    def _full_path(self, url_path: str) -> str:
+        return self.root + url_path.rstrip("/")
+
+    def _scan(self, url_directory: str) -> list[str]:
+        """Index the files of one directory.
+
+        Returns:
+            The URL paths of its subdirectories.
+        """
+        full_directory = self._full_path(url_directory)
+        try:
+            mtime_ns = os.stat(full_directory).st_mtime_ns
+            with os.scandir(full_directory) as it:
+                entries = list(it)
+        except OSError:
+            self._remove_directory(url_directory)
+            return []
+        subdirectories = []
+        seen = set()
+        for entry in entries:
+            url_path = url_directory + entry.name
+            try:
+                # Symlinked directories aren't followed, which rules out
+                # loops; requests for them take the regular path.
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(url_path + "/")
+                elif entry.is_file():
+                    stat = entry.stat()
+                    indexed = self._files.get(url_path)
+                    if indexed is None or indexed.identity != file_identity(stat):
+                        self._add_file(url_path, entry.path, stat)
+                    seen.add(url_path)
+            except OSError:
+                continue
+        with self._lock:
+            self._directories[url_directory] = mtime_ns
+            previous_files = self._child_files.get(url_directory, set())
+            # Files indexed while scanning are in seen already
+            self._child_files[url_directory] = set(seen)
+            previous_directories = self._child_directories.get(url_directory, set())
+            self._child_directories[url_directory] = set(subdirectories)
+        gone = previous_files - seen
+        gone_directories = previous_directories.difference(subdirectories)
+        for path in gone:
+            self._remove_file(path)
+        for path in gone_directories:
+            self._remove_directory(path)
+        return subdirectories
+
+    def _add_file(self, url_path: str, full_path: str, stat: os.stat_result) -> None:
+        content_type = _file_handler.content_type(full_path)
+        compressible = is_compressible(content_type)
+        extra_headers = (_VARY,) if compressible else ()
+        headers = _file_handler.file_headers(content_type, stat, extra_headers)
+        body = self._preload(full_path, stat)
+        codings: tuple[str, ...] = ()
+        precompressed: dict[str, tuple[str, os.stat_result]] = {}
+        gzip = None
+        if compressible:
+            precompressed = find_precompressed(full_path, stat)
+            codings = tuple(
+                offered_encodings(precompressed, stat.st_size, self.compress)
+            )
+            if "gzip" in codings:
+                gzip = self._prepare_gzip(content_type, stat, body, precompressed)
+        entry = SnapshotEntry(
+            full_path=full_path,
+            identity=file_identity(stat),
+            size=stat.st_size,
+            content_type=content_type,
+            etag=make_etag(stat),
+            compressible=compressible,
+            head=_encode_headers(headers),
+            body=body,
+            codings=codings,
+            precompressed=_sibling_identities(precompressed),
+            gzip=gzip,
+        )
+        with self._lock:
+            old = self._files.get(url_path)
+            if old is not None:
+                self.preloaded_bytes -= old.preloaded_size
+            self.preloaded_bytes += entry.preloaded_size
+            self._files[url_path] = entry
+            self._add_child(url_path)
+        self._update_original(url_path)
+
+    def _prepare_gzip(
+        self,
+        content_type: str,
+        stat: os.stat_result,
+        body: bytes | None,
+        precompressed: dict[str, tuple[str, os.stat_result]],
+    ) -> tuple[bytes, bytes] | None:
+        """Prepare the gzip response the regular path would send for a file."""
+        if "gzip" in precompressed:
+            sibling, sibling_stat = precompressed["gzip"]
+            compressed = self._preload(sibling, sibling_stat)
+            if compressed is None:
+                return None
+            extra_headers = (("Content-Encoding", "gzip"), _VARY)
+            headers = _file_handler.file_headers(
+                content_type, sibling_stat, extra_headers
+            )
+            return _encode_headers(headers), compressed
+        if body is None:
+            return None
+        compressed = compress(body, "gzip")
+        with self._lock:
+            if self.preloaded_bytes + len(compressed) > self.preload_budget:
+                return None
+        etag = encoded_etag(make_etag(stat), "gzip")
+        headers = (
+            ("Content-Length", str(len(compressed))),
+            *_file_handler.compressed_headers(content_type, "gzip", etag, stat),
+        )
+        return _encode_headers(headers), compressed
+
+    def _update_original(self, url_path: str) -> None:
+        """Index a file again if a precompressed sibling of it changed."""
+        for _, suffix in PRECOMPRESSED_SUFFIXES:
+            if not url_path.endswith(suffix):
+                continue
+            original_path = url_path[: -len(suffix)]
+            original = self._files.get(original_path)
+            if original is None or not original.compressible:
+                continue
+            try:
+                stat = os.stat(original.full_path)
+            except OSError:
+                continue  # Its own invalidation removes it
+            siblings = find_precompressed(original.full_path, stat)
+            if _sibling_identities(siblings) != original.precompressed:
+                self._add_file(original_path, original.full_path, stat)
+
+    def _preload(self, full_path: str, stat: os.stat_result) -> bytes | None:
+        if stat.st_size > self.preload_size:
+            return None
+        with self._lock:
+            if self.preloaded_bytes + stat.st_size > self.preload_budget:
+                return None
+        try:
+            with open(full_path, "rb") as file:
+                if file_identity(os.fstat(file.fileno())) != file_identity(stat):
+                    return None
+                body = file.read()
+        except OSError:
+            return None
+        return body if len(body) == stat.st_size else None
+
+    def _remove_file(self, url_path: str) -> None:
+        with self._lock:
+            entry = self._files.pop(url_path, None)
+            if entry is not None:
+                self.preloaded_bytes -= entry.preloaded_size
+                self._child_files.get(_parent(url_path), set()).discard(url_path)
+        if entry is not None:
+            self._update_original(url_path)
+
+    def _remove_directory(self, url_directory: str) -> None:
+        with self._lock:
+            self._directories.pop(url_directory, None)
+            files = self._child_files.pop(url_directory, set())
+            subdirectories = self._child_directories.pop(url_directory, set())
+            if url_directory != "/":
+                parent = self._child_directories.get(_parent(url_directory), set())
+                parent.discard(url_directory)
+        for path in files:
+            self._remove_file(path)
+        for path in subdirectories:
+            self._remove_directory(path)
+
+    def _add_child(self, url_path: str) -> None:
+        """Record a file, and the directories leading to it, in their parents.
+
+        Called with the lock held.
+        """
+        directory = _parent(url_path)
+        self._child_files.setdefault(directory, set()).add(url_path)
+        while directory != "/":
+            parent = self._child_directories.setdefault(_parent(directory), set())
+            if directory in parent:
+                break
+            parent.add(directory)
+            directory = _parent(directory)
+
+
+def serve_from_snapshot(
+    request_handler: "RequestHandler", snapshot: StaticSnapshot, url_path: str
+) -> bool:
+    """Send a file's prepared response, if the request allows it.
+
+    Returns:
+        False if nothing was sent and the request needs the regular
+        dispatch: the path isn't a file of the snapshot, the file changed
+        since it was indexed, the request is conditional or asks for
+        ranges, or it negotiates a coding the snapshot hasn't prepared.
+    """
+    entry = snapshot.lookup(url_path)
+    if entry is None:
+        return False
+    if any(name in request_handler.headers for name in _BYPASS_HEADERS):
+        return False
+    coding = accepted_encoding(request_handler, entry.codings)
+    if coding is not None:
+        if coding != "gzip" or entry.gzip is None:
+            return False
+        head, body = entry.gzip
+        _send_head(request_handler, head, len(body))
+        if request_handler.command != "HEAD":
+            request_handler.wfile.write(body)
+        return True
+    if request_handler.command == "HEAD":
+        _send_head(request_handler, entry.head, entry.size)
+        return True
+    if entry.body is not None:
+        _send_head(request_handler, entry.head, entry.size)
+        request_handler.wfile.write(entry.body)
+        return True
+
+    try:
+        file = open(entry.full_path, "rb")
+    except OSError:
+        return False
+    with file:
+        if file_identity(os.fstat(file.fileno())) != entry.identity:
+            return False  # Changed since it was indexed
+        _send_head(request_handler, entry.head, entry.size)
+        if send_file(request_handler, file, 0, entry.size) < entry.size:
+            # The file shrank while sending; the framing is now broken
+            request_handler.close_connection = True
+    return True
+
+
+def _send_head(request_handler: "RequestHandler", head: bytes, size: int) -> None:
+    request_handler.send_response(200)
+    request_handler.send_encoded_headers(head, size)
+    request_handler.end_headers()
+
+
+def _encode_headers(headers: Iterable[tuple[str, str]]) -> bytes:
+    """Encode headers as the lines send_encoded_headers() takes."""
+    head = "".join(f"{name}: {value}\r\n" for name, value in headers)
+    return head.encode("latin-1", "strict")
+
+
+def _sibling_identities(
+    precompressed: dict[str, tuple[str, os.stat_result]],
+) -> tuple[tuple[str, tuple[int, int, int, int]], ...]:
+    return tuple(
+        (coding, file_identity(stat)) for coding, (_, stat) in precompressed.items()
+    )
+
+
+def _parent(url_path: str) -> str:
+    """Return the URL path of the directory holding a file or directory."""
+    return url_path.rstrip("/").rpartition("/")[0] + "/"
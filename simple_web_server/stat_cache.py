@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a stat() result is reused before the path is looked up again.
+DEFAULT_TTL = 1.0
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+def stat_or_none(full_path: str) -> os.stat_result | None:
+    """Stat a path, following symlinks, or return None if it can't be."""
+    try:
+        return os.stat(full_path)
+    except (OSError, ValueError):
+        # Same failures os.path.exists() treats as a missing path
+        return None
+
+
+def file_identity(stat: os.stat_result) -> tuple[int, int, int, int]:
+    """Return what changes when a file is modified or replaced."""
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class StatCache:
+    """
+    Thread-safe cache of recent stat() results, including missing paths.
+
+    Results are reused for ttl seconds, so a change on disk can take that
+    long to be noticed; in exchange, hot paths and repeated 404s cost no
+    syscalls at all while they stay cached. Subscribed to a FileWatcher,
+    the cache is told about changes as they happen and the ttl can be
+    unlimited.
+    """
+
+    def __init__(
+        self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._results: OrderedDict[str, tuple[float, os.stat_result | None]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        # Bumped by invalidations, so that a stat() racing with one isn't
+        # cached after it.
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def stat(self, full_path: str) -> os.stat_result | None:
+        """Return the path's stat result, or None if it doesn't exist."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._results.get(full_path)
+            if cached is not None and cached[0] > now:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            generation = self._generation
+        result = stat_or_none(full_path)
+        with self._lock:
+            if generation != self._generation:
+                return result
+            self._results.pop(full_path, None)
+            while self._results and len(self._results) >= self.max_entries:
+                self._results.popitem(last=False)  # Oldest lookup first
+            self._results[full_path] = (now + self.ttl, result)
+        return result
+
+    def invalidate(self, full_path: str) -> None:
+        """Forget the result for a path, if any."""
+        with self._lock:
+            self._results.pop(full_path, None)
+            self._generation += 1
+
+    def clear(self) -> None:
+        """Forget all results."""
+        with self._lock:
+            self._results.clear()
+            self._generation += 1
@@ -0,0 +1,188 @@
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Sequence
+from types import FrameType
+
+# Environment variables through which a supervisor hands its child the
+# listening socket and the pipe to report readiness on.
+LISTEN_FD_ENV = "SIMPLE_WEB_SERVER_LISTEN_FD"
+READY_FD_ENV = "SIMPLE_WEB_SERVER_READY_FD"
+
+# Seconds a new child has to start serving before it is given up on.
+DEFAULT_READY_TIMEOUT = 60.0
+# Seconds between checks on the children, and before restarting one that
+# exited.
+_POLL_INTERVAL = 0.5
+_RESTART_DELAY = 1.0
+
+Child = subprocess.Popen[bytes]
+
+
+def inherited_socket() -> socket.socket | None:
+    """Return the listening socket passed down by a supervisor, if any."""
+    fd = os.environ.pop(LISTEN_FD_ENV, None)
+    if fd is None:
+        return None
+    return socket.socket(fileno=int(fd))
+
+
+def notify_ready() -> None:
+    """Tell the supervisor, if any, that the server is accepting connections."""
+    fd = os.environ.pop(READY_FD_ENV, None)
+    if fd is None:
+        return
+    try:
+        os.write(int(fd), b"1")
+    finally:
+        os.close(int(fd))
+
+
+class Supervisor:
+    """
+    Runs the server in a child process and replaces it without downtime.
+
+    The supervisor binds the listening socket once and passes it to each
+    child it starts. On SIGHUP it starts a new child, running whatever code
+    is installed by then, and waits for it to report that it is serving.
+    Only then is the old child sent SIGTERM: it stops accepting and drains
+    the connections it has. The socket stays open throughout, so every
+    connection is accepted by one child or the other. If the new child
+    fails to start, the old one is kept.
+
+    SIGTERM and SIGINT stop the current child gracefully and wait for all
+    children to exit. A child that exits on its own is restarted.
+    """
+
+    def __init__(
+        self,
+        listener: socket.socket,
+        command: Sequence[str],
+        ready_timeout: float = DEFAULT_READY_TIMEOUT,
+    ) -> None:
+        self.listener = listener
+        self.command = list(command)
+        self.ready_timeout = ready_timeout
+        self.child: Child | None = None
+        # Old children that were told to stop and are draining
+        self.retiring: list[Child] = []
+        self._reload_requested = False
+        self._stop_requested = False
+        self._wakeup = threading.Event()
+
+    def run(self) -> int:
+        """Supervise children until asked to stop; returns the exit status."""
+        self.child = self.start_child()
+        if self.child is None:
+            return 1
+        signal.signal(signal.SIGHUP, self._request_reload)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        while not self._stop_requested:
+            self._wakeup.wait(_POLL_INTERVAL)
+            self._wakeup.clear()
+            if self._reload_requested:
+                self._reload_requested = False
+                self.reload()
+            self._reap()
+            if self.child.poll() is not None and not self._stop_requested:
+                _log(f"server exited with status {self.child.returncode}")
+                time.sleep(_RESTART_DELAY)
+                self.child = self.start_child() or self.child
+        self.stop()
+        return 0
+
+    def reload(self) -> bool:
+        """Replace the current child with a new one, if the new one starts."""
+        new_child = self.start_child()
+        if new_child is None:
+            _log("new server failed to start; keeping the old one")
+            return False
+        if self.child is not None:
+            _terminate(self.child)
+            self.retiring.append(self.child)
+        self.child = new_child
+        return True
+
+    def stop(self) -> None:
+        """Stop all children gracefully and wait for them to exit."""
+        if self.child is not None:
+            _terminate(self.child)
+            self.retiring.append(self.child)
+            self.child = None
+        for child in self.retiring:
+            child.wait()
+        self.retiring.clear()
+
+    def start_child(self) -> Child | None:
+        """Start a child serving on the listener and wait until it's ready.
+
+        Returns:
+            None if it exited, or didn't report that it was ready within
+            ready_timeout seconds; it is then killed.
+        """
+        listen_fd = self.listener.fileno()
+        ready_read, ready_write = os.pipe()
+        env = {
+            **os.environ,
+            LISTEN_FD_ENV: str(listen_fd),
+            READY_FD_ENV: str(ready_write),
+        }
+        try:
+            child = subprocess.Popen(
+                self.command, env=env, pass_fds=(listen_fd, ready_write)
+            )
+        finally:
+            os.close(ready_write)
+        try:
+            readable, _, _ = select.select([ready_read], [], [], self.ready_timeout)
+            # Empty if the child exited without reporting
+            ready = bool(readable) and os.read(ready_read, 1) == b"1"
+        finally:
+            os.close(ready_read)
+        if not ready:
+            child.kill()
+            child.wait()
+            return None
+        return child
+
+    def _reap(self) -> None:
+        self.retiring = [child for child in self.retiring if child.poll() is None]
+
+    def _request_reload(self, signum: int, frame: FrameType | None) -> None:
+        self._reload_requested = True
+        self._wakeup.set()
+
+    def _request_stop(self, signum: int, frame: FrameType | None) -> None:
+        self._stop_requested = True
+        self._wakeup.set()
+
+
+def _terminate(child: Child) -> None:
+    try:
+        child.terminate()
+    except ProcessLookupError:
+        pass
+
+
+def _log(message: str) -> None:
+    sys.stderr.write(f"supervisor: {message}\n")
+
+
+def supervise(
+    server_address: tuple[str, int],
+    argv: Sequence[str],
+    ready_timeout: float = DEFAULT_READY_TIMEOUT,
+) -> int:
+    """Bind the listening socket and supervise servers started with argv."""
+    listener = socket.create_server(server_address, backlog=128)
+    try:
+        command = [sys.executable, "-m", "simple_web_server", *argv]
+        return Supervisor(listener, command, ready_timeout).run()
+    finally:
+        listener.close()
@@ -0,0 +1,125 @@
+import socket
+import ssl
+from collections.abc import Iterable
+from io import BufferedIOBase
+from typing import TYPE_CHECKING, BinaryIO
+
+if TYPE_CHECKING:
+    from simple_web_server.__main__ import RequestHandler
+
+# Size of each read/write when the body has to be copied through user space.
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Largest slice of an in-memory body handed to wfile at once, which bounds
+# what a writer that copies its input (such as the asyncio one) allocates.
+BUFFER_WRITE_SIZE = 1024 * 1024
+
+# Pieces of a streamed body are gathered into writes of at least this size.
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def send_file(
+    request_handler: "RequestHandler", file: BinaryIO, offset: int, count: int
+) -> int:
+    """Send count bytes of file, starting at offset, as (part of) the body.
+
+    Uses the zero-copy sendfile() system call when the response is written
+    straight to a plain TCP socket, and falls back to copying fixed-size chunks
+    through wfile otherwise (TLS sockets, buffered or test writers), so the
+    memory used per request does not depend on the size of the file.
+
+    Returns:
+        The number of bytes sent, which is less than count if the file was
+        truncated while it was being sent.
+    """
+    if count <= 0:
+        return 0
+    sock = _sendfile_socket(request_handler)
+    if sock is not None:
+        request_handler.wfile.flush()
+        # socket.sendfile() itself falls back to send() on platforms
+        # without os.sendfile and copes with sockets that have a timeout.
+        return sock.sendfile(file, offset, count)
+    return copy_file_chunks(request_handler.wfile, file, offset, count)
+
+
+def copy_file_chunks(
+    wfile: BufferedIOBase, file: BinaryIO, offset: int, count: int
+) -> int:
+    """Copy count bytes of file from offset to wfile in bounded chunks."""
+    file.seek(offset)
+    sent = 0
+    while sent < count:
+        chunk = file.read(min(COPY_CHUNK_SIZE, count - sent))
+        if not chunk:
+            break
+        wfile.write(chunk)
+        sent += len(chunk)
+    return sent
+
+
+def send_buffer(
+    wfile: BufferedIOBase, buffer: memoryview, offset: int, count: int
+) -> int:
+    """Write count bytes of buffer, starting at offset, without copying them.
+
+    Returns:
+        The number of bytes written, which is less than count if the buffer
+        ends first.
+    """
+    end = min(offset + count, len(buffer))
+    position = offset
+    while position < end:
+        size = min(BUFFER_WRITE_SIZE, end - position)
+        wfile.write(buffer[position : position + size])
+        position += size
+    return max(end - offset, 0)
+
+
+def write_stream(
+    wfile: BufferedIOBase, pieces: Iterable[bytes], chunked: bool = True
+) -> int:
+    """Write a body produced piece by piece, as it is produced.
+
+    The first piece is written right away, so the client sees the response
+    start without waiting for the rest; later pieces are gathered into
+    writes of STREAM_CHUNK_SIZE bytes.
+
+    Args:
+        chunked: Frame the body in the HTTP/1.1 chunked transfer coding,
+            ending it with the last chunk. Otherwise the body is written
+            as it is and the connection must be closed to end it.
+
+    Returns:
+        The number of body bytes written, without the chunk framing.
+    """
+    sent = 0
+    pending = bytearray()
+    for piece in pieces:
+        pending += piece
+        if pending and (sent == 0 or len(pending) >= STREAM_CHUNK_SIZE):
+            sent += _write_chunk(wfile, bytes(pending), chunked)
+            pending.clear()
+    if pending:
+        sent += _write_chunk(wfile, bytes(pending), chunked)
+    if chunked:
+        wfile.write(b"0\r\n\r\n")
+    return sent
+
+
+def _write_chunk(wfile: BufferedIOBase, data: bytes, chunked: bool) -> int:
+    if chunked:
+        wfile.write(b"%x\r\n%b\r\n" % (len(data), data))
+    else:
+        wfile.write(data)
+    return len(data)
+
+
+def _sendfile_socket(request_handler: "RequestHandler") -> socket.socket | None:
+    """Return the client socket if the body can be sent with sendfile()."""
+    connection = getattr(request_handler, "connection", None)
+    if not isinstance(connection, socket.socket):
+        return None
+    if isinstance(connection, ssl.SSLSocket):
+        return None  # Encryption has to happen in user space.
+    return connection
@@ -0,0 +1,70 @@
+import email.utils
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from simple_web_server.__main__ import RequestHandler
+
+
+def make_etag(stat: os.stat_result, weak: bool = False) -> str:
+    """Build an entity tag from a file's inode, size and modification time."""
+    etag = f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    return f"W/{etag}" if weak else etag
+
+
+def format_last_modified(stat: os.stat_result) -> str:
+    """Format a file's modification time as an HTTP date."""
+    return email.utils.formatdate(stat.st_mtime, usegmt=True)
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Check if an If-None-Match header matches etag (weak comparison)."""
+    if header.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque_tag
+        for candidate in header.split(",")
+    )
+
+
+def modified_since(header: str, stat: os.stat_result) -> bool:
+    """Check if the file changed after the date in an If-Modified-Since header.
+
+    Unparseable dates are treated as if the header was not sent.
+    """
+    try:
+        since = email.utils.parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        return True
+    # HTTP dates have one second resolution
+    return int(stat.st_mtime) > since.timestamp()
+
+
+def is_not_modified(
+    request_handler: "RequestHandler", etag: str, stat: os.stat_result
+) -> bool:
+    """Check if the client's cached copy is still current.
+
+    If-None-Match takes precedence over If-Modified-Since, as required by
+    RFC 9110 section 13.2.2.
+    """
+    if_none_match = request_handler.headers.get("If-None-Match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request_handler.headers.get("If-Modified-Since")
+    if if_modified_since is not None:
+        return not modified_since(if_modified_since, stat)
+    return False
+
+
+def send_not_modified(
+    request_handler: "RequestHandler", etag: str, stat: os.stat_result
+) -> None:
+    """Send a 304 Not Modified response, which never has a body."""
+    request_handler.send_response(304)
+    request_handler.send_header("ETag", etag)
+    request_handler.send_header("Last-Modified", format_last_modified(stat))
+    request_handler.end_headers()
@@ -0,0 +1,327 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+from abc import ABC, abstractmethod
+from typing import Protocol
+
+from simple_web_server.stat_cache import file_identity
+
+WATCHER_KINDS = ("auto", "inotify", "poll")
+
+# Seconds between scans of the tree by the polling watcher.
+DEFAULT_POLL_INTERVAL = 2.0
+
+# How often the inotify watcher checks if it was asked to stop.
+_STOP_CHECK_INTERVAL = 0.5
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+    | IN_DONT_FOLLOW
+)
+# Events that add or remove an entry, which changes the directory too.
+_ENTRY_EVENTS = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class Subscriber(Protocol):
+    """A cache that is told about changes to the files it holds."""
+
+    def invalidate(self, full_path: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class FileWatcher(ABC):
+    """
+    Watches a directory tree and tells subscribers which paths changed.
+
+    Subscribers get invalidate(full_path) for each file or directory that
+    was modified, created or removed, including the directory an entry was
+    added to or removed from, and clear() when changes may have been missed,
+    which is also the case when the watcher starts.
+
+    The watcher runs on a background thread of each process: the first
+    ensure_started() call in a forked worker starts a thread of its own.
+    Symbolic links are not followed, so changes to their targets outside
+    the tree go unnoticed.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(root)
+        self._subscribers: list[Subscriber] = []
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._stop = threading.Event()
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        """Tell subscriber about changes from now on."""
+        self._subscribers.append(subscriber)
+
+    def ensure_started(self) -> None:
+        """Start watching from this process, unless it already does."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A watcher thread started before a fork doesn't exist in the child
+            self._stop = threading.Event()
+            threading.Thread(
+                target=self._run, args=(self._stop,), name="file-watcher", daemon=True
+            ).start()
+            self._pid = os.getpid()
+
+    def stop(self) -> None:
+        """Stop the watcher thread of this process, if it is running."""
+        self._stop.set()
+
+    def notify(self, full_path: str) -> None:
+        """Tell the subscribers that a path changed."""
+        for subscriber in self._subscribers:
+            subscriber.invalidate(full_path)
+
+    def notify_all(self) -> None:
+        """Tell the subscribers that anything may have changed."""
+        for subscriber in self._subscribers:
+            subscriber.clear()
+
+    @abstractmethod
+    def _run(self, stop: threading.Event) -> None:
+        """Watch for changes until stop is set; runs on the watcher thread."""
+
+
+class PollingWatcher(FileWatcher):
+    """
+    Finds changes by scanning the whole tree every interval seconds.
+
+    Works everywhere, at the cost of a stat() per file and directory per
+    scan, and of changes taking up to interval seconds to be noticed.
+    """
+
+    def __init__(self, root: str, interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        super().__init__(root)
+        self.interval = interval
+
+    def _run(self, stop: threading.Event) -> None:
+        previous = scan_tree(self.root)
+        self.notify_all()
+        while not stop.wait(self.interval):
+            current = scan_tree(self.root)
+            for full_path in previous.keys() | current.keys():
+                if previous.get(full_path) != current.get(full_path):
+                    self.notify(full_path)
+            previous = current
+
+
+def scan_tree(root: str) -> dict[str, tuple[int, int, int, int]]:
+    """Map every path under root, and root itself, to its identity."""
+    identities = {}
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            identities[directory] = file_identity(os.stat(directory))
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                else:
+                    identities[entry.path] = file_identity(entry.stat())
+            except OSError:
+                continue
+    return identities
+
+
+class InotifyWatcher(FileWatcher):
+    """
+    Finds changes as they happen with Linux's inotify.
+
+    Every directory of the tree is watched, so a change costs nothing until
+    it happens and is seen right away. If the tree can't be watched, for
+    example because it has more directories than fs.inotify.max_user_watches
+    allows, the watcher falls back to polling.
+    """
+
+    def __init__(self, root: str, poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        super().__init__(root)
+        self.poll_interval = poll_interval
+        self._libc = _load_libc()
+        self._paths: dict[int, str] = {}  # Watch descriptor to directory
+
+    def _run(self, stop: threading.Event) -> None:
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            self._fall_back(stop, OSError(ctypes.get_errno(), "inotify_init1"))
+            return
+        try:
+            self._paths = {}
+            self._watch_tree(fd, self.root)
+        except OSError as e:
+            os.close(fd)
+            self._fall_back(stop, e)
+            return
+        try:
+            self.notify_all()
+            poller = select.poll()
+            poller.register(fd, select.POLLIN)
+            while not stop.is_set():
+                if poller.poll(_STOP_CHECK_INTERVAL * 1000):
+                    self._read_events(fd)
+        finally:
+            os.close(fd)
+
+    def _fall_back(self, stop: threading.Event, error: OSError) -> None:
+        sys.stderr.write(f"file watcher: {error}; polling for changes instead\n")
+        polling = PollingWatcher(self.root, self.poll_interval)
+        polling._subscribers = self._subscribers
+        polling._run(stop)
+
+    def _watch_tree(self, fd: int, directory: str) -> list[str]:
+        """Watch a directory and those below it.
+
+        Returns:
+            The paths of the files found, which may have changed before
+            their directory was watched.
+        """
+        files = []
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            wd = self._libc.inotify_add_watch(fd, os.fsencode(current), _WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                    continue  # Removed meanwhile, or not ours to watch
+                raise OSError(error, os.strerror(error), current)
+            self._paths[wd] = current
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        else:
+                            files.append(entry.path)
+            except OSError:
+                continue
+        return files
+
+    def _read_events(self, fd: int) -> None:
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            self._handle_event(fd, wd, mask, os.fsdecode(name))
+
+    def _handle_event(self, fd: int, wd: int, mask: int, name: str) -> None:
+        if mask & IN_Q_OVERFLOW:
+            self.notify_all()
+            return
+        if mask & IN_IGNORED:
+            self._paths.pop(wd, None)  # The watched directory is gone
+            return
+        directory = self._paths.get(wd)
+        if directory is None:
+            return
+        if not name:
+            # The watched directory itself changed, or was moved away with
+            # everything below it.
+            if mask & IN_MOVE_SELF:
+                self.notify_all()
+            else:
+                self.notify(directory)
+            return
+        full_path = os.path.join(directory, name)
+        self.notify(full_path)
+        if mask & _ENTRY_EVENTS:
+            self.notify(directory)
+        if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+            try:
+                new_files = self._watch_tree(fd, full_path)
+            except OSError:
+                self.notify_all()  # Out of watches; changes below are unseen
+                return
+            if mask & IN_MOVED_TO:
+                # A tree moved in replaces whatever was cached below its path
+                self.notify_all()
+            for path in new_files:
+                self.notify(path)
+
+
+def inotify_available() -> bool:
+    """Check if inotify can be used on this system."""
+    try:
+        libc = _load_libc()
+    except (OSError, AttributeError):
+        return False
+    fd = libc.inotify_init1(IN_CLOEXEC)
+    if fd < 0:
+        return False
+    os.close(fd)
+    return True
+
+
+def create_watcher(
+    root: str, kind: str = "auto", poll_interval: float = DEFAULT_POLL_INTERVAL
+) -> FileWatcher:
+    """Create a watcher of the requested kind; "auto" prefers inotify."""
+    if kind not in WATCHER_KINDS:
+        raise ValueError(f"Unknown watcher kind: {kind}")
+    if kind == "inotify" or (kind == "auto" and inotify_available()):
+        return InotifyWatcher(root, poll_interval)
+    return PollingWatcher(root, poll_interval)
+
+
+def _load_libc() -> ctypes.CDLL:
+    """Load libc with the inotify functions.
+
+    Raises:
+        OSError: If libc can't be loaded.
+        AttributeError: If it has no inotify functions.
+    """
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
@@ -1,3 +1,5 @@
+import contextlib
+import http.client
 import io
 import os
 import tempfile
@@ -16,6 +18,10 @@ def mock_request_handler() -> MagicMock:
     # Create a mock object that mimics the RequestHandler interface
     mock = MagicMock(spec=RequestHandler)
     mock.path = "/mock/path"  # Set a default path for the mock
+    mock.command = "GET"
+    mock.request_version = "HTTP/1.1"
+    # Request headers; tests add conditional/range headers as needed
+    mock.headers = http.client.HTTPMessage()
     # Mock the wfile attribute with a BytesIO object to capture writes
     mock.wfile = io.BytesIO()
     # Ensure necessary methods used by handlers are present on the mock
@@ -23,6 +29,8 @@ def mock_request_handler() -> MagicMock:
     mock.send_header = MagicMock()
     mock.end_headers = MagicMock()
     mock.send_error = MagicMock()
+    # Metrics are disabled, as they are by default
+    mock.timer = MagicMock(return_value=contextlib.nullcontext())
     return mock
 
 
@@ -0,0 +1,146 @@
+import gzip
+import os
+import zipfile
+from collections.abc import Generator
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from simple_web_server.archive import Archive
+from simple_web_server.resource_handlers.archive_handler import ArchiveHandler
+from simple_web_server.resource_handlers.resource_handler import Resource
+
+CONTENT = b"body { color: red; }\n" * 50
+
+ROOT = os.path.abspath("/srv/site")
+
+
+@pytest.fixture
+def handler(tmp_path: Path) -> Generator[ArchiveHandler, None, None]:
+    """Fixture providing a handler serving a zip file mounted at ROOT."""
+    path = tmp_path / "site.zip"
+    with zipfile.ZipFile(path, "w") as bundle:
+        bundle.writestr("index.html", b"<html>Home</html>", zipfile.ZIP_STORED)
+        bundle.writestr("css/site.css", CONTENT, zipfile.ZIP_DEFLATED)
+    archive = Archive(str(path))
+    handler_class = type(
+        "TestArchiveHandler", (ArchiveHandler,), {"archive": archive, "root": ROOT}
+    )
+    yield handler_class()
+    archive.close()
+
+
+def served_path(*parts: str) -> str:
+    return os.path.join(ROOT, *parts)
+
+
+class TestArchiveHandler:
+    """Tests for the ArchiveHandler."""
+
+    def test_can_handle_members_only(self, handler: ArchiveHandler) -> None:
+        """Test only paths in the archive are handled, whatever is on disk."""
+        # When-Then
+        assert handler.can_handle_resource(Resource(served_path("index.html"), None))
+        assert handler.can_handle_resource(Resource(served_path("css"), None))
+        assert handler.can_handle_resource(Resource(ROOT, None))
+        assert not handler.can_handle_resource(Resource(served_path("a.txt"), None))
+        assert not handler.can_handle_resource(
+            Resource(served_path("index.html"), None, directory_only=True)
+        )
+        assert not handler.can_handle("/elsewhere/index.html")
+
+    def test_sends_stored_member(
+        self, handler: ArchiveHandler, mock_request_handler: MagicMock
+    ) -> None:
+        """Test a stored member is sent as it is in the archive."""
+        # When
+        handler.handle(mock_request_handler, served_path("index.html"))
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(200)
+        mock_request_handler.send_header.assert_any_call("Content-type", "text/html")
+        mock_request_handler.send_header.assert_any_call("Accept-Ranges", "bytes")
+        assert mock_request_handler.wfile.getvalue() == b"<html>Home</html>"
+
+    def test_sends_range_of_stored_member(
+        self, handler: ArchiveHandler, mock_request_handler: MagicMock
+    ) -> None:
+        """Test byte ranges are cut from the stored member."""
+        # Given
+        mock_request_handler.headers["Range"] = "bytes=6-9"
+
+        # When
+        handler.handle(mock_request_handler, served_path("index.html"))
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(206)
+        assert mock_request_handler.wfile.getvalue() == b"Home"
+
+    def test_passes_deflated_member_through_as_gzip(
+        self, handler: ArchiveHandler, mock_request_handler: MagicMock
+    ) -> None:
+        """Test a deflated member is sent gzipped without recompressing it."""
+        # Given
+        mock_request_handler.headers["Accept-Encoding"] = "gzip"
+
+        # When
+        handler.handle(mock_request_handler, served_path("css", "site.css"))
+
+        # Then
+        body = mock_request_handler.wfile.getvalue()
+        mock_request_handler.send_header.assert_any_call("Content-Encoding", "gzip")
+        mock_request_handler.send_header.assert_any_call(
+            "Content-Length", str(len(body))
+        )
+        assert len(body) < len(CONTENT)
+        assert gzip.decompress(body) == CONTENT
+
+    def test_inflates_deflated_member_for_other_clients(
+        self, handler: ArchiveHandler, mock_request_handler: MagicMock
+    ) -> None:
+        """Test a client that doesn't accept gzip gets the inflated content."""
+        # When
+        handler.handle(mock_request_handler, served_path("css", "site.css"))
+
+        # Then
+        mock_request_handler.send_header.assert_any_call(
+            "Content-Length", str(len(CONTENT))
+        )
+        mock_request_handler.send_header.assert_any_call("Vary", "Accept-Encoding")
+        assert mock_request_handler.wfile.getvalue() == CONTENT
+
+    def test_not_modified(
+        self, handler: ArchiveHandler, mock_request_handler: MagicMock
+    ) -> None:
+        """Test a request with the member's ETag gets a 304."""
+        # Given
+        handler.handle(mock_request_handler, served_path("index.html"))
+        etag = next(
+            call.args[1]
+            for call in mock_request_handler.send_header.call_args_list
+            if call.args[0] == "ETag"
+        )
+        mock_request_handler.send_response.reset_mock()
+        mock_request_handler.headers["If-None-Match"] = etag
+
+        # When
+        handler.handle(mock_request_handler, served_path("index.html"))
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(304)
+
+    def test_lists_directory(
+        self, handler: ArchiveHandler, mock_request_handler: MagicMock
+    ) -> None:
+        """Test a directory of the archive is listed from the index."""
+        # Given
+        mock_request_handler.path = "/"
+
+        # When
+        handler.handle(mock_request_handler, ROOT)
+
+        # Then
+        body = mock_request_handler.wfile.getvalue()
+        assert b"<a href='css/'>css</a>" in body
+        assert b"<a href='index.html'>index.html</a>" in body
@@ -1,13 +1,89 @@
+import gzip
+import io
+import json
 import os
-from unittest.mock import ANY, MagicMock, patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 
-from simple_web_server.resource_handlers.directory_handler import DirectoryHandler
+from simple_web_server.content_cache import ContentCache
+from simple_web_server.listing_cache import (
+    DetailsCache,
+    ListingCache,
+    scan_directory_details,
+)
+from simple_web_server.resource_handlers.directory_handler import (
+    DirectoryHandler,
+    parse_accept,
+    requested_page,
+    wants_json,
+)
+from simple_web_server.resource_handlers.resource_handler import Resource
+from simple_web_server.validators import make_etag
 
 # Tests will automatically use fixtures from ../conftest.py
 
 
+def dechunk(data: bytes) -> bytes:
+    """Decode a body sent in the chunked transfer coding."""
+    body = b""
+    while True:
+        size_line, data = data.split(b"\r\n", 1)
+        size = int(size_line, 16)
+        if size == 0:
+            assert data == b"\r\n"
+            return body
+        body += data[:size]
+        assert data[size : size + 2] == b"\r\n"
+        data = data[size + 2 :]
+
+
+def test_parse_accept() -> None:
+    """Test media ranges are read with their q-value, whatever the parameters."""
+    # When
+    accepted = parse_accept(
+        "text/html, Application/JSON;charset=utf-8;q=0.5;ext=1, */*;q=0.1, ,"
+    )
+
+    # Then
+    assert accepted == {"text/html": 1.0, "application/json": 0.5, "*/*": 0.1}
+
+
+@pytest.mark.parametrize(
+    ("accept", "query", "expected"),
+    [
+        (None, {}, False),
+        ("application/json", {}, True),
+        ("text/html,application/xhtml+xml,*/*;q=0.8", {}, False),
+        ("text/html;q=0.5, application/json", {}, True),
+        ("application/json;q=0", {}, False),
+        (None, {"format": ["json"]}, True),
+        ("application/json", {"format": ["html"]}, False),
+        ("text/html, application/json;charset=utf-8;q=0.1", {}, False),
+        ("application/json;charset=utf-8", {}, True),
+        ("*/*", {}, False),
+        ("application/*", {}, True),
+        ("text/*, */*;q=0.5", {}, False),
+        ("text/html;q=0.5, application/*", {}, True),
+        ("application/json, */*", {}, True),
+    ],
+)
+def test_wants_json(
+    accept: str | None, query: dict[str, list[str]], expected: bool
+) -> None:
+    """Test JSON is chosen by the format parameter or the Accept header."""
+    assert wants_json(accept, query) is expected
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [("", 1), ("page=3", 3), ("page=0", 1), ("page=x", 1), ("page=%C2%B2", 1)],
+)
+def test_requested_page(query: str, expected: int) -> None:
+    """Test invalid page numbers fall back to the first page."""
+    assert requested_page(query) == expected
+
+
 class TestDirectoryHandler:
     """Tests for the DirectoryHandler."""
 
@@ -36,6 +112,15 @@ class TestDirectoryHandler:
         assert handler.can_handle(temp_file) is False
         assert handler.can_handle(non_existent_path) is False
 
+    def test_can_handle_resource_uses_stat_result(
+        self, handler: DirectoryHandler, temp_file: str, temp_dir: str
+    ) -> None:
+        """Test can_handle_resource accepts only stat results of directories."""
+        # When-Then
+        assert handler.can_handle_resource(Resource(temp_dir, os.stat(temp_dir)))
+        assert not handler.can_handle_resource(Resource(temp_file, os.stat(temp_file)))
+        assert not handler.can_handle_resource(Resource(temp_dir, None))
+
     def test_handle_sends_listing(
         self,
         handler: DirectoryHandler,
@@ -56,11 +141,11 @@ class TestDirectoryHandler:
         mock_request_handler.send_header.assert_any_call(
             "Content-type", "text/html; charset=utf-8"
         )
-        mock_request_handler.send_header.assert_any_call("Content-Length", ANY)
+        mock_request_handler.send_header.assert_any_call("Transfer-Encoding", "chunked")
         mock_request_handler.end_headers.assert_called_once()
 
         # Check response body content
-        written_data = mock_request_handler.wfile.getvalue()
+        written_data = dechunk(mock_request_handler.wfile.getvalue())
         expected_title = f"Directory listing for /{dir_name}/"
         assert expected_title.encode() in written_data
         # Check for files/dirs present in the fixture
@@ -76,18 +161,305 @@ class TestDirectoryHandler:
     ) -> None:
         """Test handle sends 403 on OSError (permission denied)."""
         # Given
-        restricted_path_abs = os.path.join(temp_dir, "restricted")
         mock_request_handler.path = "/restricted/"
-        # Mock os.listdir to raise PermissionError
+        # Mock os.scandir to raise PermissionError
         with patch(
-            "os.listdir", side_effect=OSError("[Errno 13] Permission denied")
-        ) as mock_listdir:
+            "os.scandir", side_effect=OSError("[Errno 13] Permission denied")
+        ) as mock_scandir:
             # When
-            handler.handle(mock_request_handler, restricted_path_abs)
+            handler.handle(mock_request_handler, temp_dir)
 
             # Then
-            mock_listdir.assert_called_once_with(restricted_path_abs)
+            mock_scandir.assert_called_once_with(temp_dir)
             mock_request_handler.send_error.assert_called_once()
             args, _ = mock_request_handler.send_error.call_args
             assert args[0] == 403
             assert "Permission denied" in args[1]
+
+    def test_handle_if_none_match_sends_304(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test an unchanged directory listing is answered with 304."""
+        # Given
+        etag = make_etag(os.stat(temp_dir), weak=True)
+        mock_request_handler.headers["If-None-Match"] = etag
+
+        # When
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(304)
+        mock_request_handler.send_header.assert_any_call("ETag", etag)
+        assert mock_request_handler.wfile.getvalue() == b""
+
+    def test_handle_compresses_listing(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test listings are gzipped for clients that accept it."""
+        # Given
+        mock_request_handler.headers["Accept-Encoding"] = "gzip"
+
+        # When
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        mock_request_handler.send_header.assert_any_call("Content-Encoding", "gzip")
+        listing = gzip.decompress(dechunk(mock_request_handler.wfile.getvalue()))
+        assert b"file1.html" in listing
+
+    def test_handle_serves_cached_listing_until_directory_changes(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test a listing is rendered once and again after the directory changes."""
+        # Given
+        handler.listing_cache = ListingCache()
+        handler.page_cache = ContentCache()
+        handler.handle(mock_request_handler, temp_dir)
+        stat = os.stat(temp_dir)
+
+        # When
+        with patch("os.scandir") as mock_scandir:
+            handler.handle(mock_request_handler, temp_dir)
+        new_file = os.path.join(temp_dir, "file3.txt")
+        with open(new_file, "w") as f:
+            f.write("New file")
+        os.utime(temp_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        mock_request_handler.wfile = io.BytesIO()
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        mock_scandir.assert_not_called()
+        assert handler.page_cache.hits == 1
+        assert handler.listing_cache.misses == 2
+        assert b"file3.txt" in mock_request_handler.wfile.getvalue()
+
+    def test_handle_paginates_listing(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test the page query parameter selects a slice of the entries."""
+        # Given
+        handler.page_size = 2
+        mock_request_handler.path = "/listing/?page=2"
+
+        # When
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(200)
+        written_data = mock_request_handler.wfile.getvalue()
+        assert b"file1.html" not in written_data
+        assert b"subdir/" in written_data
+        assert b"Page 2 of 2" in written_data
+        assert b"href='?page=1'" in written_data
+        assert b"Directory listing for /listing/<" in written_data
+
+    def test_handle_page_out_of_range_sends_404(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test asking for a page past the end of the listing sends 404."""
+        # Given
+        handler.page_size = 2
+        mock_request_handler.path = "/listing/?page=3"
+
+        # When
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        mock_request_handler.send_error.assert_called_once()
+        assert mock_request_handler.send_error.call_args[0][0] == 404
+
+    def test_handle_escapes_entry_names(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test entry names are escaped in the HTML and quoted in links."""
+        # Given
+        with open(os.path.join(temp_dir, "<b>&'.txt"), "w") as f:
+            f.write("Oddly named file")
+
+        # When
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        written_data = mock_request_handler.wfile.getvalue()
+        assert b"<b>" not in written_data
+        assert b"&lt;b&gt;&amp;&#x27;.txt" in written_data
+        assert b"href='%3Cb%3E%26%27.txt'" in written_data
+
+    def test_head_sends_listing_headers_only(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test HEAD sends the headers of the listing but not the listing."""
+        # Given
+        mock_request_handler.command = "HEAD"
+
+        # When
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(200)
+        mock_request_handler.send_header.assert_any_call("Transfer-Encoding", "chunked")
+        assert mock_request_handler.wfile.getvalue() == b""
+
+    def test_cached_listing_is_sent_with_length(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test a streamed listing is cached and later sent with its length."""
+        # Given
+        handler.page_cache = ContentCache()
+        handler.handle(mock_request_handler, temp_dir)
+        streamed = dechunk(mock_request_handler.wfile.getvalue())
+        mock_request_handler.reset_mock()
+        mock_request_handler.wfile = io.BytesIO()
+
+        # When
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        mock_request_handler.send_header.assert_any_call(
+            "Content-Length", str(len(streamed))
+        )
+        assert mock_request_handler.wfile.getvalue() == streamed
+
+    def test_http_10_client_gets_listing_until_close(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test HTTP/1.0 clients get an unframed body and a closed connection."""
+        # Given
+        mock_request_handler.request_version = "HTTP/1.0"
+        handler.page_cache = None
+
+        # When
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        assert mock_request_handler.close_connection is True
+        header_names = [c.args[0] for c in mock_request_handler.send_header.mock_calls]
+        assert "Transfer-Encoding" not in header_names
+        assert mock_request_handler.wfile.getvalue().endswith(b"</body></html>")
+
+    def test_json_listing_has_entry_metadata(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test clients accepting JSON get every entry's type, size and mtime."""
+        # Given
+        mock_request_handler.path = "/listing/"
+        mock_request_handler.headers["Accept"] = "application/json"
+
+        # When
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        mock_request_handler.send_header.assert_any_call(
+            "Content-type", "application/json"
+        )
+        listing = json.loads(dechunk(mock_request_handler.wfile.getvalue()))
+        assert listing["path"] == "/listing/"
+        assert listing["total"] == 3
+        assert [entry["name"] for entry in listing["entries"]] == [
+            "file1.html",
+            "file2.txt",
+            "subdir",
+        ]
+        file2 = listing["entries"][1]
+        assert file2["type"] == "file"
+        assert file2["size"] == len("Text file content")
+        assert file2["mtime"] == os.stat(os.path.join(temp_dir, "file2.txt")).st_mtime
+        assert listing["entries"][2]["type"] == "directory"
+
+    def test_json_listing_sorts_and_slices(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test sort, offset and limit select the entries of a JSON listing."""
+        # Given
+        mock_request_handler.path = "/listing/?format=json&sort=-name&offset=1&limit=1"
+
+        # When
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        listing = json.loads(dechunk(mock_request_handler.wfile.getvalue()))
+        assert listing["total"] == 3
+        assert listing["offset"] == 1
+        assert [entry["name"] for entry in listing["entries"]] == ["file2.txt"]
+
+    def test_json_listing_pages_share_one_scan(
+        self, mock_request_handler: MagicMock, temp_dir: str
+    ) -> None:
+        """Test paging through a JSON listing scans the directory once."""
+        # Given
+        handler = type(
+            "TestDirectoryHandler",
+            (DirectoryHandler,),
+            {"details_cache": DetailsCache(ttl=60)},
+        )()
+        names = []
+
+        # When
+        with patch(
+            "simple_web_server.listing_cache.scan_directory_details",
+            wraps=scan_directory_details,
+        ) as mock_scan:
+            for offset in range(3):
+                mock_request_handler.path = (
+                    f"/listing/?format=json&sort=-size&offset={offset}&limit=1"
+                )
+                mock_request_handler.wfile = io.BytesIO()
+                handler.handle(mock_request_handler, temp_dir)
+                listing = json.loads(dechunk(mock_request_handler.wfile.getvalue()))
+                names += [entry["name"] for entry in listing["entries"]]
+
+        # Then
+        mock_scan.assert_called_once_with(temp_dir)
+        assert sorted(names) == ["file1.html", "file2.txt", "subdir"]
+
+    @pytest.mark.parametrize("query", ["sort=owner", "limit=-1", "offset=x"])
+    def test_json_listing_rejects_invalid_parameters(
+        self,
+        handler: DirectoryHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+        query: str,
+    ) -> None:
+        """Test unknown sort fields and bad numbers get a 400."""
+        # Given
+        mock_request_handler.path = f"/listing/?format=json&{query}"
+
+        # When
+        handler.handle(mock_request_handler, temp_dir)
+
+        # Then
+        mock_request_handler.send_error.assert_called_once()
+        assert mock_request_handler.send_error.call_args[0][0] == 400
@@ -1,10 +1,20 @@
+import gzip
+import io
 import os
 import tempfile
-from unittest.mock import MagicMock
+import threading
+import time
+from unittest.mock import MagicMock, patch
 
 import pytest
 
+from simple_web_server.content_cache import ContentCache
+from simple_web_server.mmap_cache import MmapCache
 from simple_web_server.resource_handlers.file_handler import FileHandler
+from simple_web_server.resource_handlers.resource_handler import Resource
+from simple_web_server.single_flight import SingleFlight
+from simple_web_server.stat_cache import stat_or_none
+from simple_web_server.validators import make_etag
 
 # Tests will automatically use fixtures from ../conftest.py
 
@@ -35,6 +45,39 @@ class TestFileHandler:
         assert handler.can_handle(temp_dir) is False
         assert handler.can_handle(non_existent_path) is False
 
+    def test_can_handle_resource_uses_stat_result(
+        self, handler: FileHandler, temp_file: str, temp_dir: str
+    ) -> None:
+        """Test can_handle_resource accepts only stat results of files."""
+        # When-Then
+        assert handler.can_handle_resource(Resource(temp_file, os.stat(temp_file)))
+        assert not handler.can_handle_resource(Resource(temp_dir, os.stat(temp_dir)))
+        assert not handler.can_handle_resource(Resource(temp_file, None))
+
+    def test_handle_resource_reuses_stat_result(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test handle_resource doesn't stat the file again."""
+        # Given
+        resource = Resource(temp_file, os.stat(temp_file))
+        mock_request_handler.stat_path = MagicMock(side_effect=stat_or_none)
+
+        # When
+        with patch("os.stat", wraps=os.stat) as mock_stat:
+            handler.handle_resource(mock_request_handler, resource)
+
+        # Then
+        assert all(call.args[0] != temp_file for call in mock_stat.call_args_list)
+        mock_request_handler.stat_path.assert_any_call(temp_file + ".gz")
+        mock_request_handler.send_response.assert_called_once_with(200)
+        assert (
+            mock_request_handler.wfile.getvalue()
+            == b"<html><body>Test content</body></html>"
+        )
+
     def test_handle_sends_file_content(
         self,
         handler: FileHandler,
@@ -106,3 +149,467 @@ class TestFileHandler:
         args, _ = mock_request_handler.send_error.call_args
         assert args[0] == 404  # Expecting 404 as per handler's exception handling
         assert "Could not read file" in args[1]
+
+    def test_handle_serves_repeat_requests_from_cache(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test a cached file is served again without reopening it."""
+        # Given
+        handler.content_cache = ContentCache()
+        handler.handle(mock_request_handler, temp_file)
+        mock_request_handler.wfile = io.BytesIO()
+
+        # When
+        with patch("builtins.open") as mock_open:
+            handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        mock_open.assert_not_called()
+        assert handler.content_cache.hits == 1
+        mock_request_handler.send_header.assert_any_call("Content-Length", "38")
+        assert (
+            mock_request_handler.wfile.getvalue()
+            == b"<html><body>Test content</body></html>"
+        )
+
+    def test_handle_rereads_modified_file(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test a cached file is reread once it changes on disk."""
+        # Given
+        handler.content_cache = ContentCache()
+        handler.handle(mock_request_handler, temp_file)
+        with open(temp_file, "wb") as f:
+            f.write(b"changed")
+        mock_request_handler.wfile = io.BytesIO()
+
+        # When
+        handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        assert mock_request_handler.wfile.getvalue() == b"changed"
+        assert handler.content_cache.hits == 0
+
+    def test_handle_sends_validators(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test responses carry ETag and Last-Modified headers."""
+        # When
+        handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        mock_request_handler.send_header.assert_any_call(
+            "ETag", make_etag(os.stat(temp_file))
+        )
+        header_names = [c.args[0] for c in mock_request_handler.send_header.mock_calls]
+        assert "Last-Modified" in header_names
+
+    def test_handle_if_none_match_sends_304(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test a matching If-None-Match gets 304 with no body."""
+        # Given
+        mock_request_handler.headers["If-None-Match"] = make_etag(os.stat(temp_file))
+
+        # When
+        with patch("builtins.open") as mock_open:
+            handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        mock_open.assert_not_called()
+        mock_request_handler.send_response.assert_called_once_with(304)
+        assert mock_request_handler.wfile.getvalue() == b""
+
+    def test_handle_if_modified_since_sends_304(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test an If-Modified-Since at or after the mtime gets 304."""
+        # Given
+        mock_request_handler.headers["If-Modified-Since"] = (
+            "Fri, 01 Jan 2100 00:00:00 GMT"
+        )
+
+        # When
+        handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(304)
+        assert mock_request_handler.wfile.getvalue() == b""
+
+    def test_handle_stale_etag_sends_content(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test a non-matching If-None-Match gets the full file."""
+        # Given
+        mock_request_handler.headers["If-None-Match"] = '"stale"'
+        mock_request_handler.headers["If-Modified-Since"] = (
+            "Fri, 01 Jan 2100 00:00:00 GMT"
+        )
+
+        # When
+        handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(200)
+        assert (
+            mock_request_handler.wfile.getvalue()
+            == b"<html><body>Test content</body></html>"
+        )
+
+    @pytest.mark.parametrize("cached", [False, True])
+    def test_handle_range_sends_206(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+        cached: bool,
+    ) -> None:
+        """Test a byte range is sent as 206 from disk or from the cache."""
+        # Given
+        handler.content_cache = ContentCache() if cached else None
+        mock_request_handler.headers["Range"] = "bytes=6-11"
+
+        # When
+        handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(206)
+        mock_request_handler.send_header.assert_any_call(
+            "Content-Range", "bytes 6-11/38"
+        )
+        mock_request_handler.send_header.assert_any_call("Content-Length", "6")
+        assert mock_request_handler.wfile.getvalue() == b"<body>"
+
+    def test_handle_unsatisfiable_range_sends_416(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test a range past the end of the file gets 416."""
+        # Given
+        mock_request_handler.headers["Range"] = "bytes=100-"
+
+        # When
+        handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(416)
+        mock_request_handler.send_header.assert_any_call("Content-Range", "bytes */38")
+
+    def test_handle_stale_if_range_sends_whole_file(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test a range with an outdated If-Range gets the full file."""
+        # Given
+        mock_request_handler.headers["Range"] = "bytes=6-11"
+        mock_request_handler.headers["If-Range"] = '"outdated"'
+
+        # When
+        handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(200)
+        mock_request_handler.send_header.assert_any_call("Accept-Ranges", "bytes")
+        assert len(mock_request_handler.wfile.getvalue()) == 38
+
+    def test_handle_compresses_on_the_fly(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test compressible files are gzipped for clients that accept it."""
+        # Given
+        text_file = os.path.join(temp_dir, "big.txt")
+        with open(text_file, "wb") as f:
+            f.write(b"compress me " * 100)
+        handler.compressed_cache = ContentCache()
+        mock_request_handler.headers["Accept-Encoding"] = "gzip"
+
+        # When
+        handler.handle(mock_request_handler, text_file)
+        handler.handle(mock_request_handler, text_file)
+
+        # Then
+        mock_request_handler.send_header.assert_any_call("Content-Encoding", "gzip")
+        mock_request_handler.send_header.assert_any_call("Vary", "Accept-Encoding")
+        body = mock_request_handler.wfile.getvalue()
+        half = len(body) // 2
+        assert gzip.decompress(body[:half]) == b"compress me " * 100
+        assert body[:half] == body[half:]
+        assert handler.compressed_cache.hits == 1
+
+    def test_ranges_of_compressed_file_use_compressed_length(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test ranges of a file gzipped on the fly refer to the gzipped body."""
+        # Given
+        text_file = os.path.join(temp_dir, "big.txt")
+        with open(text_file, "wb") as f:
+            f.write(b"compress me " * 100)
+        handler.compressed_cache = ContentCache()
+        mock_request_handler.headers["Accept-Encoding"] = "gzip"
+        mock_request_handler.headers["Range"] = "bytes=1000-1999"
+
+        # When
+        handler.handle(mock_request_handler, text_file)
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(416)
+        entry = handler.compressed_cache.get((text_file, "gzip"), os.stat(text_file))
+        assert entry is not None
+        length = len(entry.body)
+        mock_request_handler.send_header.assert_any_call(
+            "Content-Range", f"bytes */{length}"
+        )
+
+        # When the range fits the gzipped body
+        mock_request_handler.reset_mock()
+        mock_request_handler.headers.replace_header("Range", "bytes=-10")
+        handler.handle(mock_request_handler, text_file)
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(206)
+        mock_request_handler.send_header.assert_any_call(
+            "Content-Range", f"bytes {length - 10}-{length - 1}/{length}"
+        )
+        assert mock_request_handler.wfile.getvalue() == entry.body[-10:]
+
+    def test_concurrent_misses_compress_once(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test simultaneous requests for an uncached file share one compression."""
+        # Given
+        text_file = os.path.join(temp_dir, "big.txt")
+        with open(text_file, "wb") as f:
+            f.write(b"compress me " * 100)
+        handler.compressed_cache = ContentCache()
+        handler.single_flight = SingleFlight()
+        mock_request_handler.headers["Accept-Encoding"] = "gzip"
+
+        def slow_compress(body: bytes, coding: str) -> bytes:
+            time.sleep(0.2)
+            return gzip.compress(body)
+
+        # When
+        with patch(
+            "simple_web_server.resource_handlers.file_handler.compress",
+            side_effect=slow_compress,
+        ) as mock_compress:
+            threads = [
+                threading.Thread(
+                    target=handler.handle, args=(mock_request_handler, text_file)
+                )
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=5)
+
+        # Then
+        mock_compress.assert_called_once()
+        assert handler.single_flight.followers == 3
+        assert mock_request_handler.send_response.call_count == 4
+
+    def test_handle_prefers_precompressed_sibling(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test an up-to-date .gz sibling is sent instead of compressing."""
+        # Given
+        text_file = os.path.join(temp_dir, "file2.txt")
+        with open(text_file + ".gz", "wb") as f:
+            f.write(b"precompressed")
+        mock_request_handler.headers["Accept-Encoding"] = "gzip, deflate"
+
+        # When
+        handler.handle(mock_request_handler, text_file)
+
+        # Then
+        mock_request_handler.send_header.assert_any_call("Content-type", "text/plain")
+        mock_request_handler.send_header.assert_any_call("Content-Encoding", "gzip")
+        assert mock_request_handler.wfile.getvalue() == b"precompressed"
+
+    def test_cached_sibling_keeps_headers_of_each_request(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test a cached .gz sibling gets the headers of the path it was asked by."""
+        # Given
+        handler.content_cache = ContentCache()
+        text_file = os.path.join(temp_dir, "file2.txt")
+        with open(text_file + ".gz", "wb") as f:
+            f.write(gzip.compress(b"Text file content"))
+        handler.handle(mock_request_handler, text_file + ".gz")
+        direct_headers = [
+            call.args for call in mock_request_handler.send_header.call_args_list
+        ]
+        mock_request_handler.send_header.reset_mock()
+        mock_request_handler.wfile = io.BytesIO()
+        mock_request_handler.headers["Accept-Encoding"] = "gzip"
+
+        # When
+        handler.handle(mock_request_handler, text_file)
+
+        # Then
+        assert ("Content-Encoding", "gzip") not in direct_headers
+        assert handler.content_cache.hits == 1
+        mock_request_handler.send_header.assert_any_call("Content-Encoding", "gzip")
+        mock_request_handler.send_header.assert_any_call("Vary", "Accept-Encoding")
+        body = mock_request_handler.wfile.getvalue()
+        assert gzip.decompress(body) == b"Text file content"
+
+        # When the sibling is asked for directly again
+        mock_request_handler.send_header.reset_mock()
+        handler.handle(mock_request_handler, text_file + ".gz")
+
+        # Then
+        sent = [call.args for call in mock_request_handler.send_header.call_args_list]
+        assert ("Content-Encoding", "gzip") not in sent
+        assert handler.content_cache.hits == 2
+
+    def test_handle_identity_without_accept_encoding(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_dir: str,
+    ) -> None:
+        """Test clients that don't accept gzip get the file as stored."""
+        # Given
+        text_file = os.path.join(temp_dir, "file2.txt")
+        with open(text_file + ".gz", "wb") as f:
+            f.write(b"precompressed")
+
+        # When
+        handler.handle(mock_request_handler, text_file)
+
+        # Then
+        mock_request_handler.send_header.assert_any_call("Vary", "Accept-Encoding")
+        assert mock_request_handler.wfile.getvalue() == b"Text file content"
+
+    def test_handle_serves_large_file_from_mapping(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test files over the mmap threshold are sent from a shared mapping."""
+        # Given
+        handler.content_cache = None
+        handler.mmap_cache = MmapCache(min_size=1)
+
+        # When
+        with patch("builtins.open", wraps=open) as mock_open:
+            handler.handle(mock_request_handler, temp_file)
+            handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        mock_open.assert_called_once_with(temp_file, "rb")
+        assert handler.mmap_cache.hits == 1
+        mock_request_handler.send_header.assert_any_call("Content-Length", "38")
+        assert (
+            mock_request_handler.wfile.getvalue()
+            == b"<html><body>Test content</body></html>" * 2
+        )
+
+    def test_handle_serves_range_from_mapping(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test byte ranges are sliced out of the mapping."""
+        # Given
+        handler.content_cache = None
+        handler.mmap_cache = MmapCache(min_size=1)
+        mock_request_handler.headers["Range"] = "bytes=6-11"
+
+        # When
+        handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        mock_request_handler.send_response.assert_called_once_with(206)
+        assert mock_request_handler.wfile.getvalue() == b"<body>"
+
+    def test_head_sends_headers_without_opening_file(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+        temp_file: str,
+    ) -> None:
+        """Test HEAD builds the response from the stat result alone."""
+        # Given
+        mock_request_handler.command = "HEAD"
+        mock_request_handler.headers["Range"] = "bytes=0-4"
+        stat = os.stat(temp_file)
+
+        # When
+        with patch("builtins.open") as mock_open:
+            handler.handle(mock_request_handler, temp_file)
+
+        # Then
+        mock_open.assert_not_called()
+        mock_request_handler.send_response.assert_called_once_with(200)
+        mock_request_handler.send_header.assert_any_call("Content-Length", "38")
+        mock_request_handler.send_header.assert_any_call("ETag", make_etag(stat))
+        assert mock_request_handler.wfile.getvalue() == b""
+
+    def test_head_of_uncompressed_gzip_leaves_out_length(
+        self,
+        handler: FileHandler,
+        mock_request_handler: MagicMock,
+    ) -> None:
+        """Test HEAD doesn't compress a file just to learn its length."""
+        # Given
+        handler.compressed_cache = ContentCache()
+        mock_request_handler.command = "HEAD"
+        mock_request_handler.headers["Accept-Encoding"] = "gzip"
+        with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as f:
+            f.write(b"compress me " * 100)
+
+        try:
+            # When
+            with patch("builtins.open") as mock_open:
+                handler.handle(mock_request_handler, f.name)
+
+            # Then
+            mock_open.assert_not_called()
+            mock_request_handler.send_header.assert_any_call("Content-Encoding", "gzip")
+            names = [c.args[0] for c in mock_request_handler.send_header.call_args_list]
+            assert "Content-Length" not in names
+            assert mock_request_handler.wfile.getvalue() == b""
+        finally:
+            os.unlink(f.name)
@@ -7,6 +7,7 @@ import pytest
 from simple_web_server.resource_handlers.non_existent_resource_handler import (
     NonExistentResourceHandler,
 )
+from simple_web_server.resource_handlers.resource_handler import Resource
 
 # Tests will automatically use fixtures from ../conftest.py
 
@@ -51,6 +52,18 @@ class TestNonExistentResourceHandler:
         assert handler.can_handle(temp_file) is False
         assert handler.can_handle(temp_dir) is False
 
+    def test_can_handle_resource_uses_stat_result(
+        self, handler: NonExistentResourceHandler, temp_file: str
+    ) -> None:
+        """Test can_handle_resource only looks at the given stat result."""
+        # Given
+        missing = Resource("/this/path/does/not/exist/ever", None)
+        existing = Resource(temp_file, os.stat(temp_file))
+
+        # When-Then
+        assert handler.can_handle_resource(missing) is True
+        assert handler.can_handle_resource(existing) is False
+
     def test_handle_sends_404(
         self,
         handler: NonExistentResourceHandler,
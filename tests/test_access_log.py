@@ -0,0 +1,124 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from simple_web_server.access_log import (
+    AccessLogger,
+    AccessRecord,
+    ErrorRecord,
+    format_combined,
+    format_json,
+)
+
+RECORD = AccessRecord(
+    host="127.0.0.1",
+    timestamp=0.0,
+    request_line='GET /a"b HTTP/1.1',
+    status=200,
+    length="38",
+    referer="",
+    user_agent="curl/8.0\n",
+    duration=0.0125,
+)
+
+
+def test_format_combined_escapes_fields() -> None:
+    """Test quotes and control characters can't break a combined log line."""
+    # When
+    line = format_combined(RECORD)
+
+    # Then
+    assert line.startswith("127.0.0.1 - - [")
+    assert line.endswith('] "GET /a\\"b HTTP/1.1" 200 38 "-" "curl/8.0\\x0a"\n')
+
+
+def test_format_json_writes_one_object_per_line() -> None:
+    """Test JSON records hold the request details on a single line."""
+    # When
+    line = format_json(RECORD)
+
+    # Then
+    assert line.count("\n") == 1
+    assert json.loads(line) == {
+        "time": "1970-01-01T00:00:00.000+00:00",
+        "host": "127.0.0.1",
+        "request": 'GET /a"b HTTP/1.1',
+        "status": 200,
+        "length": 38,
+        "referer": None,
+        "user_agent": "curl/8.0\n",
+        "duration_ms": 12.5,
+    }
+
+
+class TestAccessLogger:
+    """Tests for the AccessLogger."""
+
+    def test_close_writes_queued_records(self, temp_dir: str) -> None:
+        """Test records logged before close end up in the log file."""
+        # Given
+        path = os.path.join(temp_dir, "access.log")
+        logger = AccessLogger(path, log_format="json")
+
+        # When
+        for _ in range(3):
+            logger.log(RECORD)
+        logger.close()
+
+        # Then
+        with open(path) as file:
+            lines = file.readlines()
+        assert [json.loads(line)["status"] for line in lines] == [200, 200, 200]
+
+    def test_error_records_go_to_stderr(
+        self, temp_dir: str, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test error messages are written to stderr, not to the log file."""
+        # Given
+        path = os.path.join(temp_dir, "access.log")
+        logger = AccessLogger(path)
+
+        # When
+        logger.log(ErrorRecord("127.0.0.1", 0.0, "code 404, message Not Found\n"))
+        logger.log(RECORD)
+        logger.close()
+
+        # Then
+        with open(path) as file:
+            assert file.read() == format_combined(RECORD)
+        stderr = capsys.readouterr().err
+        assert stderr.startswith("127.0.0.1 - - [")
+        assert stderr.endswith("] code 404, message Not Found\\x0a\n")
+
+    def test_full_queue_drops_records(self, temp_dir: str) -> None:
+        """Test records are dropped, not waited for, when the writer lags."""
+        # Given
+        logger = AccessLogger(os.path.join(temp_dir, "access.log"), max_queue=1)
+
+        # When
+        with patch.object(logger, "_start"):  # No writer drains the queue
+            for _ in range(3):
+                logger.log(RECORD)
+
+        # Then
+        assert logger.dropped == 2
+
+    def test_rotates_full_log_file(self, temp_dir: str) -> None:
+        """Test a log file over max_bytes is moved aside before writing."""
+        # Given
+        path = os.path.join(temp_dir, "access.log")
+        logger = AccessLogger(path, max_bytes=100, backup_count=1)
+        logger.log(RECORD)
+        logger.close()
+
+        # When
+        logger.log(RECORD)
+        logger.close()
+
+        # Then
+        for log_path in (path, path + ".1"):
+            with open(log_path) as file:
+                assert len(file.readlines()) == 1
+        assert not os.path.exists(path + ".2")
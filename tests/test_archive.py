@@ -0,0 +1,106 @@
+import io
+import tarfile
+import zipfile
+import zlib
+from pathlib import Path
+
+import pytest
+
+from simple_web_server.archive import Archive
+
+CONTENT = b"body { color: red; }\n" * 50
+
+
+def make_zip(path: Path) -> str:
+    """Write a zip file with a stored, a deflated and an implicit directory."""
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("index.html", b"<html>Home</html>", zipfile.ZIP_STORED)
+        archive.writestr("css/site.css", CONTENT, zipfile.ZIP_DEFLATED)
+        archive.writestr("docs/", b"")
+    return str(path)
+
+
+class TestArchive:
+    """Tests for the Archive."""
+
+    def test_indexes_zip_members(self, tmp_path: Path) -> None:
+        """Test zip members are found by path, with their stored data."""
+        # Given
+        archive = Archive(make_zip(tmp_path / "site.zip"))
+
+        # When
+        stored = archive.member("index.html")
+        deflated = archive.member("css/site.css")
+
+        # Then
+        assert stored is not None and deflated is not None
+        assert bytes(archive.data(stored)) == b"<html>Home</html>"
+        assert deflated.deflated is True
+        assert deflated.stat.st_size == len(CONTENT)
+        assert zlib.decompress(archive.data(deflated), -zlib.MAX_WBITS) == CONTENT
+        assert b"".join(archive.inflate(deflated)) == CONTENT
+        archive.close()
+
+    def test_adds_implicit_directories(self, tmp_path: Path) -> None:
+        """Test directories only named in member paths can be listed."""
+        # Given
+        archive = Archive(make_zip(tmp_path / "site.zip"))
+
+        # When
+        css = archive.member("css")
+        root_entries = [(entry.name, entry.is_dir) for entry in archive.listing("")]
+
+        # Then
+        assert css is not None and css.is_dir
+        assert root_entries == [("css", True), ("docs", True), ("index.html", False)]
+        assert [entry.name for entry in archive.listing("css")] == ["site.css"]
+        assert archive.listing("docs") == []
+        archive.close()
+
+    def test_indexes_tar_members(self, tmp_path: Path) -> None:
+        """Test tar members are served from their offsets in the tar file."""
+        # Given
+        path = tmp_path / "site.tar"
+        with tarfile.open(path, "w") as tar:
+            info = tarfile.TarInfo("./assets/app.js")
+            info.size = len(CONTENT)
+            info.mtime = 1_700_000_000
+            tar.addfile(info, io.BytesIO(CONTENT))
+
+        # When
+        archive = Archive(str(path))
+        member = archive.member("assets/app.js")
+
+        # Then
+        assert member is not None and member.deflated is False
+        assert bytes(archive.data(member)) == CONTENT
+        assert member.stat.st_mtime == 1_700_000_000
+        assert [entry.name for entry in archive.listing("")] == ["assets"]
+        archive.close()
+
+    def test_refuses_compressed_tar(self, tmp_path: Path) -> None:
+        """Test a compressed tar file is refused, its offsets being useless."""
+        # Given
+        path = tmp_path / "site.tar.gz"
+        with tarfile.open(path, "w:gz") as tar:
+            tar.addfile(tarfile.TarInfo("empty.txt"), io.BytesIO())
+
+        # When-Then
+        with pytest.raises(ValueError, match="uncompressed tar"):
+            Archive(str(path))
+
+    def test_etag_identity_changes_with_content(self, tmp_path: Path) -> None:
+        """Test members of the same size and mtime get different inodes."""
+        # Given
+        with zipfile.ZipFile(tmp_path / "a.zip", "w") as archive:
+            archive.writestr(zipfile.ZipInfo("a.txt"), b"aaaa")
+            archive.writestr(zipfile.ZipInfo("b.txt"), b"bbbb")
+
+        # When
+        archive = Archive(str(tmp_path / "a.zip"))
+        first, second = archive.member("a.txt"), archive.member("b.txt")
+
+        # Then
+        assert first is not None and second is not None
+        assert first.stat.st_ino != second.stat.st_ino
+        archive.close()
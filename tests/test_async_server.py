@@ -0,0 +1,75 @@
+import os
+import socket
+import threading
+import urllib.error
+import urllib.request
+from collections.abc import Generator
+
+import pytest
+
+from simple_web_server.__main__ import RequestHandler
+from simple_web_server.async_server import AsyncHTTPServer
+
+
+@pytest.fixture
+def async_server(temp_dir: str) -> Generator[AsyncHTTPServer, None, None]:
+    """Fixture running the asyncio engine in the temp directory."""
+    original_cwd = os.getcwd()
+    os.chdir(temp_dir)
+    server = AsyncHTTPServer(("127.0.0.1", 0), RequestHandler, max_workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join(timeout=5)
+    server.server_close()
+    os.chdir(original_cwd)
+
+
+def url(server: AsyncHTTPServer, path: str) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_serves_file(async_server: AsyncHTTPServer) -> None:
+    """Integration test: the asyncio engine serves files via FileHandler."""
+    # When
+    with urllib.request.urlopen(url(async_server, "/file2.txt"), timeout=5) as r:
+        body = r.read()
+        ctype = r.headers["Content-type"]
+
+    # Then
+    assert body == b"Text file content"
+    assert ctype == "text/plain"
+
+
+def test_serves_directory_listing(async_server: AsyncHTTPServer) -> None:
+    """Integration test: the asyncio engine lists directories."""
+    # When
+    with urllib.request.urlopen(url(async_server, "/"), timeout=5) as r:
+        body = r.read()
+
+    # Then
+    assert b"file1.html" in body
+    assert b"subdir/" in body
+
+
+def test_not_found(async_server: AsyncHTTPServer) -> None:
+    """Integration test: missing resources produce a 404."""
+    # When
+    with pytest.raises(urllib.error.HTTPError) as exc_info:
+        urllib.request.urlopen(url(async_server, "/missing.txt"), timeout=5)
+
+    # Then
+    assert exc_info.value.code == 404
+
+
+def test_unsupported_method(async_server: AsyncHTTPServer) -> None:
+    """Integration test: methods without a do_ handler are rejected with 501."""
+    # Given
+    with socket.create_connection(("127.0.0.1", async_server.server_address[1])) as s:
+        # When
+        s.sendall(b"POST / HTTP/1.1\r\nContent-Length: 3\r\n\r\nabc")
+        response = s.recv(1024)
+
+    # Then
+    assert response.startswith(b"HTTP/1.1 501 ")
@@ -0,0 +1,70 @@
+import os
+
+from simple_web_server.benchmark import (
+    BenchmarkResult,
+    format_results,
+    load_results,
+    percentile,
+    run_benchmark,
+    save_results,
+)
+
+
+def test_percentile_uses_nearest_rank() -> None:
+    """Test percentile picks the nearest-rank value of sorted data."""
+    # Given
+    values = [float(value) for value in range(1, 101)]
+
+    # When-Then
+    assert percentile(values, 0.50) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([3.0], 0.99) == 3.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_results_round_trip_through_json(tmp_path: os.PathLike[str]) -> None:
+    """Test saved results can be loaded and compared against."""
+    # Given
+    result = BenchmarkResult(
+        mode="threaded",
+        scenario="small-file",
+        keep_alive=True,
+        requests=1000,
+        errors=0,
+        requests_per_second=500.0,
+        p50_ms=1.5,
+        p99_ms=4.0,
+        rss_kib=None,
+    )
+    path = os.path.join(tmp_path, "results.json")
+
+    # When
+    save_results(path, [result])
+    baseline = load_results(path)
+    faster = BenchmarkResult(**{**vars(result), "requests_per_second": 750.0})
+
+    # Then
+    assert baseline == {"threaded/small-file/keep-alive": result}
+    assert "+50.0%" in format_results([faster], baseline)
+
+
+def test_run_benchmark_measures_running_server() -> None:
+    """Test a short benchmark run against a real server in threaded mode."""
+    # When
+    results = run_benchmark(
+        ["threaded"],
+        ["small-file", "not-found"],
+        keep_alive_options=(True,),
+        duration=0.2,
+        concurrency=2,
+        threads=2,
+        large_file_size=1024,
+        listing_entries=1,
+    )
+
+    # Then
+    assert [result.scenario for result in results] == ["small-file", "not-found"]
+    for result in results:
+        assert result.requests > 0
+        assert result.errors == 0
+        assert result.p99_ms >= result.p50_ms > 0
@@ -0,0 +1,84 @@
+import gzip
+import os
+import time
+import zlib
+
+import pytest
+
+from simple_web_server.compression import (
+    compress_stream,
+    encoded_etag,
+    find_precompressed,
+    is_compressible,
+    negotiate_encoding,
+)
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, None),
+        ("", None),
+        ("gzip", "gzip"),
+        ("gzip, br", "br"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("*", "br"),
+        ("deflate", None),
+        ("gzip;q=bogus", None),
+    ],
+)
+def test_negotiate_encoding(header: str | None, expected: str | None) -> None:
+    """Test the best accepted coding is chosen, preferring earlier ones."""
+    assert negotiate_encoding(header, ["br", "gzip"]) == expected
+
+
+def test_is_compressible() -> None:
+    """Test text-like types are compressible and media types are not."""
+    assert is_compressible("text/html; charset=utf-8") is True
+    assert is_compressible("application/javascript") is True
+    assert is_compressible("image/svg+xml") is True
+    assert is_compressible("image/png") is False
+    assert is_compressible("application/octet-stream") is False
+
+
+def test_compress_stream_is_gzip_of_whole_body() -> None:
+    """Test the compressed pieces make up a gzip member of the whole body."""
+    # Given
+    pieces = [b"<html>", b"listing " * 1000, b"</html>"]
+
+    # When
+    compressed = list(compress_stream(pieces, "gzip"))
+
+    # Then
+    # The first piece is flushed on its own, so it can be decoded right away
+    assert zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(compressed[0]) == (
+        b"<html>"
+    )
+    assert gzip.decompress(b"".join(compressed)) == b"".join(pieces)
+    with pytest.raises(ValueError, match="Unsupported content coding"):
+        compress_stream(pieces, "br")
+
+
+def test_encoded_etag() -> None:
+    """Test coded representations get distinct ETags."""
+    assert encoded_etag('"abc"', "gzip") == '"abc-gzip"'
+    assert encoded_etag('W/"abc"', "gzip") == 'W/"abc-gzip"'
+
+
+def test_find_precompressed_ignores_stale_siblings(temp_dir: str) -> None:
+    """Test siblings older than the original file are not used."""
+    # Given
+    original = os.path.join(temp_dir, "file2.txt")
+    for suffix in (".gz", ".br"):
+        with open(original + suffix, "wb") as f:
+            f.write(b"compressed")
+    past = time.time() - 60
+    os.utime(original + ".br", (past, past))
+
+    # When
+    found = find_precompressed(original, os.stat(original))
+
+    # Then
+    assert list(found) == ["gzip"]
+    assert found["gzip"][0] == original + ".gz"
@@ -0,0 +1,79 @@
+import os
+
+from simple_web_server.content_cache import CachedContent, ContentCache
+
+
+def make_stat(mtime_ns: int, size: int) -> os.stat_result:
+    """Build a stat result with the given modification time and size."""
+    fields = (0o100644, 1, 1, 1, 0, 0, size, 0, 0, 0, 0.0, 0.0, 0.0, 0, mtime_ns, 0)
+    return os.stat_result(fields)
+
+
+def make_entry(body: bytes, mtime_ns: int = 1) -> CachedContent:
+    return CachedContent(mtime_ns, len(body), body, (("Content-Length", "1"),))
+
+
+class TestContentCache:
+    """Tests for the ContentCache."""
+
+    def test_hit_and_miss_counters(self) -> None:
+        """Test lookups are counted as hits or misses."""
+        # Given
+        cache = ContentCache(max_bytes=100)
+        cache.put("/a", make_entry(b"aaaa"))
+
+        # When
+        hit = cache.get("/a", make_stat(1, 4))
+        miss = cache.get("/b", make_stat(1, 4))
+
+        # Then
+        assert hit is not None and hit.body == b"aaaa"
+        assert miss is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_stale_entry_invalidated(self) -> None:
+        """Test entries are dropped when the file's mtime or size changes."""
+        # Given
+        cache = ContentCache(max_bytes=100)
+        cache.put("/a", make_entry(b"aaaa"))
+        cache.put("/b", make_entry(b"bbbb"))
+
+        # When
+        changed_mtime = cache.get("/a", make_stat(2, 4))
+        changed_size = cache.get("/b", make_stat(1, 5))
+
+        # Then
+        assert changed_mtime is None
+        assert changed_size is None
+        assert len(cache) == 0
+        assert cache.current_bytes == 0
+
+    def test_evicts_least_recently_used(self) -> None:
+        """Test the byte budget is kept by evicting the oldest entries."""
+        # Given
+        cache = ContentCache(max_bytes=10)
+        cache.put("/a", make_entry(b"aaaa"))
+        cache.put("/b", make_entry(b"bbbb"))
+        cache.get("/a", make_stat(1, 4))  # /b is now least recently used
+
+        # When
+        cache.put("/c", make_entry(b"cccc"))
+
+        # Then
+        assert cache.get("/b", make_stat(1, 4)) is None
+        assert cache.get("/a", make_stat(1, 4)) is not None
+        assert cache.get("/c", make_stat(1, 4)) is not None
+        assert cache.current_bytes == 8
+
+    def test_large_entries_not_cached(self) -> None:
+        """Test bodies above the per-entry limit are never stored."""
+        # Given
+        cache = ContentCache(max_bytes=100, max_entry_bytes=3)
+
+        # When
+        cache.put("/a", make_entry(b"aaaa"))
+
+        # Then
+        assert len(cache) == 0
+        assert cache.can_cache(3) is True
+        assert cache.can_cache(4) is False
@@ -0,0 +1,173 @@
+import http.client
+import os
+import socket
+import threading
+from collections.abc import Generator
+
+import pytest
+
+from simple_web_server.__main__ import RequestHandler
+from simple_web_server.servers import create_server
+
+
+class LimitedRequestHandler(RequestHandler):
+    """RequestHandler allowing three requests per connection."""
+
+    max_keep_alive_requests = 3
+
+
+@pytest.fixture(params=["threaded", "asyncio"])
+def server_port(
+    request: pytest.FixtureRequest, temp_dir: str
+) -> Generator[int, None, None]:
+    """Fixture serving the temp directory in each persistent-connection engine."""
+    original_cwd = os.getcwd()
+    os.chdir(temp_dir)
+    server = create_server(
+        request.param, ("127.0.0.1", 0), LimitedRequestHandler, threads=2
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    thread.join(timeout=5)
+    server.server_close()
+    os.chdir(original_cwd)
+
+
+def read_responses(sock: socket.socket, count: int) -> list[bytes]:
+    """Read count complete responses from a socket."""
+    sock_file = sock.makefile("rb")
+    bodies = []
+    for _ in range(count):
+        assert sock_file.readline().startswith(b"HTTP/1.1 200 ")
+        headers = http.client.parse_headers(sock_file)
+        bodies.append(sock_file.read(int(headers["Content-Length"])))
+    return bodies
+
+
+def test_connection_reused(server_port: int) -> None:
+    """Test consecutive requests share a single TCP connection."""
+    # Given
+    conn = http.client.HTTPConnection("127.0.0.1", server_port, timeout=5)
+
+    try:
+        # When
+        conn.request("GET", "/file2.txt")
+        first = conn.getresponse()
+        first_body = first.read()
+        sock = conn.sock
+        conn.request("GET", "/missing")
+        second = conn.getresponse()
+        second.read()
+
+        # Then
+        assert first_body == b"Text file content"
+        assert first.will_close is False
+        assert second.status == 404
+        assert second.will_close is False  # 404s don't force a reconnect
+        assert conn.sock is sock
+    finally:
+        conn.close()
+
+
+def test_connection_closed_after_max_requests(server_port: int) -> None:
+    """Test the server closes the connection after the request limit."""
+    # Given
+    conn = http.client.HTTPConnection("127.0.0.1", server_port, timeout=5)
+    responses = []
+
+    try:
+        # When
+        for _ in range(3):
+            conn.request("GET", "/file2.txt")
+            response = conn.getresponse()
+            response.read()
+            responses.append(response)
+
+        # Then
+        assert [r.will_close for r in responses] == [False, False, True]
+        assert responses[-1].getheader("Connection") == "close"
+    finally:
+        conn.close()
+
+
+def test_pipelined_requests(server_port: int) -> None:
+    """Test pipelined requests are answered in order on one connection."""
+    # Given
+    requests = (
+        b"GET /file2.txt HTTP/1.1\r\nHost: x\r\n\r\n"
+        b"GET /file1.html HTTP/1.1\r\nHost: x\r\nContent-Length: 4\r\n\r\nbody"
+        b"GET /file2.txt HTTP/1.1\r\nHost: x\r\n\r\n"
+    )
+
+    with socket.create_connection(("127.0.0.1", server_port), timeout=5) as sock:
+        # When
+        sock.sendall(requests)
+        bodies = read_responses(sock, 3)
+
+    # Then
+    assert bodies == [
+        b"Text file content",
+        b"<html><body>File 1</body></html>",
+        b"Text file content",
+    ]
+
+
+def test_http_10_keep_alive(server_port: int) -> None:
+    """Test HTTP/1.0 clients are told when their connection is kept open."""
+    # Given
+    request = b"GET /file2.txt HTTP/1.0\r\nConnection: keep-alive\r\n\r\n"
+
+    with socket.create_connection(("127.0.0.1", server_port), timeout=5) as sock:
+        # When
+        sock.sendall(request)
+        response = sock.recv(4096)
+
+    # Then
+    assert b"Connection: keep-alive\r\n" in response
+
+
+def test_head_keeps_connection_usable(server_port: int) -> None:
+    """Test a bodiless HEAD response leaves the connection in sync."""
+    # Given
+    conn = http.client.HTTPConnection("127.0.0.1", server_port, timeout=5)
+
+    try:
+        # When
+        conn.request("HEAD", "/file2.txt")
+        head = conn.getresponse()
+        head_body = head.read()
+        conn.request("GET", "/file2.txt")
+        get = conn.getresponse()
+
+        # Then
+        assert head.status == 200
+        assert head.getheader("Content-Length") == "17"
+        assert head_body == b""
+        assert get.read() == b"Text file content"
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("length", ["abc", "-1"])
+def test_bad_content_length_is_rejected(server_port: int, length: str) -> None:
+    """Test a request whose body can't be skipped gets a 400 and is closed."""
+    # Given
+    request = (
+        "POST /file2.txt HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Length: {length}\r\n\r\n"
+    )
+
+    with socket.create_connection(("127.0.0.1", server_port), timeout=5) as sock:
+        # When
+        sock.sendall(request.encode("ascii"))
+        sock_file = sock.makefile("rb")
+        status_line = sock_file.readline()
+        headers = http.client.parse_headers(sock_file)
+        sock_file.read(int(headers["Content-Length"]))
+
+        # Then
+        assert status_line.startswith(b"HTTP/1.1 400 ")
+        assert headers["Connection"] == "close"
+        assert sock_file.read() == b""
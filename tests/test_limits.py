@@ -0,0 +1,221 @@
+import http.server
+import io
+import os
+import socket
+import threading
+import time
+from collections.abc import Generator
+
+import pytest
+
+from simple_web_server.__main__ import RequestHandler
+from simple_web_server.async_server import AsyncHTTPServer
+from simple_web_server.limits import (
+    OVERLOADED_RESPONSE,
+    ConnectionLimiter,
+    DeadlineReader,
+)
+from simple_web_server.servers import create_server
+
+
+class StrictRequestHandler(RequestHandler):
+    """RequestHandler with short deadlines."""
+
+    keep_alive_timeout = 5.0
+    header_timeout = 0.3
+
+
+@pytest.fixture
+def socket_pair() -> Generator[tuple[socket.socket, socket.socket], None, None]:
+    """Fixture providing a connected server and client socket."""
+    server, client = socket.socketpair()
+    yield server, client
+    server.close()
+    client.close()
+
+
+def drip(sock: socket.socket, stop: threading.Event) -> None:
+    """Send a request one byte at a time, never finishing it."""
+    for byte in b"GET / HTTP/1.1\r\nHost: x\r\n" + b"X" * 1000:
+        if stop.wait(0.05):
+            return
+        try:
+            sock.send(bytes([byte]))
+        except OSError:
+            return
+
+
+class TestDeadlineReader:
+    """Tests for the DeadlineReader."""
+
+    def test_request_must_be_complete_within_header_timeout(
+        self, socket_pair: tuple[socket.socket, socket.socket]
+    ) -> None:
+        """Test a request trickling in byte by byte still times out."""
+        # Given
+        server, client = socket_pair
+        raw = DeadlineReader(server.makefile("rb", buffering=0), server)
+        reader = io.BufferedReader(raw)
+        stop = threading.Event()
+        dripper = threading.Thread(target=drip, args=(client, stop))
+        dripper.start()
+
+        try:
+            # When
+            raw.expect_request(idle_timeout=5.0, header_timeout=0.3)
+            start = time.monotonic()
+            with pytest.raises(TimeoutError):
+                while reader.readline():
+                    pass
+
+            # Then
+            assert time.monotonic() - start < 2.0
+        finally:
+            stop.set()
+            dripper.join()
+
+    def test_request_must_start_within_idle_timeout(
+        self, socket_pair: tuple[socket.socket, socket.socket]
+    ) -> None:
+        """Test a connection that sends nothing times out when idle."""
+        # Given
+        server, _ = socket_pair
+        raw = DeadlineReader(server.makefile("rb", buffering=0), server)
+        raw.expect_request(idle_timeout=0.1, header_timeout=5.0)
+
+        # When-Then
+        with pytest.raises(TimeoutError):
+            io.BufferedReader(raw).readline()
+
+    def test_reads_after_request_use_stall_timeout(
+        self, socket_pair: tuple[socket.socket, socket.socket]
+    ) -> None:
+        """Test the deadlines stop applying once the request has been read."""
+        # Given
+        server, client = socket_pair
+        raw = DeadlineReader(server.makefile("rb", buffering=0), server, 1.0)
+        raw.expect_request(idle_timeout=0.1, header_timeout=0.1)
+        client.sendall(b"GET / HTTP/1.1\r\n")
+        reader = io.BufferedReader(raw)
+        assert reader.readline() == b"GET / HTTP/1.1\r\n"
+        raw.end_request()
+
+        # When
+        time.sleep(0.2)
+        client.sendall(b"body")
+
+        # Then
+        assert reader.read(4) == b"body"
+        assert server.gettimeout() == 1.0
+
+
+class TestConnectionLimiter:
+    """Tests for the ConnectionLimiter."""
+
+    def test_refuses_connections_over_max_connections(self) -> None:
+        """Test only max_connections connections are open at once."""
+        # Given
+        limiter = ConnectionLimiter(max_connections=2)
+
+        # When
+        admitted = [limiter.admit() for _ in range(3)]
+        limiter.start()
+        limiter.release()
+
+        # Then
+        assert admitted == [True, True, False]
+        assert limiter.rejected == 1
+        assert limiter.admit() is True
+
+    def test_refuses_connections_over_max_queue(self) -> None:
+        """Test connections are refused while max_queue are waiting."""
+        # Given
+        limiter = ConnectionLimiter(max_queue=1)
+
+        # When
+        first = limiter.admit()
+        second = limiter.admit()
+        limiter.start()
+        third = limiter.admit()
+
+        # Then
+        assert (first, second, third) == (True, False, True)
+        assert limiter.open == 2
+        assert limiter.queued == 1
+
+
+@pytest.fixture(params=["threaded", "asyncio"])
+def server_mode(
+    request: pytest.FixtureRequest, temp_dir: str
+) -> Generator[str, None, None]:
+    """Fixture serving from the temp directory in each engine."""
+    original_cwd = os.getcwd()
+    os.chdir(temp_dir)
+    yield request.param
+    os.chdir(original_cwd)
+
+
+def start_server(
+    mode: str, **limits: int
+) -> tuple[http.server.HTTPServer | AsyncHTTPServer, threading.Thread, int]:
+    """Start a server on a free port with the given connection limits."""
+    server = create_server(
+        mode, ("127.0.0.1", 0), StrictRequestHandler, threads=1, **limits
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread, int(server.server_address[1])
+
+
+def test_slow_request_is_disconnected(server_mode: str) -> None:
+    """Test a client sending its request too slowly is disconnected."""
+    # Given
+    server, thread, port = start_server(server_mode)
+    stop = threading.Event()
+
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+            dripper = threading.Thread(target=drip, args=(sock, stop))
+            dripper.start()
+
+            # When
+            start = time.monotonic()
+            data = sock.recv(4096)
+
+            # Then
+            assert data == b""
+            assert time.monotonic() - start < 3.0
+            stop.set()
+            dripper.join()
+    finally:
+        stop.set()
+        server.shutdown()
+        thread.join(timeout=5)
+        server.server_close()
+
+
+def test_connections_over_limit_get_503(server_mode: str) -> None:
+    """Test a connection over the limit gets a 503 without waiting."""
+    # Given
+    limits = {"max_queue": 1} if server_mode == "threaded" else {"max_connections": 1}
+    server, thread, port = start_server(server_mode, **limits)
+    held = []
+
+    try:
+        # Occupy the worker thread, and in threaded mode the queue too
+        for _ in range(2 if server_mode == "threaded" else 1):
+            held.append(socket.create_connection(("127.0.0.1", port), timeout=5))
+            time.sleep(0.1)
+
+        # When
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+            response = sock.recv(4096)
+
+        # Then
+        assert response == OVERLOADED_RESPONSE
+    finally:
+        for sock in held:
+            sock.close()
+        server.shutdown()
+        thread.join(timeout=5)
+        server.server_close()
@@ -0,0 +1,156 @@
+import os
+from unittest.mock import patch
+
+from simple_web_server.listing_cache import (
+    DetailsCache,
+    DirectoryEntry,
+    EntryDetails,
+    ListingCache,
+    scan_directory,
+    scan_directory_details,
+)
+
+
+def test_scan_directory_lists_sorted_entries_with_types(temp_dir: str) -> None:
+    """Test scan_directory returns entries sorted by name with their types."""
+    # When
+    entries = scan_directory(temp_dir)
+
+    # Then
+    assert entries == [
+        DirectoryEntry("file1.html", False),
+        DirectoryEntry("file2.txt", False),
+        DirectoryEntry("subdir", True),
+    ]
+
+
+def test_scan_directory_details_stats_entries(temp_dir: str) -> None:
+    """Test scan_directory_details returns each entry's type, size and mtime."""
+    # When
+    entries = {entry.name: entry for entry in scan_directory_details(temp_dir)}
+
+    # Then
+    file2_stat = os.stat(os.path.join(temp_dir, "file2.txt"))
+    assert entries["file2.txt"] == EntryDetails(
+        "file2.txt", "file", file2_stat.st_size, file2_stat.st_mtime
+    )
+    assert entries["subdir"].type == "directory"
+    assert set(entries) == {"file1.html", "file2.txt", "subdir"}
+
+
+class TestListingCache:
+    """Tests for the ListingCache."""
+
+    def test_get_reuses_listing_while_mtime_unchanged(self, temp_dir: str) -> None:
+        """Test a directory is scanned once while its mtime stays the same."""
+        # Given
+        cache = ListingCache()
+        stat = os.stat(temp_dir)
+        first = cache.get(temp_dir, stat)
+
+        # When
+        with patch("os.scandir") as mock_scandir:
+            second = cache.get(temp_dir, stat)
+
+        # Then
+        mock_scandir.assert_not_called()
+        assert second is first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_get_rescans_changed_directory(self, temp_dir: str) -> None:
+        """Test a new mtime makes the directory be scanned again."""
+        # Given
+        cache = ListingCache()
+        cache.get(temp_dir, os.stat(temp_dir))
+        os.mkdir(os.path.join(temp_dir, "newdir"))
+        stat = os.stat(temp_dir)
+        os.utime(temp_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        # When
+        entries = cache.get(temp_dir, os.stat(temp_dir))
+
+        # Then
+        assert DirectoryEntry("newdir", True) in entries
+        assert cache.misses == 2
+
+    def test_evicts_least_recently_used_listing(self, temp_dir: str) -> None:
+        """Test listings are evicted to stay within max_entries."""
+        # Given
+        subdir = os.path.join(temp_dir, "subdir")
+        with open(os.path.join(subdir, "inner.txt"), "w") as f:
+            f.write("Inner file")
+        cache = ListingCache(max_entries=3)
+        cache.get(temp_dir, os.stat(temp_dir))
+
+        # When
+        cache.get(subdir, os.stat(subdir))
+
+        # Then
+        assert len(cache) == 1
+        assert cache.current_entries == 1
+
+    def test_invalidate_drops_listing(self, temp_dir: str) -> None:
+        """Test invalidate forgets a directory's listing."""
+        # Given
+        cache = ListingCache()
+        cache.get(temp_dir, os.stat(temp_dir))
+
+        # When
+        cache.invalidate(temp_dir)
+
+        # Then
+        assert len(cache) == 0
+        assert cache.current_entries == 0
+
+
+class TestDetailsCache:
+    """Tests for the DetailsCache."""
+
+    def test_get_reuses_sorted_entries_within_ttl(self, temp_dir: str) -> None:
+        """Test a directory is scanned once per order while it is fresh."""
+        # Given
+        cache = DetailsCache(ttl=60)
+        stat = os.stat(temp_dir)
+        first = cache.get(temp_dir, stat, "name", True)
+
+        # When
+        with patch("os.scandir") as mock_scandir:
+            second = cache.get(temp_dir, stat, "name", True)
+
+        # Then
+        mock_scandir.assert_not_called()
+        assert second is first
+        assert [entry.name for entry in first] == ["subdir", "file2.txt", "file1.html"]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_get_rescans_after_ttl(self, temp_dir: str) -> None:
+        """Test entries are scanned again once the ttl has passed."""
+        # Given
+        cache = DetailsCache(ttl=0)
+        stat = os.stat(temp_dir)
+        cache.get(temp_dir, stat, "size", False)
+        with open(os.path.join(temp_dir, "file2.txt"), "w") as f:
+            f.write("Longer text file content")
+
+        # When
+        entries = cache.get(temp_dir, stat, "size", False)
+
+        # Then
+        sizes = {entry.name: entry.size for entry in entries}
+        assert sizes["file2.txt"] == len("Longer text file content")
+        assert cache.misses == 2
+
+    def test_invalidate_child_drops_directory(self, temp_dir: str) -> None:
+        """Test a change to an entry drops its directory's listings."""
+        # Given
+        cache = DetailsCache(ttl=60)
+        stat = os.stat(temp_dir)
+        cache.get(temp_dir, stat, "name", False)
+        cache.get(temp_dir, stat, "mtime", False)
+
+        # When
+        cache.invalidate(os.path.join(temp_dir, "file2.txt"))
+
+        # Then
+        assert len(cache) == 0
+        assert cache.current_entries == 0
@@ -1,11 +1,22 @@
 import io
+import json
 import os
+import zipfile
+from pathlib import Path
 from typing import Any, BinaryIO
+from unittest.mock import patch
 
 import pytest
 
 # Only import main RequestHandler for integration tests
-from simple_web_server.__main__ import RequestHandler
+from simple_web_server.__main__ import RequestHandler, configure_handler, parse_args
+from simple_web_server.access_log import AccessLogger
+from simple_web_server.archive import Archive
+from simple_web_server.metrics import MetricsRegistry
+from simple_web_server.path_resolver import PathResolver
+from simple_web_server.resource_handlers.archive_handler import ArchiveHandler
+from simple_web_server.snapshot import StaticSnapshot
+from simple_web_server.stat_cache import StatCache
 
 
 class MockSocket:
@@ -17,6 +28,12 @@ class MockSocket:
     def sendall(self, data: bytes) -> None:
         self.buffer.write(data)
 
+    def settimeout(self, timeout: float | None) -> None:
+        """Mock settimeout; the buffers never block."""
+
+    def setsockopt(self, level: int, option: int, value: int) -> None:
+        """Mock setsockopt; socket options have no effect on the buffers."""
+
     def makefile(
         self, mode: str = "rb", buffering: int = -1, **kwargs: Any
     ) -> BinaryIO:
@@ -70,7 +87,7 @@ def test_do_get_integration_file_exists(
 
         # Then
         sent_data = mock_socket.buffer.getvalue()
-        assert b"HTTP/1.0 200 OK" in sent_data
+        assert b"HTTP/1.1 200 OK" in sent_data
         assert b"Content-type: text/html" in sent_data
         assert b"Content-Length: 38" in sent_data
         assert b"<html><body>Test content</body></html>" in sent_data
@@ -95,7 +112,7 @@ def test_do_get_integration_directory(
 
         # Then
         sent_data = mock_socket.buffer.getvalue()
-        assert b"HTTP/1.0 200 OK" in sent_data
+        assert b"HTTP/1.1 200 OK" in sent_data
         assert b"Content-type: text/html; charset=utf-8" in sent_data
         assert f"Directory listing for /{dir_name}/".encode() in sent_data
         assert b"file1.html" in sent_data
@@ -119,8 +136,8 @@ def test_do_get_integration_not_found(
     # Then
     sent_data = mock_socket.buffer.getvalue()
     assert sent_data.startswith(
-        b"HTTP/1.0 404 "
-    ), f"Expected status line starting with 'HTTP/1.0 404 ', got: {sent_data[:50]}..."
+        b"HTTP/1.1 404 "
+    ), f"Expected status line starting with 'HTTP/1.1 404 ', got: {sent_data[:50]}..."
     expected_header = b"Content-Type: text/html"
     assert expected_header in sent_data, (
         f"Expected '{expected_header.decode()}' header, "
@@ -129,6 +146,360 @@ def test_do_get_integration_not_found(
     assert b"File/Directory not found: /nonexistent/thing.no" in sent_data
 
 
+def test_do_get_rejects_path_outside_root(
+    request_handler_instance: RequestHandler, mock_socket: MockSocket
+) -> None:
+    """Integration test: a path climbing out of the root gets a 400."""
+    # Given
+    request_handler_instance.path = "/../../etc/passwd"
+    mock_socket.buffer = io.BytesIO()
+
+    # When
+    request_handler_instance.do_GET()
+
+    # Then
+    assert mock_socket.buffer.getvalue().startswith(b"HTTP/1.1 400 ")
+
+
+def test_do_get_decodes_path_and_requires_directory_for_slash(
+    request_handler_instance: RequestHandler, mock_socket: MockSocket, temp_dir: str
+) -> None:
+    """Integration test: escapes are decoded; a file URL can't end in a slash."""
+    # Given
+    with open(os.path.join(temp_dir, "with space.txt"), "w") as f:
+        f.write("Spaced")
+    request_handler_instance.path_resolver = PathResolver(temp_dir)
+    request_handler_instance.path = "/with%20space.txt"
+    mock_socket.buffer = io.BytesIO()
+
+    # When
+    request_handler_instance.do_GET()
+    found = mock_socket.buffer.getvalue()
+    mock_socket.buffer = io.BytesIO()
+    request_handler_instance.path = "/with%20space.txt/"
+    request_handler_instance.do_GET()
+
+    # Then
+    assert found.startswith(b"HTTP/1.1 200 OK") and found.endswith(b"Spaced")
+    assert mock_socket.buffer.getvalue().startswith(b"HTTP/1.1 404 ")
+
+
+def test_do_get_stats_path_once_and_caches_result(
+    request_handler_instance: RequestHandler, mock_socket: MockSocket, temp_file: str
+) -> None:
+    """Integration test: a repeated request is dispatched without any stat()."""
+    # Given
+    request_handler_instance.stat_cache = StatCache(ttl=60)
+    file_name = os.path.basename(temp_file)
+    request_handler_instance.path = f"/{file_name}"
+    original_cwd = os.getcwd()
+    os.chdir(os.path.dirname(temp_file))
+
+    try:
+        # When
+        with patch("os.stat", wraps=os.stat) as mock_stat:
+            request_handler_instance.do_GET()
+            first_stats = [call.args[0] for call in mock_stat.call_args_list]
+            mock_stat.reset_mock()
+            mock_socket.buffer = io.BytesIO()
+            request_handler_instance.do_GET()
+
+        # Then
+        assert first_stats.count(temp_file) == 1
+        mock_stat.assert_not_called()
+        assert b"HTTP/1.1 200 OK" in mock_socket.buffer.getvalue()
+    finally:
+        os.chdir(original_cwd)
+
+
+def test_do_head_sends_file_headers_without_body(
+    request_handler_instance: RequestHandler, mock_socket: MockSocket, temp_file: str
+) -> None:
+    """Integration test: do_HEAD answers like do_GET, minus the body."""
+    # Given
+    request_handler_instance.command = "HEAD"
+    request_handler_instance.path = f"/{os.path.basename(temp_file)}"
+    original_cwd = os.getcwd()
+    os.chdir(os.path.dirname(temp_file))
+    mock_socket.buffer = io.BytesIO()
+
+    try:
+        # When
+        request_handler_instance.do_HEAD()
+
+        # Then
+        sent_data = mock_socket.buffer.getvalue()
+        assert sent_data.startswith(b"HTTP/1.1 200 OK")
+        assert b"Content-Length: 38" in sent_data
+        assert sent_data.endswith(b"\r\n\r\n")
+    finally:
+        os.chdir(original_cwd)
+
+
+def test_do_head_not_found_sends_no_body(
+    request_handler_instance: RequestHandler, mock_socket: MockSocket
+) -> None:
+    """Integration test: a HEAD for a missing path gets a bodiless 404."""
+    # Given
+    request_handler_instance.command = "HEAD"
+    request_handler_instance.path = "/nonexistent/thing.no"
+    mock_socket.buffer = io.BytesIO()
+
+    # When
+    request_handler_instance.do_HEAD()
+
+    # Then
+    sent_data = mock_socket.buffer.getvalue()
+    assert sent_data.startswith(b"HTTP/1.1 404 ")
+    assert sent_data.endswith(b"\r\n\r\n")
+
+
+def test_do_get_serves_metrics_when_enabled(
+    request_handler_instance: RequestHandler, mock_socket: MockSocket, temp_file: str
+) -> None:
+    """Integration test: timings of served requests appear on /__metrics."""
+    # Given
+    request_handler_instance.metrics = MetricsRegistry()
+    request_handler_instance.path = f"/{os.path.basename(temp_file)}"
+    original_cwd = os.getcwd()
+    os.chdir(os.path.dirname(temp_file))
+
+    try:
+        request_handler_instance.do_GET()
+        mock_socket.buffer = io.BytesIO()
+        request_handler_instance.path = "/__metrics"
+
+        # When
+        request_handler_instance.do_GET()
+
+        # Then
+        sent_data = mock_socket.buffer.getvalue()
+        assert b"HTTP/1.1 200 OK" in sent_data
+        assert b"Content-type: text/plain; version=0.0.4" in sent_data
+        assert b"simple_web_server_request_duration_seconds_count 1" in sent_data
+        assert (
+            b'simple_web_server_handler_duration_seconds_count{handler="file"} 1'
+            in sent_data
+        )
+        assert b"simple_web_server_socket_write_duration_seconds_count" in sent_data
+    finally:
+        os.chdir(original_cwd)
+
+
+def test_do_get_metrics_path_is_not_special_when_disabled(
+    request_handler_instance: RequestHandler, mock_socket: MockSocket
+) -> None:
+    """Integration test: /__metrics is an ordinary path without metrics."""
+    # Given
+    request_handler_instance.path = "/__metrics"
+    mock_socket.buffer = io.BytesIO()
+
+    # When
+    request_handler_instance.do_GET()
+
+    # Then
+    assert mock_socket.buffer.getvalue().startswith(b"HTTP/1.1 404 ")
+
+
+def test_access_logger_records_served_request(
+    mock_socket: MockSocket, temp_dir: str
+) -> None:
+    """Integration test: a served request is written to the access log."""
+    # Given
+    log_path = os.path.join(temp_dir, "access.log")
+    handler_class = type(
+        "LoggingRequestHandler",
+        (RequestHandler,),
+        {"access_logger": AccessLogger(log_path, log_format="json")},
+    )
+
+    # When
+    handler_class(mock_socket, ("127.0.0.1", 12345), MockServer())
+    handler_class.access_logger.close()
+
+    # Then
+    with open(log_path) as file:
+        record = json.loads(file.read())
+    assert record["request"] == "GET / HTTP/1.0"
+    assert record["status"] == 200
+    assert record["length"] > 0
+    assert record["host"] == "127.0.0.1"
+
+
+def test_access_logger_writes_errors_in_background(
+    mock_socket: MockSocket, temp_dir: str
+) -> None:
+    """Integration test: error messages are queued, not written inline."""
+    # Given
+    logger = AccessLogger(os.path.join(temp_dir, "access.log"))
+    handler_class = type(
+        "LoggingRequestHandler", (RequestHandler,), {"access_logger": logger}
+    )
+    handler = handler_class(mock_socket, ("127.0.0.1", 12345), MockServer())
+    handler.path = "/nonexistent"
+
+    # When
+    with patch.object(logger, "log") as mock_log, patch("sys.stderr") as stderr:
+        handler.do_GET()
+
+    # Then
+    stderr.write.assert_not_called()
+    (record,) = [call.args[0] for call in mock_log.call_args_list]
+    assert record.host == "127.0.0.1"
+    assert record.message.startswith("code 404, message File/Directory not found")
+    logger.close()
+
+
+def test_access_log_off_logs_errors_only(
+    mock_socket: MockSocket, temp_dir: str
+) -> None:
+    """Integration test: with --access-log off only error messages are logged."""
+    # Given
+    handler_class = configure_handler(parse_args(["--access-log", "off"]), temp_dir)
+
+    # When
+    with patch("sys.stderr") as stderr:
+        handler = handler_class(mock_socket, ("127.0.0.1", 12345), MockServer())
+        served = stderr.write.call_count
+        handler.path = "/nonexistent"
+        handler.do_GET()
+
+    # Then
+    assert handler_class.access_logger is None
+    assert served == 0
+    (message,) = [call.args[0] for call in stderr.write.call_args_list]
+    assert "code 404, message File/Directory not found" in message
+
+
+def test_do_get_serves_file_from_snapshot(
+    request_handler_instance: RequestHandler, mock_socket: MockSocket, temp_dir: str
+) -> None:
+    """Integration test: a file in the snapshot skips the resource handlers."""
+    # Given
+    snapshot = StaticSnapshot(temp_dir)
+    snapshot.build()
+    request_handler_instance.snapshot = snapshot
+    request_handler_instance.path = "/file2.txt"
+    mock_socket.buffer = io.BytesIO()
+
+    # When
+    with patch.object(RequestHandler, "dispatch") as mock_dispatch:
+        request_handler_instance.do_GET()
+
+    # Then
+    mock_dispatch.assert_not_called()
+    sent_data = mock_socket.buffer.getvalue()
+    assert sent_data.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert b"Content-Length: 17\r\n" in sent_data
+    assert sent_data.endswith(b"\r\n\r\nText file content")
+
+
+def test_do_get_serves_archive_members_before_files_on_disk(
+    request_handler_instance: RequestHandler, mock_socket: MockSocket, temp_dir: str
+) -> None:
+    """Integration test: archive members shadow files, which are still served."""
+    # Given
+    archive_path = os.path.join(temp_dir, "site.zip")
+    with zipfile.ZipFile(archive_path, "w") as bundle:
+        bundle.writestr("file2.txt", b"From the archive")
+    archive = Archive(archive_path)
+    archive_handler = type(
+        "TestArchiveHandler", (ArchiveHandler,), {"archive": archive, "root": temp_dir}
+    )
+    request_handler_instance.resource_handlers = [
+        archive_handler(),
+        *RequestHandler.resource_handlers,
+    ]
+    request_handler_instance.path_resolver = PathResolver(temp_dir)
+    responses = []
+
+    # When
+    for path in ("/file2.txt", "/file1.html"):
+        request_handler_instance.path = path
+        mock_socket.buffer = io.BytesIO()
+        request_handler_instance.do_GET()
+        responses.append(mock_socket.buffer.getvalue())
+    archive.close()
+
+    # Then
+    assert responses[0].endswith(b"\r\n\r\nFrom the archive")
+    assert responses[1].endswith(b"\r\n\r\n<html><body>File 1</body></html>")
+
+
+def test_do_get_serves_archive_members_without_stat(
+    request_handler_instance: RequestHandler, mock_socket: MockSocket, temp_dir: str
+) -> None:
+    """Integration test: a path served from the archive is never stat()ed."""
+    # Given
+    archive_path = os.path.join(temp_dir, "site.zip")
+    with zipfile.ZipFile(archive_path, "w") as bundle:
+        bundle.writestr("docs/guide.txt", b"From the archive")
+    archive = Archive(archive_path)
+    archive_handler = type(
+        "TestArchiveHandler", (ArchiveHandler,), {"archive": archive, "root": temp_dir}
+    )
+    request_handler_instance.resource_handlers = [
+        archive_handler(),
+        *RequestHandler.resource_handlers,
+    ]
+    request_handler_instance.path_resolver = PathResolver(temp_dir)
+    request_handler_instance.path = "/docs/guide.txt"
+    mock_socket.buffer = io.BytesIO()
+
+    # When
+    with patch("os.stat", side_effect=AssertionError("stat() called")) as mock_stat:
+        request_handler_instance.do_GET()
+    archive.close()
+
+    # Then
+    mock_stat.assert_not_called()
+    assert mock_socket.buffer.getvalue().endswith(b"\r\n\r\nFrom the archive")
+
+
+def test_do_get_routes_request_to_mount(
+    request_handler_instance: RequestHandler,
+    mock_socket: MockSocket,
+    temp_dir: str,
+    tmp_path: Path,
+) -> None:
+    """Integration test: requests are served from the root mounted at their path."""
+    # Given
+    (tmp_path / "downloads").mkdir()
+    (tmp_path / "downloads" / "app.txt").write_bytes(b"Download")
+    routes = tmp_path / "routes.json"
+    routes.write_text(
+        json.dumps(
+            {
+                "mounts": [
+                    {"prefix": "/", "root": temp_dir},
+                    {"prefix": "/downloads", "root": "downloads"},
+                    {"prefix": "/", "host": "other.example", "root": "downloads"},
+                ]
+            }
+        )
+    )
+    args = parse_args(["--routes", str(routes), "--access-log", "off"])
+    request_handler_instance.router = configure_handler(args, temp_dir).router
+    responses = []
+
+    # When
+    for host, path in [
+        ("dummy", "/downloads/app.txt"),
+        ("dummy", "/file2.txt"),
+        ("other.example", "/app.txt"),
+    ]:
+        request_handler_instance.headers.replace_header("Host", host)
+        request_handler_instance.path = path
+        mock_socket.buffer = io.BytesIO()
+        request_handler_instance.do_GET()
+        responses.append(mock_socket.buffer.getvalue())
+
+    # Then
+    assert responses[0].endswith(b"\r\n\r\nDownload")
+    assert responses[1].endswith(b"\r\n\r\nText file content")
+    assert responses[2].endswith(b"\r\n\r\nDownload")
+
+
 # --- Unit tests for handlers are now in tests/resource_handlers/ ---
 
 
@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+from simple_web_server.metrics import (
+    HANDLER_DURATION,
+    Histogram,
+    MetricsRegistry,
+)
+
+
+class TestHistogram:
+    """Tests for the Histogram."""
+
+    def test_observe_counts_value_in_first_fitting_bucket(self) -> None:
+        """Test observations land in the smallest bucket that holds them."""
+        # Given
+        histogram = Histogram(buckets=(0.1, 1.0))
+
+        # When
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(7.0)
+
+        # Then
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.count == 4
+        assert histogram.snapshot() == ([2, 3, 4], 7.65)
+
+
+class TestMetricsRegistry:
+    """Tests for the MetricsRegistry."""
+
+    def test_time_observes_block_duration(self) -> None:
+        """Test a timed block is observed into its labelled histogram."""
+        # Given
+        registry = MetricsRegistry(buckets=(1.0,))
+
+        # When
+        with patch("time.perf_counter", side_effect=[10.0, 10.25]):
+            with registry.time(HANDLER_DURATION, handler="file"):
+                pass
+
+        # Then
+        histogram = registry.histogram(HANDLER_DURATION, handler="file")
+        assert histogram.counts == [1, 0]
+        assert histogram.total == 0.25
+
+    def test_render_uses_text_exposition_format(self) -> None:
+        """Test histograms are rendered as Prometheus text."""
+        # Given
+        registry = MetricsRegistry(buckets=(0.5, 1.0))
+        registry.histogram(HANDLER_DURATION, handler="file").observe(0.75)
+
+        # When
+        text = registry.render()
+
+        # Then
+        name = HANDLER_DURATION
+        assert text == (
+            f"# HELP {name} Time spent in a resource handler.\n"
+            f"# TYPE {name} histogram\n"
+            f'{name}_bucket{{handler="file",le="0.5"}} 0\n'
+            f'{name}_bucket{{handler="file",le="1.0"}} 1\n'
+            f'{name}_bucket{{handler="file",le="+Inf"}} 1\n'
+            f'{name}_sum{{handler="file"}} 0.75\n'
+            f'{name}_count{{handler="file"}} 1\n'
+        )
+
+    def test_render_escapes_label_values(self) -> None:
+        """Test quotes and backslashes in label values are escaped."""
+        # Given
+        registry = MetricsRegistry(buckets=())
+        registry.histogram(HANDLER_DURATION, handler='a"b\\c').observe(1.0)
+
+        # When
+        text = registry.render()
+
+        # Then
+        assert 'handler="a\\"b\\\\c"' in text
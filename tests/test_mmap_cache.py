@@ -0,0 +1,130 @@
+import mmap
+import os
+import threading
+import time
+from unittest.mock import patch
+
+from simple_web_server.mmap_cache import MmapCache
+
+
+class TestMmapCache:
+    """Tests for the MmapCache."""
+
+    def test_can_map_only_large_files(self) -> None:
+        """Test only files of at least min_size are mapped."""
+        # Given
+        cache = MmapCache(min_size=100)
+
+        # When-Then
+        assert cache.can_map(100) is True
+        assert cache.can_map(99) is False
+        assert MmapCache(min_size=0).can_map(0) is False
+
+    def test_acquire_shares_mapping(self, temp_file: str) -> None:
+        """Test concurrent requests for a file share a single mapping."""
+        # Given
+        cache = MmapCache(min_size=1)
+        stat = os.stat(temp_file)
+
+        # When
+        first = cache.acquire(temp_file, stat)
+        with patch("mmap.mmap") as mock_mmap:
+            second = cache.acquire(temp_file, stat)
+
+        # Then
+        mock_mmap.assert_not_called()
+        assert first is not None and second is first
+        assert first.refs == 2
+        assert first.mapping[:] == b"<html><body>Test content</body></html>"
+        cache.release(first)
+        cache.release(second)
+        assert not first.mapping.closed  # Kept for the next request
+
+    def test_concurrent_misses_share_one_mapping(self, temp_file: str) -> None:
+        """Test requests arriving while a file is mapped wait for that map."""
+        # Given
+        cache = MmapCache(min_size=1)
+        stat = os.stat(temp_file)
+        release = threading.Event()
+        real_mmap = mmap.mmap
+        calls = []
+        results = []
+
+        def slow_mmap(fileno: int, length: int, **kwargs: int) -> mmap.mmap:
+            calls.append(1)
+            release.wait(5)
+            return real_mmap(fileno, length, **kwargs)
+
+        def request() -> None:
+            results.append(cache.acquire(temp_file, stat))
+
+        # When
+        with patch("mmap.mmap", side_effect=slow_mmap):
+            threads = [threading.Thread(target=request) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            while cache.single_flight.followers < 3:
+                time.sleep(0.01)
+            release.set()
+            for thread in threads:
+                thread.join(timeout=5)
+
+        # Then
+        assert calls == [1]
+        assert len(results) == 4
+        mapped = results[0]
+        assert mapped is not None and all(result is mapped for result in results)
+        assert mapped.refs == 4
+        assert (cache.misses, cache.hits) == (1, 3)
+
+    def test_acquire_returns_none_for_changed_file(self, temp_file: str) -> None:
+        """Test a stat result that no longer matches the file isn't mapped."""
+        # Given
+        cache = MmapCache(min_size=1)
+        stat = os.stat(temp_file)
+        os.utime(temp_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        # When-Then
+        assert cache.acquire(temp_file, stat) is None
+        assert len(cache) == 0
+
+    def test_evicted_mapping_is_closed_after_release(self, temp_dir: str) -> None:
+        """Test an evicted mapping stays usable until its last release."""
+        # Given
+        cache = MmapCache(min_size=1, max_maps=1)
+        first_path = os.path.join(temp_dir, "file1.html")
+        second_path = os.path.join(temp_dir, "file2.txt")
+        first = cache.acquire(first_path, os.stat(first_path))
+        assert first is not None
+
+        # When
+        second = cache.acquire(second_path, os.stat(second_path))
+
+        # Then
+        assert len(cache) == 1
+        assert first.retired and not first.mapping.closed
+        cache.release(first)
+        assert first.mapping.closed
+        assert second is not None
+        cache.release(second)
+        assert not second.mapping.closed
+
+    def test_changed_file_gets_new_mapping(self, temp_file: str) -> None:
+        """Test a replaced file is mapped again and the old map retired."""
+        # Given
+        cache = MmapCache(min_size=1)
+        old = cache.acquire(temp_file, os.stat(temp_file))
+        assert old is not None
+        cache.release(old)
+        with open(temp_file, "wb") as f:
+            f.write(b"Replaced content")
+        stat = os.stat(temp_file)
+        os.utime(temp_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        # When
+        new = cache.acquire(temp_file, os.stat(temp_file))
+
+        # Then
+        assert new is not None and new is not old
+        assert new.mapping[:] == b"Replaced content"
+        assert old.mapping.closed
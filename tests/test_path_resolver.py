@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+from simple_web_server.path_resolver import PathResolver, normalize_url_path
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        ("/", "/"),
+        ("", "/"),
+        ("/a/b.txt", "/a/b.txt"),
+        ("/a//./b/", "/a/b/"),
+        ("/a/../b.txt", "/b.txt"),
+        ("/a/b/..", "/a/"),
+        ("/with%20space.txt", "/with space.txt"),
+        ("/caf%C3%A9", "/café"),
+        ("/latin%E9", "/latin" + os.fsdecode(b"\xe9")),
+    ],
+)
+def test_normalize_url_path(path: str, expected: str) -> None:
+    """Test paths are decoded and their dot segments resolved."""
+    # When-Then
+    assert normalize_url_path(path) == expected
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/..", "/../etc/passwd", "/a/../../b", "/%2e%2e/x", "/a%00.txt", "/a%2Fb"],
+)
+def test_normalize_url_path_rejects_unsafe_paths(path: str) -> None:
+    """Test escapes from the root and NUL bytes are rejected."""
+    # When-Then
+    assert normalize_url_path(path) is None
+
+
+class TestPathResolver:
+    """Tests for the PathResolver."""
+
+    def test_resolve_maps_target_under_root(self, temp_dir: str) -> None:
+        """Test a target is resolved without its query or trailing slash."""
+        # Given
+        resolver = PathResolver(temp_dir)
+
+        # When
+        resolved = resolver.resolve("/subdir/?page=2")
+
+        # Then
+        assert resolved is not None
+        assert resolved.url_path == "/subdir/"
+        assert resolved.full_path == os.path.join(temp_dir, "subdir")
+        assert resolved.is_directory_path is True
+        root = resolver.resolve("/")
+        assert root is not None and root.full_path == temp_dir
+
+    def test_resolve_rejects_escape(self, temp_dir: str) -> None:
+        """Test a target climbing above the root is rejected."""
+        # When-Then
+        assert PathResolver(temp_dir).resolve("/subdir/../../secret") is None
+
+    def test_resolve_memoises_results(self, temp_dir: str) -> None:
+        """Test a target is only resolved once, whatever its query."""
+        # Given
+        resolver = PathResolver(temp_dir)
+        first = resolver.resolve("/file1.html?a=1")
+
+        # When
+        second = resolver.resolve("/file1.html?b=2")
+
+        # Then
+        assert second is first
+        assert (resolver.hits, resolver.misses) == (1, 1)
+
+    def test_resolve_evicts_oldest_target(self, temp_dir: str) -> None:
+        """Test the resolver keeps at most max_entries targets."""
+        # Given
+        resolver = PathResolver(temp_dir, max_entries=2)
+
+        # When
+        for path in ("/a", "/b", "/c"):
+            resolver.resolve(path)
+        resolver.resolve("/a")
+
+        # Then
+        assert len(resolver) == 2
+        assert resolver.misses == 4
+
+    def test_resolve_without_root_uses_working_directory(self, temp_dir: str) -> None:
+        """Test a resolver without a root follows the working directory."""
+        # Given
+        resolver = PathResolver()
+        original_cwd = os.getcwd()
+        os.chdir(temp_dir)
+
+        try:
+            # When
+            resolved = resolver.resolve("/file2.txt")
+        finally:
+            os.chdir(original_cwd)
+
+        # Then
+        assert resolved is not None
+        expected = os.path.join(os.path.realpath(temp_dir), "file2.txt")
+        assert resolved.full_path == expected
@@ -0,0 +1,56 @@
+import gzip
+import os
+
+import pytest
+
+from simple_web_server.precompress import main, precompress_tree
+
+
+def write(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_precompress_tree(temp_dir: str) -> None:
+    """Test compressible files above the minimum size get .gz siblings."""
+    # Given
+    big_text = os.path.join(temp_dir, "subdir", "big.txt")
+    write(big_text, b"hello world " * 100)
+    write(os.path.join(temp_dir, "image.png"), b"\x89PNG" * 100)
+
+    # When
+    compressed = precompress_tree(temp_dir, min_size=100)
+
+    # Then
+    assert compressed == [big_text]
+    with gzip.open(big_text + ".gz") as f:
+        assert f.read() == b"hello world " * 100
+    assert not os.path.exists(os.path.join(temp_dir, "image.png.gz"))
+    assert not os.path.exists(os.path.join(temp_dir, "file2.txt.gz"))  # Too small
+
+
+def test_precompress_skips_up_to_date(temp_dir: str) -> None:
+    """Test a second run only recompresses when forced."""
+    # Given
+    write(os.path.join(temp_dir, "big.css"), b"body {} " * 100)
+    precompress_tree(temp_dir, min_size=100)
+
+    # When-Then
+    assert precompress_tree(temp_dir, min_size=100) == []
+    assert len(precompress_tree(temp_dir, min_size=100, force=True)) == 1
+
+
+def test_main_prints_compressed_paths(
+    temp_dir: str, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test the command line tool lists the files it compressed."""
+    # Given
+    big_js = os.path.join(temp_dir, "app.js")
+    write(big_js, b"let x = 1;\n" * 100)
+
+    # When
+    main([temp_dir, "--min-size", "10"])
+
+    # Then
+    output = capsys.readouterr().out.split()
+    assert big_js in output
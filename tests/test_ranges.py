@@ -0,0 +1,105 @@
+import email.parser
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from simple_web_server.ranges import (
+    MAX_RANGES,
+    RangeNotSatisfiableError,
+    if_range_matches,
+    parse_range,
+    send_ranges,
+)
+
+
+class TestParseRange:
+    """Tests for parse_range."""
+
+    @pytest.mark.parametrize(
+        ("header", "expected"),
+        [
+            ("bytes=0-9", [(0, 9)]),
+            ("bytes=90-", [(90, 99)]),
+            ("bytes=-10", [(90, 99)]),
+            ("bytes=-500", [(0, 99)]),
+            ("bytes=95-200", [(95, 99)]),
+            ("bytes=0-0, 10-19", [(0, 0), (10, 19)]),
+            ("bytes=0-9, 500-600", [(0, 9)]),
+            ("bytes=0-9, 500-", [(0, 9)]),
+        ],
+    )
+    def test_valid_ranges(self, header: str, expected: list[tuple[int, int]]) -> None:
+        """Test satisfiable ranges are clipped to the file size."""
+        assert parse_range(header, 100) == expected
+
+    @pytest.mark.parametrize(
+        "header",
+        [
+            "items=0-9",
+            "bytes=",
+            "bytes=9-0",
+            "bytes=a-b",
+            "bytes=5",
+            "bytes=\xb2-",
+            "bytes=-\xb2",
+            "bytes=0-\xb2",
+        ],
+    )
+    def test_invalid_ranges_ignored(self, header: str) -> None:
+        """Test malformed headers are ignored rather than rejected."""
+        assert parse_range(header, 100) is None
+
+    def test_too_many_ranges_ignored(self) -> None:
+        """Test requests for excessive numbers of ranges are ignored."""
+        header = "bytes=" + ",".join(["0-0"] * (MAX_RANGES + 1))
+        assert parse_range(header, 100) is None
+
+    def test_unsatisfiable(self) -> None:
+        """Test ranges entirely past the end raise RangeNotSatisfiableError."""
+        with pytest.raises(RangeNotSatisfiableError):
+            parse_range("bytes=100-200", 100)
+        with pytest.raises(RangeNotSatisfiableError):
+            parse_range("bytes=100-", 100)
+        with pytest.raises(RangeNotSatisfiableError):
+            parse_range("bytes=-5", 0)
+
+
+def test_if_range_matches() -> None:
+    """Test If-Range accepts only the strong ETag or the exact date."""
+    # Given
+    stat = os.stat_result((0, 0, 0, 0, 0, 0, 0, 0, 784111777, 0))
+
+    # When-Then
+    assert if_range_matches('"abc"', '"abc"', stat) is True
+    assert if_range_matches('W/"abc"', '"abc"', stat) is False
+    assert if_range_matches('"old"', '"abc"', stat) is False
+    assert if_range_matches("Sun, 06 Nov 1994 08:49:37 GMT", '"abc"', stat) is True
+    assert if_range_matches("Sun, 06 Nov 1994 08:49:36 GMT", '"abc"', stat) is False
+
+
+def test_send_ranges_multipart(mock_request_handler: MagicMock) -> None:
+    """Test multiple ranges are sent as a correctly framed multipart body."""
+    # Given
+    data = b"0123456789abcdefghij"
+
+    def send_slice(offset: int, count: int) -> int:
+        return mock_request_handler.wfile.write(data[offset : offset + count])
+
+    headers = (("Content-type", "text/plain"), ("Content-Length", "20"))
+
+    # When
+    send_ranges(mock_request_handler, [(0, 3), (10, 12)], 20, headers, send_slice)
+
+    # Then
+    mock_request_handler.send_response.assert_called_once_with(206)
+    sent = {c.args[0]: c.args[1] for c in mock_request_handler.send_header.mock_calls}
+    body = mock_request_handler.wfile.getvalue()
+    assert sent["Content-Length"] == str(len(body))
+    assert sent["Content-type"].startswith("multipart/byteranges; boundary=")
+    message = email.parser.BytesParser().parsebytes(
+        b"Content-type: " + sent["Content-type"].encode() + b"\r\n\r\n" + body
+    )
+    parts = message.get_payload()
+    assert [p["Content-Range"] for p in parts] == ["bytes 0-3/20", "bytes 10-12/20"]
+    assert [p.get_payload() for p in parts] == ["0123", "abc"]
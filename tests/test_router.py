@@ -0,0 +1,165 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from simple_web_server.resource_handlers.file_handler import FileHandler
+from simple_web_server.router import (
+    Mount,
+    Router,
+    load_handler_class,
+    normalize_host,
+    read_routes,
+)
+
+SITE = os.path.abspath("/srv/site")
+STATIC = os.path.abspath("/srv/static")
+DOCS = os.path.abspath("/srv/docs")
+
+
+@pytest.fixture
+def router() -> Router:
+    """Fixture providing a router with nested prefixes and a virtual host."""
+    return Router(
+        [
+            Mount("/", SITE, []),
+            Mount("/static", STATIC, []),
+            Mount("/static/docs/", DOCS, []),
+            Mount("/", DOCS, [], host="docs.example.com"),
+        ]
+    )
+
+
+class TestRouter:
+    """Tests for the Router."""
+
+    @pytest.mark.parametrize(
+        ("url_path", "full_path"),
+        [
+            ("/", SITE),
+            ("/index.html", os.path.join(SITE, "index.html")),
+            ("/static", STATIC),
+            ("/static/css/a.css", os.path.join(STATIC, "css", "a.css")),
+            ("/static/docs/guide/", os.path.join(DOCS, "guide")),
+            # Prefixes match whole segments only
+            ("/staticfiles/a.css", os.path.join(SITE, "staticfiles", "a.css")),
+        ],
+    )
+    def test_longest_prefix_wins(
+        self, router: Router, url_path: str, full_path: str
+    ) -> None:
+        """Test a path is served by the mount with the longest matching prefix."""
+        # When
+        route = router.route("example.com", url_path)
+
+        # Then
+        assert route is not None
+        assert route.full_path == full_path
+
+    def test_routes_virtual_host(self, router: Router) -> None:
+        """Test a host with mounts of its own only uses those mounts."""
+        # When
+        route = router.route("Docs.Example.com:8080", "/static/a.css")
+
+        # Then
+        assert route is not None
+        assert route.mount.host == "docs.example.com"
+        assert route.full_path == os.path.join(DOCS, "static", "a.css")
+
+    def test_no_route_without_matching_mount(self) -> None:
+        """Test paths outside every mount aren't routed."""
+        # Given
+        router = Router([Mount("/static", STATIC, [])])
+
+        # When-Then
+        assert router.route(None, "/index.html") is None
+        assert router.route(None, "/static/a.css") is not None
+
+    def test_rejects_duplicate_mounts(self) -> None:
+        """Test the same prefix can't be mounted twice on a host."""
+        with pytest.raises(ValueError, match="Mounted twice"):
+            Router([Mount("/static", STATIC, []), Mount("/static/", SITE, [])])
+
+
+@pytest.mark.parametrize(
+    ("host", "expected"),
+    [
+        ("Example.COM", "example.com"),
+        ("example.com:8080", "example.com"),
+        ("example.com.", "example.com"),
+        ("[::1]:8080", "[::1]"),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_normalize_host(host: str | None, expected: str | None) -> None:
+    """Test Host headers are reduced to the name they refer to."""
+    assert normalize_host(host) == expected
+
+
+def test_read_routes(tmp_path: Path) -> None:
+    """Test mounts are read with paths relative to the routes file."""
+    # Given
+    path = tmp_path / "routes.json"
+    path.write_text(
+        json.dumps(
+            {
+                "mounts": [
+                    {"prefix": "/", "root": "site"},
+                    {
+                        "prefix": "/downloads/",
+                        "host": "example.com",
+                        "archive": "downloads.zip",
+                        "handlers": ["package.module:Handler"],
+                    },
+                ]
+            }
+        )
+    )
+
+    # When
+    site, downloads = read_routes(str(path))
+
+    # Then
+    assert site.prefix == "/"
+    assert site.root == str(tmp_path / "site")
+    assert downloads.prefix == "/downloads"
+    assert downloads.host == "example.com"
+    assert downloads.root is None
+    assert downloads.archive == str(tmp_path / "downloads.zip")
+    assert downloads.handlers == ("package.module:Handler",)
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        [],
+        {"mounts": [{"root": "site"}]},
+        {"mounts": [{"prefix": "static"}]},
+        {"mounts": [{"prefix": "/", "roots": "site"}]},
+        {"mounts": [{"prefix": "/", "handlers": "a:B"}]},
+    ],
+)
+def test_read_routes_rejects_invalid_file(tmp_path: Path, document: object) -> None:
+    """Test a routes file that doesn't describe mounts is rejected."""
+    # Given
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps(document))
+
+    # When-Then
+    with pytest.raises(ValueError):
+        read_routes(str(path))
+
+
+def test_load_handler_class() -> None:
+    """Test resource handlers are imported by module and class name."""
+    # Given
+    name = "simple_web_server.resource_handlers.file_handler:FileHandler"
+
+    # When-Then
+    assert load_handler_class(name) is FileHandler
+    with pytest.raises(ValueError):
+        load_handler_class("simple_web_server.router:Router")
+    with pytest.raises(ValueError):
+        load_handler_class("no_such_module:Handler")
@@ -0,0 +1,253 @@
+import http.client
+import http.server
+import os
+import socket
+import threading
+import time
+import urllib.request
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from simple_web_server.__main__ import RequestHandler, parse_args
+from simple_web_server.servers import (
+    PooledThreadingHTTPServer,
+    PreforkHTTPServer,
+    create_server,
+)
+
+
+@pytest.fixture
+def served_dir(temp_dir: str) -> Generator[str, None, None]:
+    """Fixture that makes the temp directory the server's working directory."""
+    original_cwd = os.getcwd()
+    os.chdir(temp_dir)
+    yield temp_dir
+    os.chdir(original_cwd)
+
+
+def fetch(port: int, path: str) -> bytes:
+    """Fetch a path from a server listening on localhost."""
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as r:
+        body: bytes = r.read()
+    return body
+
+
+class TestCreateServer:
+    """Tests for create_server."""
+
+    def test_single_mode(self) -> None:
+        """Test single mode creates a plain HTTPServer."""
+        # When
+        server = create_server("single", ("127.0.0.1", 0), RequestHandler)
+
+        # Then
+        try:
+            assert type(server) is http.server.HTTPServer
+        finally:
+            server.server_close()
+
+    def test_threaded_mode(self) -> None:
+        """Test threaded mode creates a pooled server with the requested size."""
+        # When
+        server = create_server("threaded", ("127.0.0.1", 0), RequestHandler, threads=4)
+
+        # Then
+        try:
+            assert isinstance(server, PooledThreadingHTTPServer)
+            assert server.max_workers == 4
+        finally:
+            server.server_close()
+
+    def test_prefork_mode(self) -> None:
+        """Test prefork mode creates a forking server with the requested workers."""
+        # When
+        server = create_server(
+            "prefork", ("127.0.0.1", 0), RequestHandler, threads=2, workers=3
+        )
+
+        # Then
+        try:
+            assert isinstance(server, PreforkHTTPServer)
+            assert server.workers == 3
+            assert server.max_workers == 2
+        finally:
+            server.server_close()
+
+    def test_unknown_mode(self) -> None:
+        """Test an unknown mode raises ValueError."""
+        with pytest.raises(ValueError, match="Unknown server mode"):
+            create_server("bogus", ("127.0.0.1", 0), RequestHandler)
+
+
+def test_threaded_server_serves_concurrent_requests(served_dir: str) -> None:
+    """Integration test: the pooled server answers many parallel requests."""
+    # Given
+    server = PooledThreadingHTTPServer(("127.0.0.1", 0), RequestHandler, max_workers=4)
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        # When
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            bodies = list(pool.map(lambda _: fetch(port, "/file2.txt"), range(16)))
+
+        # Then
+        assert bodies == [b"Text file content"] * 16
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_prefork_server_serves_requests(served_dir: str) -> None:
+    """Integration test: forked workers accept from the shared socket."""
+    # Given
+    server = PreforkHTTPServer(
+        ("127.0.0.1", 0), RequestHandler, max_workers=2, workers=2
+    )
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        # When
+        bodies = [fetch(port, "/file2.txt") for _ in range(4)]
+        deadline = time.monotonic() + 5
+        while len(server.worker_pids) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # Then
+        assert bodies == [b"Text file content"] * 4
+        assert len(server.worker_pids) == 2
+    finally:
+        server.stop_workers()
+        thread.join(timeout=5)
+        server.server_close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_prefork_shutdown_while_forking_stops_every_worker(served_dir: str) -> None:
+    """Test workers forked after shutdown() are stopped, not left running."""
+    # Given
+    server = PreforkHTTPServer(
+        ("127.0.0.1", 0), RequestHandler, max_workers=2, workers=3
+    )
+    fork = os.fork
+
+    def fork_then_shut_down() -> int:
+        pid = fork()
+        if pid != 0:
+            # The first worker is forked, but not yet recorded
+            server.shutdown()
+        return pid
+
+    # When
+    with patch("os.fork", side_effect=fork_then_shut_down):
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+
+    # Then
+    try:
+        assert not thread.is_alive()
+        assert len(server.worker_pids) == 1
+    finally:
+        server.stop_workers()
+        server.server_close()
+
+
+@pytest.mark.parametrize("mode", ["threaded", "asyncio"])
+def test_drain_answers_open_connections_then_returns(
+    served_dir: str, mode: str
+) -> None:
+    """Test a draining server still answers, asking clients to reconnect."""
+    # Given
+    server = create_server(mode, ("127.0.0.1", 0), RequestHandler, threads=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    conn.request("GET", "/file2.txt")
+    conn.getresponse().read()
+    server.shutdown()
+    thread.join(timeout=5)
+    drainer = threading.Thread(target=server.drain, args=(5.0,))
+    drainer.start()
+
+    try:
+        # When
+        conn.request("GET", "/file2.txt")
+        response = conn.getresponse()
+        body = response.read()
+        conn.close()
+        drainer.join(timeout=5)
+
+        # Then
+        assert body == b"Text file content"
+        assert response.getheader("Connection") == "close"
+        assert not drainer.is_alive()
+    finally:
+        conn.close()
+        server.server_close()
+
+
+@pytest.mark.parametrize("mode", ["single", "threaded", "asyncio"])
+def test_create_server_adopts_listening_socket(served_dir: str, mode: str) -> None:
+    """Test a server can serve on a socket that is already listening."""
+    # Given
+    sock = socket.create_server(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+
+    # When
+    server = create_server(
+        mode, ("127.0.0.1", 12345), RequestHandler, threads=2, sock=sock
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    # Then
+    try:
+        assert server.server_address[1] == port
+        assert fetch(port, "/file2.txt") == b"Text file content"
+    finally:
+        server.shutdown()
+        thread.join(timeout=5)
+        server.server_close()
+
+
+def test_parse_args_defaults() -> None:
+    """Test the command line defaults to a single-threaded server on 8080."""
+    # When
+    args = parse_args([])
+
+    # Then
+    assert args.mode == "single"
+    assert args.port == 8080
+
+
+def test_parse_args_rejects_empty_pool() -> None:
+    """Test a thread pool of zero workers is rejected."""
+    with pytest.raises(SystemExit):
+        parse_args(["--mode", "threaded", "--threads", "0"])
+
+
+def test_parse_args_rejects_archive_with_snapshot() -> None:
+    """Test an archive can't be served together with a snapshot."""
+    with pytest.raises(SystemExit):
+        parse_args(["--archive", "site.zip", "--snapshot"])
+
+
+def test_parse_args_rejects_routes_with_snapshot() -> None:
+    """Test routes can't be combined with a snapshot of the document root."""
+    with pytest.raises(SystemExit):
+        parse_args(["--routes", "routes.json", "--snapshot"])
+
+
+def test_parse_args_rejects_negative_connection_limit() -> None:
+    """Test a negative connection limit is rejected."""
+    with pytest.raises(SystemExit):
+        parse_args(["--max-connections", "-1"])
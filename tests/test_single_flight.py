@@ -0,0 +1,123 @@
+import threading
+import time
+from collections.abc import Callable
+
+from simple_web_server.single_flight import SingleFlight
+
+
+def run_concurrently(count: int, target: Callable[[], None]) -> None:
+    """Run target in count threads and wait for all of them."""
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+
+class TestSingleFlight:
+    """Tests for the SingleFlight."""
+
+    def test_concurrent_callers_share_one_computation(self) -> None:
+        """Test callers arriving while a computation runs get its result."""
+        # Given
+        flights: SingleFlight[bytes] = SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def compute() -> bytes:
+            calls.append(1)
+            release.wait(5)
+            return b"content"
+
+        def request() -> None:
+            results.append(flights.do("key", 7, compute))
+
+        # When
+        leader = threading.Thread(target=request)
+        leader.start()
+        while not len(flights):
+            time.sleep(0.01)
+        followers = threading.Thread(target=run_concurrently, args=(5, request))
+        followers.start()
+        while flights.followers < 5:
+            time.sleep(0.01)
+        release.set()
+        leader.join(timeout=5)
+        followers.join(timeout=5)
+
+        # Then
+        assert calls == [1]
+        assert results == [b"content"] * 6
+        assert (flights.leaders, flights.followers) == (1, 5)
+        assert len(flights) == 0
+        assert flights.current_bytes == 0
+
+    def test_followers_get_the_leaders_exception(self) -> None:
+        """Test a failed computation fails every caller waiting for it."""
+        # Given
+        flights: SingleFlight[bytes] = SingleFlight()
+        release = threading.Event()
+        errors = []
+
+        def compute() -> bytes:
+            release.wait(5)
+            raise OSError("disk gone")
+
+        def request() -> None:
+            try:
+                flights.do("key", 7, compute)
+            except OSError as e:
+                errors.append(str(e))
+
+        # When
+        leader = threading.Thread(target=request)
+        leader.start()
+        while not len(flights):
+            time.sleep(0.01)
+        follower = threading.Thread(target=request)
+        follower.start()
+        while flights.followers < 1:
+            time.sleep(0.01)
+        release.set()
+        leader.join(timeout=5)
+        follower.join(timeout=5)
+
+        # Then
+        assert errors == ["disk gone", "disk gone"]
+        assert len(flights) == 0
+
+    def test_later_callers_compute_again(self) -> None:
+        """Test results aren't kept once the computation is done."""
+        # Given
+        flights: SingleFlight[int] = SingleFlight()
+        calls = []
+
+        def compute() -> int:
+            calls.append(1)
+            return len(calls)
+
+        # When
+        first = flights.do("key", 1, compute)
+        second = flights.do("key", 1, compute)
+
+        # Then
+        assert (first, second) == (1, 2)
+
+    def test_results_over_max_bytes_are_not_shared(self) -> None:
+        """Test a computation is only shared while its size fits the budget."""
+        # Given
+        flights: SingleFlight[bytes] = SingleFlight(max_bytes=10)
+        in_flight = []
+
+        def compute() -> bytes:
+            in_flight.append(len(flights))
+            return b"x" * 11
+
+        # When
+        result = flights.do("key", 11, compute)
+
+        # Then
+        assert result == b"x" * 11
+        assert in_flight == [0]
+        assert flights.current_bytes == 0
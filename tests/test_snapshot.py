@@ -0,0 +1,316 @@
+import gzip
+import os
+from unittest.mock import MagicMock, patch
+
+from simple_web_server.snapshot import StaticSnapshot, serve_from_snapshot
+
+
+class TestStaticSnapshot:
+    """Tests for the StaticSnapshot index."""
+
+    def test_build_indexes_nested_files(self, temp_dir: str) -> None:
+        """Test every file under the root is indexed by its URL path."""
+        # Given
+        with open(os.path.join(temp_dir, "subdir", "nested.css"), "w") as f:
+            f.write("body {}")
+        snapshot = StaticSnapshot(temp_dir, workers=2)
+
+        # When
+        snapshot.build()
+
+        # Then
+        assert len(snapshot) == 3
+        nested = snapshot.lookup("/subdir/nested.css")
+        assert nested is not None
+        assert nested.content_type == "text/css"
+        assert nested.body == b"body {}"
+        assert b"Content-Length: 7\r\n" in nested.head
+        assert b"Vary: Accept-Encoding\r\n" in nested.head
+        assert snapshot.lookup("/subdir") is None
+        assert snapshot.lookup("/missing.txt") is None
+
+    def test_build_preloads_only_small_files(self, temp_dir: str) -> None:
+        """Test files above preload_size are indexed but not read."""
+        # Given
+        snapshot = StaticSnapshot(temp_dir, preload_size=20)
+
+        # When
+        snapshot.build()
+
+        # Then
+        small = snapshot.lookup("/file2.txt")
+        large = snapshot.lookup("/file1.html")
+        assert small is not None and small.body == b"Text file content"
+        assert large is not None and large.body is None
+        assert snapshot.preloaded_bytes == len(b"Text file content")
+
+    def test_refresh_picks_up_changes(self, temp_dir: str) -> None:
+        """Test refresh() updates modified, added and removed files."""
+        # Given
+        snapshot = StaticSnapshot(temp_dir)
+        snapshot.build()
+        file2 = os.path.join(temp_dir, "file2.txt")
+        with open(file2, "w") as f:
+            f.write("Changed")
+        stat = os.stat(file2)
+        os.utime(file2, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        os.remove(os.path.join(temp_dir, "file1.html"))
+        os.mkdir(os.path.join(temp_dir, "new"))
+        with open(os.path.join(temp_dir, "new", "added.txt"), "w") as f:
+            f.write("Added")
+        directory_stat = os.stat(temp_dir)
+        os.utime(
+            temp_dir,
+            ns=(directory_stat.st_atime_ns, directory_stat.st_mtime_ns + 1_000_000_000),
+        )
+
+        # When
+        snapshot.refresh()
+
+        # Then
+        changed = snapshot.lookup("/file2.txt")
+        added = snapshot.lookup("/new/added.txt")
+        assert changed is not None and changed.body == b"Changed"
+        assert added is not None and added.body == b"Added"
+        assert snapshot.lookup("/file1.html") is None
+        assert snapshot.preloaded_bytes == len(b"Changed") + len(b"Added")
+
+    def test_invalidate_indexes_changed_paths(self, temp_dir: str) -> None:
+        """Test invalidate() updates the file or directory it is given."""
+        # Given
+        snapshot = StaticSnapshot(temp_dir)
+        snapshot.build()
+        os.remove(os.path.join(temp_dir, "file1.html"))
+        new_path = os.path.join(temp_dir, "subdir", "new.txt")
+        with open(new_path, "w") as f:
+            f.write("New")
+
+        # When
+        snapshot.invalidate(os.path.join(temp_dir, "file1.html"))
+        snapshot.invalidate(os.path.join(temp_dir, "subdir"))
+        snapshot.invalidate("/somewhere/else.txt")
+
+        # Then
+        assert snapshot.lookup("/file1.html") is None
+        new = snapshot.lookup("/subdir/new.txt")
+        assert new is not None and new.body == b"New"
+        assert len(snapshot) == 2
+
+    def test_rescan_removes_files_indexed_by_invalidate(self, temp_dir: str) -> None:
+        """Test files added one by one are dropped when their directory is."""
+        # Given
+        snapshot = StaticSnapshot(temp_dir)
+        snapshot.build()
+        nested = os.path.join(temp_dir, "subdir", "new", "nested.txt")
+        os.makedirs(os.path.dirname(nested))
+        with open(nested, "w") as f:
+            f.write("Nested")
+        snapshot.invalidate(nested)
+        os.remove(nested)
+        os.rmdir(os.path.dirname(nested))
+
+        # When
+        snapshot.invalidate(os.path.join(temp_dir, "subdir"))
+
+        # Then
+        assert snapshot.lookup("/subdir/new/nested.txt") is None
+        assert len(snapshot) == 2
+
+    def test_invalidate_sibling_updates_original(self, temp_dir: str) -> None:
+        """Test a new .gz sibling gives the original file a gzip response."""
+        # Given
+        snapshot = StaticSnapshot(temp_dir)
+        snapshot.build()
+        sibling = os.path.join(temp_dir, "file2.txt.gz")
+        with open(sibling, "wb") as f:
+            f.write(gzip.compress(b"Text file content"))
+
+        # When
+        snapshot.invalidate(sibling)
+
+        # Then
+        entry = snapshot.lookup("/file2.txt")
+        assert entry is not None and entry.codings == ("gzip",)
+        assert entry.gzip is not None
+        assert gzip.decompress(entry.gzip[1]) == b"Text file content"
+
+
+class TestServeFromSnapshot:
+    """Tests for serving requests from a snapshot."""
+
+    def test_sends_preloaded_file(
+        self, mock_request_handler: MagicMock, temp_dir: str
+    ) -> None:
+        """Test a preloaded file is sent with its prepared headers."""
+        # Given
+        snapshot = StaticSnapshot(temp_dir)
+        snapshot.build()
+
+        # When
+        served = serve_from_snapshot(mock_request_handler, snapshot, "/file2.txt")
+
+        # Then
+        assert served is True
+        mock_request_handler.send_response.assert_called_once_with(200)
+        head, length = mock_request_handler.send_encoded_headers.call_args.args
+        assert b"Content-type: text/plain\r\n" in head
+        assert b"Content-Length: 17\r\n" in head
+        assert length == 17
+        mock_request_handler.end_headers.assert_called_once()
+        assert mock_request_handler.wfile.getvalue() == b"Text file content"
+
+    def test_streams_file_that_is_not_preloaded(
+        self, mock_request_handler: MagicMock, temp_dir: str
+    ) -> None:
+        """Test a file too large to preload is read from disk."""
+        # Given
+        snapshot = StaticSnapshot(temp_dir, preload_size=0)
+        snapshot.build()
+
+        # When
+        served = serve_from_snapshot(mock_request_handler, snapshot, "/file2.txt")
+
+        # Then
+        assert served is True
+        assert mock_request_handler.wfile.getvalue() == b"Text file content"
+
+    def test_head_sends_no_body(
+        self, mock_request_handler: MagicMock, temp_dir: str
+    ) -> None:
+        """Test a HEAD request gets the prepared headers only."""
+        # Given
+        snapshot = StaticSnapshot(temp_dir, preload_size=0)
+        snapshot.build()
+        mock_request_handler.command = "HEAD"
+
+        # When
+        with patch("builtins.open") as mock_open:
+            served = serve_from_snapshot(mock_request_handler, snapshot, "/file2.txt")
+
+        # Then
+        assert served is True
+        mock_open.assert_not_called()
+        assert mock_request_handler.wfile.getvalue() == b""
+
+    def test_falls_back_for_changed_file(
+        self, mock_request_handler: MagicMock, temp_dir: str
+    ) -> None:
+        """Test a file changed since it was indexed takes the regular path."""
+        # Given
+        snapshot = StaticSnapshot(temp_dir, preload_size=0)
+        snapshot.build()
+        with open(os.path.join(temp_dir, "file2.txt"), "a") as f:
+            f.write(" and more")
+
+        # When
+        served = serve_from_snapshot(mock_request_handler, snapshot, "/file2.txt")
+
+        # Then
+        assert served is False
+        mock_request_handler.send_response.assert_not_called()
+
+    def test_falls_back_for_conditional_and_range_requests(
+        self, mock_request_handler: MagicMock, temp_dir: str
+    ) -> None:
+        """Test requests that may need another response aren't served."""
+        # Given
+        snapshot = StaticSnapshot(temp_dir)
+        snapshot.build()
+        mock_request_handler.headers["If-None-Match"] = '"etag"'
+
+        # When-Then
+        assert serve_from_snapshot(mock_request_handler, snapshot, "/file2.txt") is (
+            False
+        )
+        del mock_request_handler.headers["If-None-Match"]
+        mock_request_handler.headers["Range"] = "bytes=0-1"
+        assert serve_from_snapshot(mock_request_handler, snapshot, "/file2.txt") is (
+            False
+        )
+        assert serve_from_snapshot(mock_request_handler, snapshot, "/missing") is False
+        mock_request_handler.send_response.assert_not_called()
+
+    def test_sends_prepared_gzip_response(
+        self, mock_request_handler: MagicMock, temp_dir: str
+    ) -> None:
+        """Test a client that accepts gzip gets the file compressed at startup."""
+        # Given
+        with open(os.path.join(temp_dir, "site.css"), "wb") as f:
+            f.write(b"body { color: red; }\n" * 50)
+        snapshot = StaticSnapshot(temp_dir)
+        snapshot.build()
+        mock_request_handler.headers["Accept-Encoding"] = "gzip, deflate"
+
+        # When
+        with patch("simple_web_server.snapshot.compress") as mock_compress:
+            served = serve_from_snapshot(mock_request_handler, snapshot, "/site.css")
+
+        # Then
+        assert served is True
+        mock_compress.assert_not_called()
+        head, length = mock_request_handler.send_encoded_headers.call_args.args
+        assert b"Content-Encoding: gzip\r\n" in head
+        assert b"Vary: Accept-Encoding\r\n" in head
+        assert f"Content-Length: {length}\r\n".encode() in head
+        body = mock_request_handler.wfile.getvalue()
+        assert len(body) == length
+        assert gzip.decompress(body) == b"body { color: red; }\n" * 50
+
+    def test_sends_precompressed_sibling(
+        self, mock_request_handler: MagicMock, temp_dir: str
+    ) -> None:
+        """Test a .gz sibling is sent to clients that accept gzip."""
+        # Given
+        with open(os.path.join(temp_dir, "file2.txt.gz"), "wb") as f:
+            f.write(gzip.compress(b"Text file content"))
+        snapshot = StaticSnapshot(temp_dir)
+        snapshot.build()
+        mock_request_handler.headers["Accept-Encoding"] = "gzip"
+
+        # When
+        served = serve_from_snapshot(mock_request_handler, snapshot, "/file2.txt")
+
+        # Then
+        assert served is True
+        head, _ = mock_request_handler.send_encoded_headers.call_args.args
+        assert b"Content-type: text/plain\r\n" in head
+        assert b"Content-Encoding: gzip\r\n" in head
+        body = mock_request_handler.wfile.getvalue()
+        assert gzip.decompress(body) == b"Text file content"
+
+    def test_sends_identity_when_gzip_isnt_offered(
+        self, mock_request_handler: MagicMock, temp_dir: str
+    ) -> None:
+        """Test a file too small to compress is sent as is, with Vary."""
+        # Given
+        snapshot = StaticSnapshot(temp_dir)
+        snapshot.build()
+        mock_request_handler.headers["Accept-Encoding"] = "gzip"
+
+        # When
+        served = serve_from_snapshot(mock_request_handler, snapshot, "/file2.txt")
+
+        # Then
+        assert served is True
+        head, _ = mock_request_handler.send_encoded_headers.call_args.args
+        assert b"Vary: Accept-Encoding\r\n" in head
+        assert b"Content-Encoding" not in head
+        assert mock_request_handler.wfile.getvalue() == b"Text file content"
+
+    def test_falls_back_for_coding_not_prepared(
+        self, mock_request_handler: MagicMock, temp_dir: str
+    ) -> None:
+        """Test a client negotiating a .br sibling takes the regular path."""
+        # Given
+        with open(os.path.join(temp_dir, "file2.txt.br"), "wb") as f:
+            f.write(b"brotli")
+        snapshot = StaticSnapshot(temp_dir)
+        snapshot.build()
+        mock_request_handler.headers["Accept-Encoding"] = "gzip, br"
+
+        # When
+        served = serve_from_snapshot(mock_request_handler, snapshot, "/file2.txt")
+
+        # Then
+        assert served is False
+        mock_request_handler.send_response.assert_not_called()
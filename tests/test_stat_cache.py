@@ -0,0 +1,103 @@
+import os
+from unittest.mock import patch
+
+from simple_web_server.stat_cache import StatCache, stat_or_none
+
+
+def test_stat_or_none_returns_none_for_missing_path() -> None:
+    """Test stat_or_none returns None instead of raising."""
+    # When-Then
+    assert stat_or_none("/this/path/does/not/exist/ever") is None
+    assert stat_or_none("bad\0path") is None
+
+
+class TestStatCache:
+    """Tests for the StatCache."""
+
+    def test_stat_reuses_result_within_ttl(self, temp_file: str) -> None:
+        """Test a path is only stat()ed once while its result is fresh."""
+        # Given
+        cache = StatCache(ttl=60)
+        first = cache.stat(temp_file)
+
+        # When
+        with patch("os.stat") as mock_stat:
+            second = cache.stat(temp_file)
+
+        # Then
+        mock_stat.assert_not_called()
+        assert second == first == os.stat(temp_file)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_stat_caches_missing_paths(self) -> None:
+        """Test missing paths are cached as None too."""
+        # Given
+        cache = StatCache(ttl=60)
+        path = "/this/path/does/not/exist/ever"
+        cache.stat(path)
+
+        # When
+        with patch("os.stat") as mock_stat:
+            result = cache.stat(path)
+
+        # Then
+        mock_stat.assert_not_called()
+        assert result is None
+
+    def test_stat_looks_up_expired_result_again(self, temp_file: str) -> None:
+        """Test results older than the TTL are refreshed."""
+        # Given
+        cache = StatCache(ttl=0)
+        cache.stat(temp_file)
+
+        # When
+        with patch("os.stat", wraps=os.stat) as mock_stat:
+            cache.stat(temp_file)
+
+        # Then
+        mock_stat.assert_called_once_with(temp_file)
+        assert cache.misses == 2
+
+    def test_stat_evicts_oldest_result(self, temp_file: str) -> None:
+        """Test the cache stays within max_entries."""
+        # Given
+        cache = StatCache(ttl=60, max_entries=1)
+        cache.stat("/this/path/does/not/exist/ever")
+
+        # When
+        cache.stat(temp_file)
+
+        # Then
+        assert len(cache) == 1
+        with patch("os.stat") as mock_stat:
+            cache.stat(temp_file)
+        mock_stat.assert_not_called()
+
+    def test_invalidate_forgets_result(self, temp_file: str) -> None:
+        """Test invalidate makes the next lookup stat() the path again."""
+        # Given
+        cache = StatCache(ttl=60)
+        cache.stat(temp_file)
+
+        # When
+        cache.invalidate(temp_file)
+
+        # Then
+        assert len(cache) == 0
+
+    def test_stat_racing_invalidation_is_not_cached(self, temp_file: str) -> None:
+        """Test a result looked up while the path changed isn't kept."""
+        # Given
+        cache = StatCache(ttl=60)
+
+        def stat_then_invalidate(path: str) -> os.stat_result:
+            result = os.lstat(path)
+            cache.invalidate(path)  # The watcher reports a change meanwhile
+            return result
+
+        # When
+        with patch("os.stat", side_effect=stat_then_invalidate):
+            cache.stat(temp_file)
+
+        # Then
+        assert len(cache) == 0
@@ -0,0 +1,203 @@
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+
+from simple_web_server.supervisor import Supervisor
+
+# Takes the socket it inherited, reports it is ready and stays up until killed.
+CHILD_SCRIPT = """
+import time
+from simple_web_server.supervisor import inherited_socket, notify_ready
+assert inherited_socket() is not None
+notify_ready()
+time.sleep(60)
+"""
+
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+
+
+@pytest.fixture
+def listener() -> Generator[socket.socket, None, None]:
+    """Fixture providing a listening socket on a free port."""
+    sock = socket.create_server(("127.0.0.1", 0))
+    yield sock
+    sock.close()
+
+
+@pytest.fixture
+def child_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Fixture letting child interpreters import the package."""
+    monkeypatch.setenv("PYTHONPATH", PROJECT_ROOT)
+
+
+class TestSupervisor:
+    """Tests for the Supervisor."""
+
+    def test_start_child_passes_listening_socket(
+        self, listener: socket.socket, child_env: None
+    ) -> None:
+        """Test a child gets the supervisor's socket and is ready once it says so."""
+        # Given
+        supervisor = Supervisor(listener, [sys.executable, "-c", CHILD_SCRIPT])
+
+        # When
+        child = supervisor.start_child()
+
+        # Then
+        assert child is not None
+        try:
+            assert child.poll() is None
+        finally:
+            child.kill()
+            child.wait()
+
+    def test_start_child_gives_up_on_child_that_exits(
+        self, listener: socket.socket
+    ) -> None:
+        """Test a child exiting before it is ready isn't used."""
+        # Given
+        supervisor = Supervisor(listener, [sys.executable, "-c", "pass"])
+
+        # When
+        child = supervisor.start_child()
+
+        # Then
+        assert child is None
+
+    def test_start_child_gives_up_after_ready_timeout(
+        self, listener: socket.socket
+    ) -> None:
+        """Test a child that never reports it is ready is killed."""
+        # Given
+        supervisor = Supervisor(
+            listener,
+            [sys.executable, "-c", "import time; time.sleep(60)"],
+            ready_timeout=0.2,
+        )
+
+        # When
+        child = supervisor.start_child()
+
+        # Then
+        assert child is None
+
+    def test_reload_keeps_old_child_when_new_one_fails(
+        self, listener: socket.socket, child_env: None
+    ) -> None:
+        """Test a failed reload leaves the running child alone."""
+        # Given
+        supervisor = Supervisor(listener, [sys.executable, "-c", CHILD_SCRIPT])
+        supervisor.child = supervisor.start_child()
+        old_child = supervisor.child
+        supervisor.command = [sys.executable, "-c", "raise SystemExit(1)"]
+
+        try:
+            # When
+            reloaded = supervisor.reload()
+
+            # Then
+            assert reloaded is False
+            assert supervisor.child is old_child
+            assert old_child is not None and old_child.poll() is None
+        finally:
+            supervisor.stop()
+
+    def test_reload_replaces_child(
+        self, listener: socket.socket, child_env: None
+    ) -> None:
+        """Test a reload starts a new child and stops the old one."""
+        # Given
+        supervisor = Supervisor(listener, [sys.executable, "-c", CHILD_SCRIPT])
+        supervisor.child = supervisor.start_child()
+        old_child = supervisor.child
+
+        try:
+            # When
+            reloaded = supervisor.reload()
+
+            # Then
+            assert reloaded is True
+            assert supervisor.child is not old_child
+            assert old_child is not None
+            assert old_child.wait(timeout=5) == -signal.SIGTERM
+        finally:
+            supervisor.stop()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def test_supervised_server_reloads_without_failed_requests(
+    temp_dir: str, child_env: None
+) -> None:
+    """Integration test: requests keep succeeding across a SIGHUP reload."""
+    # Given
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "simple_web_server",
+            "--supervise",
+            "--mode",
+            "threaded",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--access-log",
+            "off",
+        ],
+        cwd=temp_dir,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/file2.txt"
+    failures: list[Exception] = []
+    served = 0
+    stop = threading.Event()
+
+    def fetch_until_stopped() -> None:
+        nonlocal served
+        while not stop.is_set():
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    assert response.read() == b"Text file content"
+                served += 1
+            except Exception as e:
+                failures.append(e)
+
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                urllib.request.urlopen(url, timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        client = threading.Thread(target=fetch_until_stopped)
+        client.start()
+
+        # When
+        process.send_signal(signal.SIGHUP)
+        time.sleep(2)
+        stop.set()
+        client.join(timeout=10)
+
+        # Then
+        assert failures == []
+        assert served > 0
+    finally:
+        stop.set()
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=10) == 0
@@ -0,0 +1,157 @@
+import io
+import socket
+import tempfile
+from collections.abc import Generator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from simple_web_server.transfer import (
+    COPY_CHUNK_SIZE,
+    copy_file_chunks,
+    send_buffer,
+    send_file,
+    write_stream,
+)
+
+DATA = bytes(range(256)) * 1024  # 256 KiB, several copy chunks
+
+
+@pytest.fixture
+def data_file() -> Generator[io.BufferedReader, None, None]:
+    """Fixture providing an open binary file with known content."""
+    with tempfile.TemporaryFile() as f:
+        f.write(DATA)
+        f.flush()
+        f.seek(0)
+        yield f
+
+
+class RecordingWriter(io.BytesIO):
+    """BytesIO that remembers the size of every write."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.write_sizes: list[int] = []
+
+    def write(self, data: bytes) -> int:
+        self.write_sizes.append(len(data))
+        return super().write(data)
+
+
+def test_copy_file_chunks_bounded_writes(data_file: io.BufferedReader) -> None:
+    """Test the fallback copy never writes more than one chunk at a time."""
+    # Given
+    wfile = RecordingWriter()
+
+    # When
+    sent = copy_file_chunks(wfile, data_file, 10, len(DATA) - 20)
+
+    # Then
+    assert sent == len(DATA) - 20
+    assert wfile.getvalue() == DATA[10:-10]
+    assert max(wfile.write_sizes) <= COPY_CHUNK_SIZE
+
+
+def test_copy_file_chunks_short_file(data_file: io.BufferedReader) -> None:
+    """Test the copy reports fewer bytes when the file ends early."""
+    # Given
+    wfile = io.BytesIO()
+
+    # When
+    sent = copy_file_chunks(wfile, data_file, len(DATA) - 5, 100)
+
+    # Then
+    assert sent == 5
+
+
+def test_send_buffer_writes_bounded_views() -> None:
+    """Test send_buffer writes slices of the buffer in bounded pieces."""
+    # Given
+    writer = RecordingWriter()
+
+    # When
+    with patch("simple_web_server.transfer.BUFFER_WRITE_SIZE", 100 * 1024):
+        sent = send_buffer(writer, memoryview(DATA), 1000, 250 * 1024)
+
+    # Then
+    assert sent == 250 * 1024
+    assert writer.getvalue() == DATA[1000 : 1000 + 250 * 1024]
+    assert writer.write_sizes == [100 * 1024, 100 * 1024, 50 * 1024]
+
+
+def test_send_buffer_stops_at_end_of_buffer() -> None:
+    """Test send_buffer reports a short write past the end of the buffer."""
+    # Given
+    writer = RecordingWriter()
+
+    # When
+    sent = send_buffer(writer, memoryview(DATA), len(DATA) - 10, 100)
+
+    # Then
+    assert sent == 10
+    assert writer.getvalue() == DATA[-10:]
+
+
+def test_write_stream_frames_gathered_chunks() -> None:
+    """Test the first piece is sent at once and later ones are gathered."""
+    # Given
+    writer = RecordingWriter()
+
+    # When
+    with patch("simple_web_server.transfer.STREAM_CHUNK_SIZE", 4):
+        sent = write_stream(writer, [b"head", b"a", b"", b"bc", b"de", b"f"])
+
+    # Then
+    assert sent == 10
+    assert writer.getvalue() == b"4\r\nhead\r\n5\r\nabcde\r\n1\r\nf\r\n0\r\n\r\n"
+
+
+def test_write_stream_without_chunking() -> None:
+    """Test an unchunked stream is written as it is, without a last chunk."""
+    # Given
+    writer = RecordingWriter()
+
+    # When
+    sent = write_stream(writer, [b"one", b"two"], chunked=False)
+
+    # Then
+    assert sent == 6
+    assert writer.getvalue() == b"onetwo"
+
+
+def test_send_file_falls_back_without_socket(
+    mock_request_handler: MagicMock, data_file: io.BufferedReader
+) -> None:
+    """Test send_file copies through wfile when there is no real socket."""
+    # When
+    sent = send_file(mock_request_handler, data_file, 0, len(DATA))
+
+    # Then
+    assert sent == len(DATA)
+    assert mock_request_handler.wfile.getvalue() == DATA
+
+
+def test_send_file_uses_socket(
+    mock_request_handler: MagicMock, data_file: io.BufferedReader
+) -> None:
+    """Test send_file writes straight to the client socket with sendfile."""
+    # Given
+    server_sock, client_sock = socket.socketpair()
+    mock_request_handler.connection = server_sock
+    mock_request_handler.wfile = MagicMock()
+    received = bytearray()
+
+    try:
+        # When
+        sent = send_file(mock_request_handler, data_file, 100, 1000)
+        server_sock.close()
+        while chunk := client_sock.recv(65536):
+            received += chunk
+
+        # Then
+        assert sent == 1000
+        assert bytes(received) == DATA[100:1100]
+        mock_request_handler.wfile.write.assert_not_called()
+    finally:
+        client_sock.close()
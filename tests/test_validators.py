@@ -0,0 +1,42 @@
+import os
+
+from simple_web_server.validators import etag_matches, make_etag, modified_since
+
+
+def make_stat(mtime: float) -> os.stat_result:
+    """Build a stat result with the given modification time."""
+    mtime_ns = int(mtime * 1e9)
+    fields = (0o100644, 0xAB, 1, 1, 0, 0, 0x10, 0, 0, 0)
+    fields += (0.0, mtime, 0.0, 0, mtime_ns, 0)
+    return os.stat_result(fields)
+
+
+def test_make_etag() -> None:
+    """Test ETags combine inode, size and mtime, optionally weak."""
+    # Given
+    stat = make_stat(1.0)
+
+    # When-Then
+    assert make_etag(stat) == '"ab-10-3b9aca00"'
+    assert make_etag(stat, weak=True) == 'W/"ab-10-3b9aca00"'
+
+
+def test_etag_matches() -> None:
+    """Test If-None-Match lists, wildcards and weak comparison."""
+    # When-Then
+    assert etag_matches('"a", "b"', '"b"') is True
+    assert etag_matches("*", '"b"') is True
+    assert etag_matches('W/"b"', '"b"') is True
+    assert etag_matches('"b"', 'W/"b"') is True
+    assert etag_matches('"a"', '"b"') is False
+
+
+def test_modified_since() -> None:
+    """Test If-Modified-Since comparison at one second resolution."""
+    # Given
+    stat = make_stat(784111777.5)  # Sun, 06 Nov 1994 08:49:37.5 GMT
+
+    # When-Then
+    assert modified_since("Sun, 06 Nov 1994 08:49:37 GMT", stat) is False
+    assert modified_since("Sun, 06 Nov 1994 08:49:36 GMT", stat) is True
+    assert modified_since("not a date", stat) is True
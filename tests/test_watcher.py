@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+
+import pytest
+
+from simple_web_server.watcher import (
+    FileWatcher,
+    InotifyWatcher,
+    PollingWatcher,
+    create_watcher,
+    inotify_available,
+    scan_tree,
+)
+
+
+class RecordingSubscriber:
+    """Subscriber recording the changes it is told about."""
+
+    def __init__(self) -> None:
+        self.invalidated: list[str] = []
+        self.cleared = threading.Event()
+        self.changed = threading.Condition()
+
+    def invalidate(self, full_path: str) -> None:
+        with self.changed:
+            self.invalidated.append(full_path)
+            self.changed.notify_all()
+
+    def clear(self) -> None:
+        self.cleared.set()
+
+    def wait_for(self, full_path: str, timeout: float = 5.0) -> bool:
+        with self.changed:
+            return self.changed.wait_for(
+                lambda: full_path in self.invalidated, timeout=timeout
+            )
+
+
+def start_watching(watcher: FileWatcher) -> RecordingSubscriber:
+    """Subscribe a recorder and wait until the watcher is ready."""
+    subscriber = RecordingSubscriber()
+    watcher.subscribe(subscriber)
+    watcher.ensure_started()
+    assert subscriber.cleared.wait(5.0)
+    return subscriber
+
+
+def test_scan_tree_maps_files_and_directories(temp_dir: str) -> None:
+    """Test scan_tree() finds the root, its files and its subdirectories."""
+    # When
+    identities = scan_tree(temp_dir)
+
+    # Then
+    assert set(identities) == {
+        temp_dir,
+        os.path.join(temp_dir, "file1.html"),
+        os.path.join(temp_dir, "file2.txt"),
+        os.path.join(temp_dir, "subdir"),
+    }
+
+
+def test_polling_watcher_reports_changes(temp_dir: str) -> None:
+    """Test a modified file and the directory of a new file are reported."""
+    # Given
+    watcher = PollingWatcher(temp_dir, interval=0.05)
+    subscriber = start_watching(watcher)
+    file2 = os.path.join(temp_dir, "file2.txt")
+
+    try:
+        # When
+        with open(file2, "a") as f:
+            f.write(" and more")
+        with open(os.path.join(temp_dir, "subdir", "new.txt"), "w") as f:
+            f.write("New")
+
+        # Then
+        assert subscriber.wait_for(file2)
+        assert subscriber.wait_for(os.path.join(temp_dir, "subdir", "new.txt"))
+    finally:
+        watcher.stop()
+
+
+@pytest.mark.skipif(not inotify_available(), reason="inotify is not available")
+class TestInotifyWatcher:
+    """Tests for the inotify based watcher."""
+
+    def test_reports_modified_file(self, temp_dir: str) -> None:
+        """Test writing to a file reports the file."""
+        # Given
+        watcher = InotifyWatcher(temp_dir)
+        subscriber = start_watching(watcher)
+        file2 = os.path.join(temp_dir, "file2.txt")
+
+        try:
+            # When
+            with open(file2, "a") as f:
+                f.write(" and more")
+
+            # Then
+            assert subscriber.wait_for(file2)
+        finally:
+            watcher.stop()
+
+    def test_reports_new_file_and_its_directory(self, temp_dir: str) -> None:
+        """Test creating a file reports it and the directory it was added to."""
+        # Given
+        watcher = InotifyWatcher(temp_dir)
+        subscriber = start_watching(watcher)
+        subdir = os.path.join(temp_dir, "subdir")
+
+        try:
+            # When
+            open(os.path.join(subdir, "new.txt"), "w").close()
+
+            # Then
+            assert subscriber.wait_for(os.path.join(subdir, "new.txt"))
+            assert subscriber.wait_for(subdir)
+        finally:
+            watcher.stop()
+
+    def test_watches_new_directories(self, temp_dir: str) -> None:
+        """Test changes inside a directory created after starting are seen."""
+        # Given
+        watcher = InotifyWatcher(temp_dir)
+        subscriber = start_watching(watcher)
+        new_dir = os.path.join(temp_dir, "new")
+
+        try:
+            # When
+            os.mkdir(new_dir)
+            assert subscriber.wait_for(new_dir)
+            time.sleep(0.1)  # Let the watcher add the new directory
+            with open(os.path.join(new_dir, "file.txt"), "w") as f:
+                f.write("Content")
+
+            # Then
+            assert subscriber.wait_for(os.path.join(new_dir, "file.txt"))
+        finally:
+            watcher.stop()
+
+
+def test_create_watcher_polls_when_asked(temp_dir: str) -> None:
+    """Test the poll kind always creates a polling watcher."""
+    # When
+    watcher = create_watcher(temp_dir, "poll", poll_interval=1.5)
+
+    # Then
+    assert isinstance(watcher, PollingWatcher)
+    assert watcher.interval == 1.5
+
+
+def test_create_watcher_rejects_unknown_kind(temp_dir: str) -> None:
+    """Test an unknown watcher kind raises ValueError."""
+    with pytest.raises(ValueError, match="Unknown watcher kind"):
+        create_watcher(temp_dir, "fanotify")